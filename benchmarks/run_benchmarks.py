@@ -0,0 +1,197 @@
+"""
+Benchmarks of the baseline computation, the order generation and the assignment of flex trucks to orders, on synthetic
+networks of increasing size. The timings are appended to a JSON file, and compared with the previous run of the same
+network size to show regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes small medium --repeat 3
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from time import perf_counter
+
+import pandas as pd
+
+import flex_package.config as config
+import flex_package.data.ingestion as ingestion
+import flex_package.data.synthetic_data as sd
+import flex_package.models.afvoer_baseline as afvoer_baseline
+import flex_package.models.generate_orders as generate_orders
+
+logger = logging.getLogger(__name__)
+
+# Network sizes: depots, destinations per depot, 15 minute intervals, flex trucks and registered orders
+SIZES = {
+    'small': {'depots': 5, 'destinations': 4, 'intervals': 64, 'trucks': 5, 'orders': 20},
+    'medium': {'depots': 20, 'destinations': 8, 'intervals': 80, 'trucks': 20, 'orders': 80},
+    'large': {'depots': 60, 'destinations': 12, 'intervals': 92, 'trucks': 60, 'orders': 300},
+}
+PATH_RESULTS = os.path.join(os.path.dirname(__file__), 'results.json')
+# Benchmarks that take more than this factor times the previous run of the same size are reported as regressions
+REGRESSION_FACTOR = 1.25
+
+
+def time_call(func, repeat):
+    """
+    Time a function, taking the fastest of a number of runs
+    :param func: Function without arguments
+    :param repeat: Number of runs
+    :return: Fastest run time (seconds)
+    """
+    durations = []
+    for _ in range(repeat):
+        started = perf_counter()
+        func()
+        durations.append(perf_counter() - started)
+    return min(durations)
+
+
+def write_input_files(size, directory):
+    """
+    Write synthetic predictions and transports to csv files, and point the config to these files and to the output
+    files in the same directory
+    :param size: Network size, see SIZES
+    :param directory: Directory of the files
+    """
+    start, _ = ingestion.get_process_window()
+    depots = sd.get_depots(size['depots'])
+    crossdocks = sd.get_crossdocks(size['destinations'])
+    df_afvoer = sd.generate_afvoer(depots, crossdocks, size['intervals'], start)
+    df_afvoer['date_time'] = df_afvoer['date_time'].dt.strftime(ingestion.AFVOER_TIME_FORMAT)
+    df_transport = sd.generate_inter_transports(depots, crossdocks, size['intervals'], start)
+
+    config.PATH_AFVOER = os.path.join(directory, 'afvoer.csv')
+    config.PATH_TRANSPORT_CLEANED = os.path.join(directory, 'transport.csv')
+    config.PATH_AFVOER_BASELINE_STORE = os.path.join(directory, 'afvoer_baseline')
+    config.PATH_AFVOER_BASELINE = os.path.join(directory, 'afvoer_baseline.xlsx')
+    config.PATH_AFVOER_ORDERS = os.path.join(directory, 'afvoer_orders.xlsx')
+    config.PATH_REFRESH_STATE = os.path.join(directory, 'refresh_state.pkl')
+    config.current_time = start + datetime.timedelta(minutes=15 * size['intervals'] // 2)
+    df_afvoer.to_csv(config.PATH_AFVOER, index=False)
+    df_transport.to_csv(config.PATH_TRANSPORT_CLEANED, index=False)
+
+
+def run_assignment(size):
+    """
+    Run the rolling-horizon planner on synthetic trucks and orders between the locations of the model parameters
+    :param size: Network size, see SIZES
+    :return: Run time (seconds)
+    """
+    import flex_package.models.modelfunctions.flextoewijzer_functions as ff
+    from flex_package.models.flex_planner import RollingHorizonPlanner
+
+    registry = ff.get_location_registry()
+    matrix = ff.get_drive_time_matrix()
+    locations = [location for location in registry.locations if location in matrix.registry]
+    # Trucks are named after their base, so only depots of which the name is not an alias can be a base
+    depots = [location for location in locations if registry.get_type(location) == 'DEPOT']
+    depots = [depot for depot, base in zip(depots, ff.get_start_locations(pd.Series(depots))) if depot == base]
+    start = ff.mp.T0
+    df_trucks = sd.generate_flex_trucks(depots, size['trucks'], start)
+    tekorten = sd.generate_registration_orders(locations, locations, size['orders'], start,
+                                               start + datetime.timedelta(hours=8))
+    trucks = ff.generate_trucks(df_trucks)
+    planner = RollingHorizonPlanner(trucks, ff.generate_event_list(tekorten, trucks))
+    started = perf_counter()
+    planner.run()
+    return perf_counter() - started
+
+
+def run_size(name, size, repeat):
+    """
+    Run all benchmarks for a network size
+    :param name: Name of the network size
+    :param size: Network size, see SIZES
+    :param repeat: Number of runs of each benchmark
+    :return: Dictionary with the run time (seconds) of each benchmark, None if a benchmark was skipped
+    """
+    timings = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        write_input_files(size, directory)
+        timings['afvoer_baseline'] = time_call(afvoer_baseline.main, repeat)
+        timings['generate_orders'] = time_call(generate_orders.main, repeat)
+    try:
+        timings['assignment'] = min(run_assignment(size) for _ in range(repeat))
+    except ImportError as error:
+        # The flextoewijzer needs the model parameters of PySources, which are not available everywhere
+        logger.warning('Skipping assignment benchmark for %s network: %s', name, error)
+        timings['assignment'] = None
+    return timings
+
+
+def get_commit():
+    """
+    Returns: hash of the current git commit, or None outside a git repository
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_results(path):
+    """
+    Read the results of previous runs
+    :param path: Path of the JSON file with results
+    :return: List of results, one per run and network size
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def report_regressions(result, previous_results):
+    """
+    Compare the timings of a run with the previous run of the same network size
+    :param result: Result of the run
+    :param previous_results: Results of previous runs
+    :return: List of benchmarks that are slower than REGRESSION_FACTOR times the previous run
+    """
+    previous = [r for r in previous_results if r['size'] == result['size']]
+    if not previous:
+        return []
+    regressions = []
+    for benchmark, duration in result['timings'].items():
+        previous_duration = previous[-1]['timings'].get(benchmark)
+        if duration is None or previous_duration is None:
+            continue
+        logger.info('%s %s: %.3f s (previous %.3f s)', result['size'], benchmark, duration, previous_duration)
+        if duration > REGRESSION_FACTOR * previous_duration:
+            regressions.append(benchmark)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+    parser.add_argument('--repeat', type=int, default=1, help='number of runs of each benchmark, the fastest is kept')
+    parser.add_argument('--output', default=PATH_RESULTS, help='JSON file to which the results are appended')
+    args = parser.parse_args()
+
+    config.BOOL_EXPORT_EXCEL = False
+    config.BOOL_INCREMENTAL_REFRESH = False
+    results = read_results(args.output)
+    regressions = []
+    for name in args.sizes:
+        result = {'size': name, 'network': SIZES[name], 'commit': get_commit(),
+                  'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'timings': run_size(name, SIZES[name], args.repeat)}
+        logger.info('Benchmark %s: %s', name, result['timings'])
+        regressions += [f'{name} {benchmark}' for benchmark in report_regressions(result, results)]
+        results.append(result)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if regressions:
+        logger.warning('Regressions: %s', ', '.join(regressions))
+
+
+if __name__ == '__main__':
+    main()
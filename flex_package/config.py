@@ -1,3 +1,5 @@
+import os
+
 # ----------------------------------------------------------------------------------------------------------------------
 # RUN SETTINGS
 # ----------------------------------------------------------------------------------------------------------------------
@@ -7,6 +9,10 @@ BOOL_UPDATE_DATA = False
 # Boolean indicating whether the data should be written to the storage (True) or not (False)
 BOOL_WRITE_TO_STORAGE = False
 
+# Boolean indicating whether the baseline should also be exported to an excel file for Control Room (True) or not
+# (False)
+BOOL_EXPORT_EXCEL = True
+
 # Log level. Typical values are ERROR, WARNING, INFO, DEBUG
 LOG_LEVEL = 'DEBUG'
 
@@ -14,6 +20,91 @@ LOG_LEVEL = 'DEBUG'
 # ['package1', 'package2']. Alternatively you can set LOGGERS = ['ALL'], which will report logging of all packages.
 LOGGERS = ['flex_package']
 
+# Number of workers used to update the combinations of depot and destination in parallel in generate_orders. With 1
+# worker, the combinations are updated one after another
+N_WORKERS = 1
+
+# Type of pool used for parallel execution, either 'process' or 'thread'
+POOL_TYPE = 'process'
+
+# Seed for the random deviation that is applied to the predicted floor stock, until the real floor stock is available.
+# Each combination of depot and destination gets its own generator, so results do not depend on the number of workers
+RANDOM_SEED = 0
+
+# Boolean indicating whether generate_orders should only update the combinations of depot and destination for which
+# the planned inter transports changed since the previous run with these transports (True), or all combinations
+# (False). The floor stock and the flex orders of all combinations are always updated
+BOOL_INCREMENTAL_REFRESH = False
+
+# Interval (minutes) between two refreshes of the order service
+REFRESH_INTERVAL = 15
+
+# Interval (seconds) at which the order service checks whether a trigger file was dropped to refresh immediately
+TRIGGER_POLL_SECONDS = 10
+
+# Boolean indicating whether the order service replays the process day, starting at current_time (True), or follows the
+# wall clock (False)
+BOOL_REPLAY_TIME = True
+
+# Max. age (days) of geocoded addresses and drive times in the drive-time cache, older entries are computed again
+DRIVE_TIME_CACHE_MAX_AGE = 30
+
+# Method used to assign open orders to trucks in the flextoewijzer, either 'matching' (assignment problem over all
+# combinations of truck and order) or 'sequence' (greedy assignment in the original and the reversed order sequence)
+ASSIGNMENT_METHOD = 'matching'
+
+# Max. number of orders that are combined in a single ride of a flex truck. Orders can be combined if they share their
+# origin or destination and their rollcages fit in the truck. The best sequence of pickups and drops is found for up to
+# about 4 orders within a replan
+MAX_ORDERS_PER_RIDE = 2
+
+# Compute budget (seconds) of a single replan of the rolling-horizon flex planner
+REPLAN_TIME_BUDGET = 1.0
+
+# Max. number of routes of which the cumulative drive times are cached by the flextoewijzer. The least recently used
+# route is discarded when the cache is full
+ROUTE_CACHE_SIZE = 4096
+
+# Boolean indicating whether the scripts record the wall time, the number of calls and optionally the peak memory of the
+# hot paths (True) or not (False). A JSON summary of each run is written to PATH_INSTRUMENTATION
+BOOL_INSTRUMENTATION = False
+
+# Boolean indicating whether the peak memory of the hot paths is recorded with tracemalloc, which slows down the code
+BOOL_INSTRUMENTATION_MEMORY = False
+
+# Profiler used for instrumented runs, either None (no profile), 'cprofile' or 'pyinstrument'
+INSTRUMENTATION_PROFILER = None
+
+# Number of processes over which the days and parameter sets of a backtest are divided, all cores if None
+BACKTEST_N_WORKERS = None
+
+# Compute budget (seconds) of a single replan in a backtest. The budget is unlimited by default, so that every replan
+# evaluates all plans and the KPIs of a parameter set do not depend on the load of the machine
+BACKTEST_REPLAN_TIME_BUDGET = float('inf')
+
+# Parameters of the flextoewijzer (names in PySources.ModelParams) that can be varied in a backtest. Other parameters of
+# a backtest are set in this config, e.g. MAX_ORDERS_PER_RIDE or ASSIGNMENT_METHOD
+BACKTEST_MODEL_PARAMETERS = ('w1', 'w2', 'shift_extension', 'truck_cap', 'Afvoer_predictions')
+
+# Values of the parameters that are evaluated in a backtest, all combinations are evaluated for every day. Without
+# parameters, the days are run with the current parameters
+BACKTEST_PARAMETER_GRID = {}
+
+# Number of rows read at once from the input csv files, rows outside the process day are dropped after every chunk
+INGESTION_CHUNK_SIZE = 100000
+
+# Number of stochastic scenarios of the floor stock and the predicted afvoer evaluated by the scenario runner
+N_SCENARIOS = 1000
+
+# Max. deviation (#RC) of the floor stock from the predicted stock in the scenarios of the scenario runner
+SCENARIO_FLOOR_NOISE = 10
+
+# Standard deviation of the relative error of the predicted afvoer in the scenarios of the scenario runner
+SCENARIO_FORECAST_ERROR_SD = 0.2
+
+# Fraction of the scenarios for which the recommended number of flex orders of the scenario runner is sufficient
+SCENARIO_RISK_QUANTILE = 0.8
+
 # ----------------------------------------------------------------------------------------------------------------------
 # FILE PATHS
 # ----------------------------------------------------------------------------------------------------------------------
@@ -24,24 +115,37 @@ PATH_INPUT = f'{PATH_STORAGE}/input'
 PATH_ADDRESSES = f'{PATH_INPUT}/adressen_lijst.csv'
 PATH_DEPARTURE_TIMES = f'{PATH_INPUT}/final_departure_times.csv'
 PATH_DEPOT_DATA = f'{PATH_INPUT}/DepotData.xlsx'
+# Table of aliases of location names, shipped with the package
+PATH_LOCATION_ALIASES = os.path.join(os.path.dirname(__file__), 'data', 'location_aliases.csv')
 PATH_AFVOER = f'{PATH_INPUT}/31_01_2022/afvoerbehoefte_voorspeller_scenario_20220131_scans.csv'
 PATH_SCANS = f'{PATH_INPUT}/31_01_2022/afvoerbehoefte_voorspeller_scenario_20220131_scans.csv'
 PATH_TRANSPORT = f'{PATH_INPUT}/31_01_2022/VAR-20210131.csv'
 PATH_TRANSPORT_SIM = f'{PATH_INPUT}/simacan_example.xlsx'
 PATH_REGISTRATIE = f'{PATH_INPUT}/31_01_2022/31-01-2022 Registratie_mod.xlsx'
+# Input files of every day of a backtest, '{day}' is replaced by the process day
+PATH_BACKTEST_REGISTRATIE = f'{PATH_INPUT}/{{day:%d_%m_%Y}}/{{day:%d-%m-%Y}} Registratie_mod.xlsx'
+PATH_BACKTEST_TRANSPORT = f'{PATH_INPUT}/{{day:%d_%m_%Y}}/VAR_cleaned.csv'
+PATH_BACKTEST_ORDERS = f'{PATH_INPUT}/{{day:%d_%m_%Y}}/generated_orders.xlsx'
 
 # Interim files
 PATH_INTERIM = f'{PATH_STORAGE}/interim'
 PATH_AFVOER_BASELINE = f'{PATH_INTERIM}/afvoer_baseline.xlsx'
+PATH_AFVOER_BASELINE_STORE = f'{PATH_INTERIM}/afvoer_baseline'
 PATH_TRANSPORT_CLEANED = f'{PATH_INTERIM}/VAR.csv'
 PATH_TRANSPORT_SIM_CLEANED = f'{PATH_INTERIM}/SIM.csv'
+PATH_REFRESH_STATE = f'{PATH_INTERIM}/refresh_state.pkl'
+PATH_REFRESH_TRIGGER = f'{PATH_INTERIM}/refresh_trigger'
+PATH_DRIVE_TIME_CACHE = f'{PATH_INTERIM}/drive_time_cache'
 # Output files
 PATH_OUTPUT = f'{PATH_STORAGE}/output'
 PATH_AFVOER_ORDERS = f'{PATH_OUTPUT}/afvoer_orders.xlsx'
+PATH_SCENARIO_ORDERS = f'{PATH_OUTPUT}/scenario_orders.xlsx'
+PATH_BACKTEST_RESULTS = f'{PATH_OUTPUT}/backtest_results.xlsx'
 
 # Monitoring files
 PATH_MONITORING = f'{PATH_STORAGE}/monitoring'
 PATH_MONITORING_DATA = f'{PATH_OUTPUT}/my_monitoring_data.csv'
+PATH_INSTRUMENTATION = f'{PATH_MONITORING}/instrumentation'
 
 # ----------------------------------------------------------------------------------------------------------------------
 # MODEL PARAMETERS
@@ -52,7 +156,9 @@ rc_threshold_future = 48
 truck_capacity = 48
 w1 = 1
 process_day = datetime.date(2022, 1, 31)
+# Time window of the process day, relative to the start of process_day. This is the only definition of the process
+# window: predicted afvoer and inter transports outside this window are dropped while reading and preparing the data
+PROCESS_WINDOW_START = datetime.timedelta(hours=8)
+PROCESS_WINDOW_END = datetime.timedelta(hours=31)
 
-start_time = datetime.datetime(year=2021, month=3, day=8, hour=8)
-end_time = datetime.datetime(year=2021, month=3, day=9, hour=7)
 current_time = datetime.datetime(year=2022, month=2, day=1, hour=2)
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Module to read the predicted afvoer and the cleaned transport data with explicit types, in chunks.
+"""
+
+import datetime
+import logging
+
+import fsspec
+import pandas as pd
+
+from flex_package import config
+
+logger = logging.getLogger(__name__)
+
+# Types and time format of the predictions of the afvoerbehoeftevoorspeller
+AFVOER_DTYPES = {'origin': 'category', 'crossdock': 'category', 'rc_forecast': 'float64'}
+AFVOER_TIME_FORMAT = '%d/%m/%Y %H:%M'
+# Types and time format of the cleaned transport data of VAR and Simacan
+TRANSPORT_DTYPES = {'Afk laadlocatie': 'str', 'Afk loslocatie': 'str', 'RC groot equivalent gepland': 'float64'}
+TRANSPORT_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def get_process_window(process_day=None):
+    """Get the time window of a process day.
+
+    Args:
+        process_day: Date of the process day, defaults to process_day in config.
+
+    Returns:
+        Start and end time of the process day.
+    """
+
+    process_day = config.process_day if process_day is None else process_day
+    day_start = datetime.datetime.combine(process_day, datetime.time())
+    return day_start + config.PROCESS_WINDOW_START, day_start + config.PROCESS_WINDOW_END
+
+
+def read_csv_chunked(path, dtypes, time_column, time_format, start=None, end=None, chunksize=None, **kwargs):
+    """Read a csv file in chunks, keeping only the rows within a time window.
+
+    The time column is parsed per chunk with a single vectorized call, and rows outside the window are dropped before
+    the next chunk is read, so only the rows within the window are kept in memory. Categorical columns get the union
+    of the categories of all chunks.
+
+    Args:
+        path: Path of the csv file, either local or on S3.
+        dtypes: Types of the columns, columns that are not in the file are ignored.
+        time_column: Name of the column with the times.
+        time_format: Format of the times.
+        start: Rows before this time are dropped, no rows are dropped if None.
+        end: Rows at or after this time are dropped, no rows are dropped if None.
+        chunksize: Number of rows per chunk, defaults to INGESTION_CHUNK_SIZE in config.
+        **kwargs: Other arguments of pd.read_csv.
+
+    Returns:
+        Data set with the rows within the time window.
+    """
+
+    chunksize = config.INGESTION_CHUNK_SIZE if chunksize is None else chunksize
+    with fsspec.open(path, 'rb') as f:
+        columns = pd.read_csv(f, nrows=0, **kwargs).columns
+        f.seek(0)
+        dtypes = {column: dtype for column, dtype in dtypes.items() if column in columns}
+        chunks = []
+        n_rows = 0
+        for chunk in pd.read_csv(f, dtype=dtypes, chunksize=chunksize, **kwargs):
+            n_rows += len(chunk)
+            chunk[time_column] = pd.to_datetime(chunk[time_column], format=time_format)
+            if start is not None:
+                chunk = chunk[chunk[time_column] >= start]
+            if end is not None:
+                chunk = chunk[chunk[time_column] < end]
+            chunks.append(chunk)
+
+    categorical = [column for column, dtype in dtypes.items() if dtype == 'category']
+    for column in categorical:
+        categories = pd.api.types.union_categoricals([chunk[column] for chunk in chunks]).categories
+        chunks = [chunk.assign(**{column: chunk[column].cat.set_categories(categories)}) for chunk in chunks]
+    df = pd.concat(chunks, ignore_index=True)
+    logger.debug('Read %s of %s rows from %s', len(df), n_rows, path)
+    return df
+
+
+def read_time_range(path, time_column, time_format, chunksize=None, **kwargs):
+    """Read the first and last time of a csv file, e.g. to report the data range when no rows fall within a window.
+
+    Args:
+        path: Path of the csv file, either local or on S3.
+        time_column: Name of the column with the times.
+        time_format: Format of the times.
+        chunksize: Number of rows per chunk, defaults to INGESTION_CHUNK_SIZE in config.
+        **kwargs: Other arguments of pd.read_csv.
+
+    Returns:
+        First and last time in the file, None and None if the file has no rows.
+    """
+
+    chunksize = config.INGESTION_CHUNK_SIZE if chunksize is None else chunksize
+    first, last = None, None
+    with fsspec.open(path, 'rb') as f:
+        for chunk in pd.read_csv(f, usecols=[time_column], chunksize=chunksize, **kwargs):
+            times = pd.to_datetime(chunk[time_column], format=time_format)
+            if len(times) > 0:
+                first = times.min() if first is None else min(first, times.min())
+                last = times.max() if last is None else max(last, times.max())
+    return first, last
+
+
+def read_afvoer_csv(path, start=None, end=None, chunksize=None):
+    """Read the predictions of the afvoerbehoeftevoorspeller.
+
+    Args:
+        path: Path of the csv file.
+        start: Predictions before this time are dropped, no predictions are dropped if None.
+        end: Predictions at or after this time are dropped, no predictions are dropped if None.
+        chunksize: Number of rows per chunk, defaults to INGESTION_CHUNK_SIZE in config.
+
+    Returns:
+        Predicted afvoer for each depot, with categorical 'origin' and 'crossdock' columns.
+    """
+
+    return read_csv_chunked(path, AFVOER_DTYPES, 'date_time', AFVOER_TIME_FORMAT, start, end, chunksize)
+
+
+def read_transport_csv(path, start=None, end=None, chunksize=None):
+    """Read cleaned transport data of VAR or Simacan.
+
+    Args:
+        path: Path of the csv file.
+        start: Transports that are loaded before this time are dropped, no transports are dropped if None.
+        end: Transports that are loaded at or after this time are dropped, no transports are dropped if None.
+        chunksize: Number of rows per chunk, defaults to INGESTION_CHUNK_SIZE in config.
+
+    Returns:
+        Transport data.
+    """
+
+    return read_csv_chunked(path, TRANSPORT_DTYPES, 'loading_time', TRANSPORT_TIME_FORMAT, start, end, chunksize,
+                            sep=',')
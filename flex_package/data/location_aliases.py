@@ -0,0 +1,79 @@
+"""
+Module with the table of aliases of location names, used by all data cleaners to normalize locations.
+"""
+
+import functools
+
+import pandas as pd
+
+from flex_package import config
+
+
+@functools.lru_cache(maxsize=None)
+def read_location_aliases(path=None):
+    """Read the table of location aliases and compile it into a dictionary per scope.
+
+    The table has a row per alias, with the scope in which the alias is used (e.g. 'registration' for the registration
+    documents of control room, 'sim_code' for the location codes of Simacan), the alias and the normalized location. A
+    name can be an alias in one scope and a normalized location in another, e.g. 'TIEL' and 'TL'. The table is read
+    once per path.
+
+    Args:
+        path: Path of the csv file with the aliases, defaults to PATH_LOCATION_ALIASES in config.
+
+    Returns:
+        Dictionary with for each scope a dictionary from alias to location.
+    """
+
+    path = config.PATH_LOCATION_ALIASES if path is None else path
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return {scope: dict(zip(df_scope['alias'], df_scope['location'])) for scope, df_scope in df.groupby('scope')}
+
+
+def get_location_aliases(scope):
+    """Get the aliases of a scope.
+
+    Args:
+        scope: Scope of the aliases.
+
+    Returns:
+        Dictionary from alias to location.
+    """
+
+    return read_location_aliases().get(scope, dict())
+
+
+def normalize_locations(locations: pd.Series, scope: str, extra_aliases: dict = None,
+                        default: pd.Series = None) -> pd.Series:
+    """Replace the aliases of a scope by their locations, in a single pass over the data.
+
+    Args:
+        locations: Location names.
+        scope: Scope of the aliases.
+        extra_aliases: Additional aliases, e.g. read from another source. Aliases of the scope take precedence.
+        default: Values for the names that are not an alias, these names are kept if None.
+
+    Returns:
+        Normalized location names.
+    """
+
+    aliases = get_location_aliases(scope)
+    if extra_aliases:
+        aliases = {**extra_aliases, **aliases}
+    normalized = locations.map(aliases)
+    return normalized.where(locations.isin(list(aliases)), locations if default is None else default)
+
+
+def get_location_codes(names: pd.Series, scope: str, separator: str) -> pd.Series:
+    """Get the location codes from names that start with the code, e.g. 'ASD-CD'.
+
+    Args:
+        names: Location names.
+        scope: Scope of the aliases of the codes.
+        separator: Separator between the code and the rest of the name.
+
+    Returns:
+        Location codes, where aliases are replaced.
+    """
+
+    return normalize_locations(names.str.split(separator).str[0], scope)
@@ -8,6 +8,8 @@ import pandera as pa
 from pandera.typing import DataFrame
 import datetime
 
+from flex_package.data.ingestion import get_process_window
+from flex_package.data.location_aliases import get_location_codes, normalize_locations
 from flex_package.data.schemas import OutSchema
 from flex_package import config
 
@@ -100,22 +102,18 @@ def set_datetime_column(data: pd.DataFrame) -> pd.DataFrame:
 
 
 def add_destination(data: pd.DataFrame) -> pd.DataFrame:
-    """Add datetime columns.
+    """Add the destination of each stop, which is the location of the next stop of the same ride.
 
     Args:
-        data: Data set to be converted.
+        data: Data set with the stops of all rides.
 
     Returns:
-        Input data set with datetime columns.
+        Input data set sorted by ride and stop, with a destination column. The last stop of each ride and incomplete
+        rows are dropped.
     """
 
-    data['destination'] = None
-    data.sort_values(by=['Ritid', 'Stoplabel'], inplace=True)
-    data.reset_index(inplace=True, drop=True)
-    for ind, row in data.iterrows():
-        if ind < len(data) - 1:
-            if row['Ritid'] == data.loc[ind + 1, 'Ritid']:
-                data.loc[ind, 'destination'] = data.loc[ind + 1, 'Locatienaam']
+    data = data.sort_values(by=['Ritid', 'Stoplabel']).reset_index(drop=True)
+    data['destination'] = data.groupby('Ritid', sort=False)['Locatienaam'].shift(-1)
     data.dropna(axis=0, how='any', inplace=True)
     return data
 
@@ -149,35 +147,60 @@ def select_inter(data: pd.DataFrame) -> pd.DataFrame:
 
 
 def filter_by_time(data: pd.DataFrame) -> pd.DataFrame:
-    data = data[data['loading_time'] > config.start_time]
-    data = data[data['loading_time'] < config.end_time]
+    """Keep the transports that are loaded within the process window, see 'get_process_window'.
+
+    Args:
+        data: Data set with loading times.
+
+    Returns:
+        Input data set with the transports within the process window.
+    """
+
+    window_start, window_end = get_process_window()
+    data = data[data['loading_time'] >= window_start]
+    data = data[data['loading_time'] < window_end]
 
     return data
 
 
 def rename_locations(data: pd.DataFrame) -> pd.DataFrame:
-    data['Afk laadlocatie'] = data['Laadlocatie korte naam'].str.split('-').str[0]
-    data['Afk loslocatie'] = data['Loslocatie korte naam'].str.split('-').str[0]
-    data.loc[data['Loslocatie korte naam'] == 'EX-WW-KG', 'Afk loslocatie'] = 'XWW'
-    data.loc[data['Laadlocatie korte naam'] == 'EX-WW-KG', 'Afk laadlocatie'] = 'XWW'
-    data.loc[data['Loslocatie korte naam'] == 'ASD-CD', 'Afk loslocatie'] = 'XASD'
-    data.loc[data['Laadlocatie korte naam'] == 'ASD-CD', 'Afk laadlocatie'] = 'XASD'
-    data.loc[data['Loslocatie naam'] == 'Crossdock Tiel', 'Afk loslocatie'] = 'TL'
-    data.loc[data['Laadlocatie naam'] == 'Crossdock Tiel', 'Afk laadlocatie'] = 'TL'
+    """Add the location codes of the loading and unloading locations of VAR.
+
+    The code is the first part of the short name of a location, unless the short name or the name is an alias in the
+    location alias table.
+
+    Args:
+        data: Data set with the names and short names of the locations.
+
+    Returns:
+        Input data set with the location codes.
+    """
+
+    for column, short_name, name in [('Afk laadlocatie', 'Laadlocatie korte naam', 'Laadlocatie naam'),
+                                     ('Afk loslocatie', 'Loslocatie korte naam', 'Loslocatie naam')]:
+        codes = normalize_locations(data[short_name], 'var_short_name',
+                                    default=data[short_name].str.split('-').str[0])
+        data[column] = normalize_locations(data[name], 'var_name', default=codes)
 
     return data
 
 
 def convert_locations(data: pd.DataFrame, depot_data: pd.DataFrame) -> pd.DataFrame:
-    data['Locatienaam'] = data['Locatienaam'].apply(lambda x: x.upper())
-    data['destination'] = data['destination'].apply(lambda x: x.upper())
-    data.replace(to_replace='CROSSDOCK AMSTERDAM', value='XASD', inplace=True)
-    data.replace(to_replace='CROSSDOCK WAALWIJK', value='XWW', inplace=True)
-    data.replace(to_replace=list(depot_data['SIM_NAME']), value=list(depot_data['Afk']), inplace=True)
-    data['Afk laadlocatie'] = data['Locatienaam'].str.split('-').str[0]
-    data['Afk laadlocatie'] = data['Afk laadlocatie'].replace(to_replace='TL', value='TIEL')
-    data['Afk loslocatie'] = data['destination'].str.split('-').str[0]
-    data['Afk loslocatie'] = data['Afk loslocatie'].replace(to_replace='TL', value='TIEL')
+    """Normalize the Simacan location names, and add the location codes of the loading and unloading locations.
+
+    Args:
+        data: Data set with the location and destination of each stop.
+        depot_data: Depot data, with the Simacan name of each depot and its code.
+
+    Returns:
+        Input data set with normalized names and the location codes.
+    """
+
+    depot_aliases = dict(zip(depot_data['SIM_NAME'], depot_data['Afk']))
+    for column in ['Locatienaam', 'destination']:
+        data[column] = normalize_locations(data[column].str.upper(), 'sim_name', depot_aliases)
+    data['Afk laadlocatie'] = get_location_codes(data['Locatienaam'], 'sim_code', '-')
+    data['Afk loslocatie'] = get_location_codes(data['destination'], 'sim_code', '-')
     return data
 
 
@@ -0,0 +1,148 @@
+"""
+Module to generate synthetic input data of a configurable network size, used for benchmarks and tests.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def get_depots(n_depots):
+    """Get the codes of synthetic depots.
+
+    Args:
+        n_depots: Number of depots.
+
+    Returns:
+        List of depot codes.
+    """
+
+    return [f'D{i:03d}' for i in range(n_depots)]
+
+
+def get_crossdocks(n_crossdocks):
+    """Get the codes of synthetic crossdocks.
+
+    Args:
+        n_crossdocks: Number of crossdocks.
+
+    Returns:
+        List of crossdock codes.
+    """
+
+    return [f'X{i:03d}' for i in range(n_crossdocks)]
+
+
+def generate_afvoer(depots, crossdocks, n_intervals, start, mean_forecast=6, seed=0):
+    """Generate predictions of the afvoerbehoeftevoorspeller.
+
+    Args:
+        depots: Codes of the depots of origin.
+        crossdocks: Codes of the destinations.
+        n_intervals: Number of 15 minute intervals of the process.
+        start: Time of the first interval.
+        mean_forecast: Mean predicted number of RC per interval, per combination of depot and destination.
+        seed: Seed of the random generator.
+
+    Returns:
+        Predicted afvoer, in the format of 'mf.read_afvoer_data'.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_pairs = len(depots) * len(crossdocks)
+    times = pd.date_range(start, periods=n_intervals, freq='15min')
+    return pd.DataFrame({
+        'date_time': np.tile(times, n_pairs),
+        'origin': np.repeat(depots, len(crossdocks) * n_intervals),
+        'crossdock': np.tile(np.repeat(crossdocks, n_intervals), len(depots)),
+        'rc_forecast': rng.poisson(mean_forecast, n_pairs * n_intervals).astype(float)})
+
+
+def generate_inter_transports(depots, crossdocks, n_intervals, start, transports_per_pair=4, seed=0):
+    """Generate planned inter transports between the depots and crossdocks.
+
+    Args:
+        depots: Codes of the depots of origin.
+        crossdocks: Codes of the destinations.
+        n_intervals: Number of 15 minute intervals of the process.
+        start: Time of the first interval.
+        transports_per_pair: Number of planned transports per combination of depot and destination.
+        seed: Seed of the random generator.
+
+    Returns:
+        Planned inter transports, in the format of 'mf.read_cleaned_SIM_data'.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_transports = len(depots) * len(crossdocks) * transports_per_pair
+    minutes = rng.integers(0, 15 * n_intervals, n_transports)
+    return pd.DataFrame({
+        'loading_time': pd.Timestamp(start) + pd.to_timedelta(minutes, unit='min'),
+        'Afk laadlocatie': np.repeat(depots, len(crossdocks) * transports_per_pair),
+        'Afk loslocatie': np.tile(np.repeat(crossdocks, transports_per_pair), len(depots)),
+        'RC groot equivalent gepland': 48.0,
+        'Dagorder nummer': np.arange(n_transports),
+        'Status': 'Gepland'})
+
+
+def generate_registration_orders(origins, destinations, n_orders, start, end, seed=0):
+    """Generate afvoertekorten as registered by control room.
+
+    Args:
+        origins: Locations at which orders can start.
+        destinations: Locations to which orders can go.
+        n_orders: Number of orders.
+        start: Earliest time of an order.
+        end: Latest time of an order.
+        seed: Seed of the random generator.
+
+    Returns:
+        Afvoertekorten, in the format of 'ff.read_tekorten'.
+    """
+
+    rng = np.random.default_rng(seed)
+    destinations = np.asarray(destinations)
+    origin = rng.choice(origins, n_orders)
+    destination_ids = rng.integers(0, len(destinations), n_orders)
+    destination = destinations[destination_ids]
+    # Orders from a location to itself are sent to the next destination
+    same = origin == destination
+    destination[same] = destinations[(destination_ids[same] + 1) % len(destinations)]
+    seconds = np.sort(rng.integers(0, int((end - start).total_seconds()), n_orders))
+    prios = rng.multinomial(48, [0.4, 0.3, 0.2, 0.1], n_orders)
+    return pd.DataFrame({
+        'Tijd': [start + datetime.timedelta(seconds=int(s)) for s in seconds],
+        'Van': origin,
+        'Naar': destination,
+        'A': prios[:, 0],
+        'B': prios[:, 1],
+        'C': prios[:, 2],
+        'D': prios[:, 3],
+        'BE': 0,
+        'Totaal': prios.sum(axis=1),
+        'Status': 'Open',
+        'Oplossing': None})
+
+
+def generate_flex_trucks(bases, n_trucks, start, shift_hours=8, seed=0):
+    """Generate the flex trucks that are available for the process day.
+
+    Args:
+        bases: Locations at which trucks can start their shift.
+        n_trucks: Number of trucks.
+        start: Earliest start of a shift.
+        shift_hours: Length of a shift.
+        seed: Seed of the random generator.
+
+    Returns:
+        Flex trucks, in the format used by 'ff.generate_trucks'.
+    """
+
+    rng = np.random.default_rng(seed)
+    shift_start = [start + datetime.timedelta(minutes=int(m)) for m in rng.integers(0, 4 * 60, n_trucks)]
+    return pd.DataFrame({
+        'Flex ': [f'{base} {i + 1}' for i, base in enumerate(rng.choice(bases, n_trucks))],
+        'ShiftStart': shift_start,
+        'ShiftEnd': [time + datetime.timedelta(hours=shift_hours) for time in shift_start],
+        'External': rng.random(n_trucks) < 0.5})
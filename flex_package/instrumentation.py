@@ -0,0 +1,286 @@
+"""
+Module with opt-in instrumentation of the hot paths: wall time, call counts and peak memory per function, a JSON summary
+per run and optional profiler dumps.
+"""
+
+import contextlib
+import cProfile
+import datetime
+import functools
+import json
+import logging
+import marshal
+import posixpath
+import threading
+import tracemalloc
+from time import perf_counter
+
+import fsspec
+
+from flex_package import config
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation is only active within 'instrumented_run', or after calling 'enable'
+_enabled = False
+_track_memory = False
+_lock = threading.Lock()
+_local = threading.local()   # Stack of memory frames of the instrumented calls of each thread
+_records = dict()   # Statistics of each instrumented function, by name
+_labels = dict()   # Wall time of each labelled call, by name and label (e.g. a combination of depot and destination)
+
+
+def enable(track_memory=False):
+    """Enable instrumentation and clear the recorded statistics.
+
+    Args:
+        track_memory: Whether the peak memory of each call is recorded with tracemalloc. This slows down the code
+            considerably, so it should only be used to find the functions that use the most memory.
+    """
+
+    global _enabled, _track_memory
+    reset()
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+
+def disable():
+    """Disable instrumentation. The recorded statistics are kept until the next call of 'enable'."""
+
+    global _enabled, _track_memory
+    _enabled = False
+    if _track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _track_memory = False
+
+
+def is_enabled() -> bool:
+    """Returns: whether instrumentation is enabled."""
+
+    return _enabled
+
+
+def reset():
+    """Clear the recorded statistics."""
+
+    with _lock:
+        _records.clear()
+        _labels.clear()
+
+
+def _enter_memory():
+    """Start measuring the peak memory of a call. Nested calls pass their peak on to the calling frame."""
+
+    current, peak = tracemalloc.get_traced_memory()
+    stack = _local.__dict__.setdefault('stack', [])
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    stack.append([current, current])
+
+
+def _exit_memory():
+    """Stop measuring the peak memory of a call.
+
+    Returns:
+        Peak memory (bytes) allocated during the call, on top of the memory in use at its start.
+    """
+
+    _, peak = tracemalloc.get_traced_memory()
+    start, frame_peak = _local.stack.pop()
+    frame_peak = max(frame_peak, peak)
+    if _local.stack:
+        _local.stack[-1][1] = max(_local.stack[-1][1], frame_peak)
+    return frame_peak - start
+
+
+def _record(name, duration, memory=None, label=None):
+    """Add a call to the statistics of a function."""
+
+    with _lock:
+        record = _records.setdefault(name, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        record['calls'] += 1
+        record['total_seconds'] += duration
+        record['max_seconds'] = max(record['max_seconds'], duration)
+        if memory is not None:
+            record['peak_memory_bytes'] = max(record.get('peak_memory_bytes', 0), memory)
+        if label is not None:
+            labels = _labels.setdefault(name, dict())
+            labels[label] = labels.get(label, 0.0) + duration
+
+
+@contextlib.contextmanager
+def timed(name, label=None):
+    """Context manager that records the wall time (and peak memory) of a block of code under a name.
+
+    Args:
+        name: Name under which the block is recorded, e.g. a phase of a script.
+        label: Optional label of the call, e.g. a combination of depot and destination. The wall time is also recorded
+            per label, so the slowest labels can be found.
+    """
+
+    if not _enabled:
+        yield
+        return
+    track_memory = _track_memory
+    if track_memory:
+        _enter_memory()
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        duration = perf_counter() - started
+        _record(name, duration, _exit_memory() if track_memory else None, label)
+
+
+def instrument(func=None, *, name=None):
+    """Decorator that records the wall time, the number of calls (and the peak memory) of a function. When
+    instrumentation is disabled, the only overhead is a check of a flag.
+
+    Args:
+        func: Function to instrument.
+        name: Name under which the function is recorded, defaults to the module and name of the function.
+
+    Returns:
+        Instrumented function.
+    """
+
+    if func is None:
+        return functools.partial(instrument, name=name)
+    name = f'{func.__module__.rsplit(".", 1)[-1]}.{func.__name__}' if name is None else name
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with timed(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def get_summary():
+    """Get the recorded statistics.
+
+    Returns:
+        Dictionary with for each function the number of calls, the total, mean and max. wall time (seconds) and the peak
+        memory (bytes) if recorded, sorted by total wall time, and the wall time per label of the labelled calls.
+    """
+
+    with _lock:
+        functions = {name: dict(record, mean_seconds=record['total_seconds'] / record['calls'])
+                     for name, record in sorted(_records.items(), key=lambda item: -item[1]['total_seconds'])}
+        labels = {name: dict(sorted(name_labels.items(), key=lambda item: -item[1]))
+                  for name, name_labels in _labels.items()}
+    return {'functions': functions, 'labels': labels}
+
+
+def _open(path, mode):
+    """Open a file for writing, creating its directory if needed.
+
+    Args:
+        path: Path of the file, either local or on S3.
+        mode: Mode in which the file is opened.
+
+    Returns:
+        File object.
+    """
+
+    fs, file = fsspec.core.url_to_fs(path)
+    fs.makedirs(posixpath.dirname(file), exist_ok=True)
+    return fs.open(file, mode)
+
+
+def write_summary(summary, path):
+    """Write a summary to a JSON file.
+
+    Args:
+        summary: Summary, e.g. obtained with 'get_summary'.
+        path: Path of the JSON file, either local or on S3.
+    """
+
+    with _open(path, 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+
+
+@contextlib.contextmanager
+def profiled(path, profiler='cprofile'):
+    """Context manager that profiles a block of code and writes the profile to a file.
+
+    Args:
+        path: Path of the profile, a cProfile stats file or a pyinstrument HTML report.
+        profiler: 'cprofile' or 'pyinstrument'. If pyinstrument is not installed, cProfile is used.
+    """
+
+    if profiler == 'pyinstrument' and PyinstrumentProfiler is None:
+        logger.warning('pyinstrument is not installed, profiling with cProfile instead')
+        profiler = 'cprofile'
+    if profiler == 'pyinstrument':
+        pyinstrument_profiler = PyinstrumentProfiler()
+        pyinstrument_profiler.start()
+        try:
+            yield
+        finally:
+            pyinstrument_profiler.stop()
+            with _open(path, 'w') as f:
+                f.write(pyinstrument_profiler.output_html())
+    elif profiler == 'cprofile':
+        cprofile_profiler = cProfile.Profile()
+        cprofile_profiler.enable()
+        try:
+            yield
+        finally:
+            cprofile_profiler.disable()
+            cprofile_profiler.create_stats()
+            with _open(path, 'wb') as f:
+                f.write(marshal.dumps(cprofile_profiler.stats))
+    else:
+        raise ValueError(f"Unknown profiler '{profiler}', use 'cprofile' or 'pyinstrument'")
+
+
+@contextlib.contextmanager
+def instrumented_run(run_name, budget=None):
+    """Context manager for a run of a script. If BOOL_INSTRUMENTATION is set in config, the instrumented functions are
+    recorded during the run, and a JSON summary is written to PATH_INSTRUMENTATION at the end, together with a profile
+    if INSTRUMENTATION_PROFILER is set. Otherwise, the run is not instrumented.
+
+    Calls in other processes (e.g. the workers of a process pool) are not recorded.
+
+    Args:
+        run_name: Name of the run, used in the file names.
+        budget: Time budget (seconds) of the run, a warning is logged if the run takes longer.
+    """
+
+    if not config.BOOL_INSTRUMENTATION:
+        yield
+        return
+    started_at = datetime.datetime.now()
+    prefix = f'{config.PATH_INSTRUMENTATION}/{run_name}_{started_at:%Y%m%d_%H%M%S}'
+    enable(config.BOOL_INSTRUMENTATION_MEMORY)
+    started = perf_counter()
+    try:
+        if config.INSTRUMENTATION_PROFILER is None:
+            yield
+        else:
+            html = config.INSTRUMENTATION_PROFILER == 'pyinstrument' and PyinstrumentProfiler is not None
+            extension = 'html' if html else 'prof'
+            with profiled(f'{prefix}.{extension}', config.INSTRUMENTATION_PROFILER):
+                yield
+    finally:
+        wall_time = perf_counter() - started
+        summary = dict(run=run_name, started_at=started_at.isoformat(timespec='seconds'), wall_seconds=wall_time,
+                       budget_seconds=budget, **get_summary())
+        disable()
+        write_summary(summary, f'{prefix}.json')
+        if budget is not None and wall_time > budget:
+            logger.warning('%s took %.1f s, budget is %.1f s, see %s.json', run_name, wall_time, budget, prefix)
+        else:
+            logger.info('%s took %.1f s, instrumentation summary written to %s.json', run_name, wall_time, prefix)
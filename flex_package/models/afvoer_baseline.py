@@ -1,59 +1,75 @@
 import pandas as pd
 import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+import flex_package.data.ingestion as ingestion
 import flex_package.config as config
+import flex_package.instrumentation as instrumentation
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@instrumentation.instrumented_run('afvoer_baseline')
 def main():
     logger.info('Baseline computation - started')
-    # Read data from 'afvoerbehoeftevoorspeller'
-    afvoer_behoefte = mf.read_afvoer_data(config.PATH_AFVOER)
+    # Read data from 'afvoerbehoeftevoorspeller' for the process day
+    window_start, window_end = ingestion.get_process_window()
+    logger.info('Baseline computation - process window %s - %s', window_start, window_end)
+    afvoer_behoefte = mf.read_afvoer_data(config.PATH_AFVOER, window_start, window_end)
+    if len(afvoer_behoefte) == 0:
+        first, last = ingestion.read_time_range(config.PATH_AFVOER, 'date_time', ingestion.AFVOER_TIME_FORMAT)
+        raise ValueError(f'No predicted afvoer in the process window {window_start} - {window_end}, the predictions in '
+                         f'{config.PATH_AFVOER} run from {first} to {last}. Check process_day and the process window '
+                         f'in config')
 
-    # Read VAR data for inter transport between the start and end time considered in the script
+    # Read VAR data for inter transport within the process window
     path_VAR = config.PATH_TRANSPORT_CLEANED
-    inter_transports = mf.read_cleaned_VAR_data(path_VAR)
+    inter_transports = mf.read_cleaned_VAR_data(path_VAR, window_start, window_end)
+    if len(inter_transports) == 0:
+        first, last = ingestion.read_time_range(path_VAR, 'loading_time', ingestion.TRANSPORT_TIME_FORMAT, sep=',')
+        logger.warning('Baseline computation - no inter transports in the process window %s - %s, the transports in '
+                       '%s run from %s to %s', window_start, window_end, path_VAR, first, last)
     origin_list = afvoer_behoefte['origin'].unique()
 
+    # Below we consider all combinations of depot and destination. For each combination, we get the expected generated
+    # RC per 15 min. interval, and the planned inter transports. These are combined to estimate the number of RC present
+    # on the floor for each depot and destination. This estimate is made per 15 minute interval.
     # Initialize DataFrame with the total deficit or surplus of transport for each depot-crossdock combination
-    stock_dict = dict()    # Dictionary with the estimated number of RC present on the depot floor for all
-                           # combinations of depot and destination
-
-    # The loops below run over all combinations of depot and destination. For each combination, we get the expected
-    # generated RC per 15 min. interval, and the planned inter transports. These are combined to estimate the number of
-    # RC present on the floor for each depot and destination. This estimate is made per 15 minute interval.
     transport_deficiency = pd.DataFrame(0, index=origin_list, columns=afvoer_behoefte['crossdock'].unique())
     total_transport_diff = pd.DataFrame(0, index=origin_list, columns=afvoer_behoefte['crossdock'].unique())
-    for Origin in origin_list:   # Loop over depots
-        destination_list = mf.generate_destinations(Origin, afvoer_behoefte)   # List of possible destinations
-        for Destination in destination_list:     # Loop over destinations
-            # Obtain expected generated RC based on afvoerbehoeftevoorsp.
-            df_afvoer = mf.generate_afvoer_df(Origin, Destination, afvoer_behoefte)
-            # Obtain planned inter transports
-            df_inter = mf.generate_inter_df(Origin, Destination, inter_transports)
-            # Combine afvoer predictions and planned transports to predict number of RC on the depot floor
-            df_stock = mf.generate_stock_prediction(df_afvoer, df_inter)
-            # Save the stock prediction for this direction in a dict with the predictions for all directions
-            stock_dict[(Origin, Destination)] = df_stock
-            # Save the deficiency in transport (0 if sufficient transport)
-            transport_deficiency.loc[Origin, Destination] = df_stock['stock'].iloc[-1]
-            # Save the total surplus or deficiency in transport assuming all trucks are filled completely (negative if
-            # there is more transport than RC produced)
-            total_transport_diff.loc[Origin, Destination] = sum(df_stock['rc_forecast'])
+    destination_dict = mf.generate_destination_dict(afvoer_behoefte)   # Lists of possible destinations per depot
+    pairs = [(Origin, Destination) for Origin in origin_list for Destination in destination_dict[Origin]]
+    # Combine afvoer predictions and planned transports to predict number of RC on the depot floor. This gives a
+    # dictionary with the estimated number of RC on the floor for all combinations of depot and destination
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    for Origin, Destination in pairs:
+        df_stock = stock_dict[(Origin, Destination)]
+        # Save the deficiency in transport (0 if sufficient transport)
+        transport_deficiency.loc[Origin, Destination] = df_stock['stock'].iloc[-1]
+        # Save the total surplus or deficiency in transport assuming all trucks are filled completely (negative if
+        # there is more transport than RC produced)
+        total_transport_diff.loc[Origin, Destination] = sum(df_stock['rc_forecast'])
+    # Summary of the above in long format, with one row per combination of depot and destination
+    df_summary = pd.DataFrame({
+        'origin': [Origin for Origin, Destination in pairs],
+        'destination': [Destination for Origin, Destination in pairs],
+        'expected_afvoertekort': [transport_deficiency.loc[pair] for pair in pairs],
+        'total_transport_deficiency': [total_transport_diff.loc[pair] for pair in pairs]})
 
     logger.info('Baseline computation - ended')
 
-    # Below we write the results to an excel file
-    baseline_path = config.PATH_AFVOER_BASELINE
-    with pd.ExcelWriter(baseline_path) as writer:
-        transport_deficiency.to_excel(writer, sheet_name='expected afvoertekort')
-        total_transport_diff.to_excel(writer, sheet_name='total_transport_deficiency')
-        for Origin in origin_list:
-            destination_list = mf.generate_destinations(Origin, afvoer_behoefte)
-            for Destination in destination_list:
-                stock_dict[(Origin, Destination)].to_excel(writer, sheet_name=str(Origin) + '-' + str(Destination), index=False)
+    # Below we write the results to the columnar baseline store, which is read by 'generate_orders'
+    mf.write_baseline_store(stock_dict, df_summary, config.PATH_AFVOER_BASELINE_STORE)
     logger.info('Baseline computation - results saved')
 
+    # Optionally, the results are also exported to an excel file for Control Room
+    if config.BOOL_EXPORT_EXCEL:
+        with pd.ExcelWriter(config.PATH_AFVOER_BASELINE) as writer:
+            transport_deficiency.to_excel(writer, sheet_name='expected afvoertekort')
+            total_transport_diff.to_excel(writer, sheet_name='total_transport_deficiency')
+            for Origin, Destination in pairs:
+                stock_dict[(Origin, Destination)].to_excel(writer, sheet_name=str(Origin) + '-' + str(Destination),
+                                                           index=False)
+        logger.info('Baseline computation - results exported to excel')
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,305 @@
+"""
+Backtest of the flextoewijzer over a range of historical process days. Every day is replayed with the rolling-horizon
+flex planner for every combination of parameters in the parameter grid, and the KPIs of the days are aggregated per
+combination of parameters. The days and parameters are independent, so they are run in parallel in a pool of processes.
+
+Usage:
+    python -m flex_package.models.backtest 2021-10-01 2022-03-31 --grid w2=0,0.5,1 MAX_ORDERS_PER_RIDE=2,3
+"""
+
+import flex_package.models.modelfunctions.flextoewijzer_functions as ff
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+import flex_package.models.modelfunctions.parallel_functions as pf
+import flex_package.data.ingestion as ingestion
+import flex_package.config as config
+import flex_package.instrumentation as instrumentation
+from flex_package.models.flex_planner import RollingHorizonPlanner
+import argparse
+import ast
+import datetime
+import fsspec
+import itertools
+import logging
+import os
+import pandas as pd
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# KPIs of a day that are summed over the days of a combination of parameters, the max. replan time is the max. over the
+# days
+SUM_COLUMNS = ['n_orders', 'n_solved', 'rc_orders', 'rc_solved', 'rc_on_time', 'n_rides', 'n_trucks', 'n_trucks_used',
+               'busy_hours', 'shift_hours', 'n_inter_transports', 'rc_inter_transports', 'runtime_seconds']
+
+
+def get_day_files(day):
+    """
+    Find the input files of a process day of the backtest
+    Args:
+        day: process day
+
+    Returns:
+        dictionary with the path of the registration ('registratie'), the cleaned VAR data ('transport') and the
+        generated orders ('orders') of the day, None if the file does not exist
+
+    """
+    files = dict()
+    for name, template in [('registratie', config.PATH_BACKTEST_REGISTRATIE),
+                           ('transport', config.PATH_BACKTEST_TRANSPORT),
+                           ('orders', config.PATH_BACKTEST_ORDERS)]:
+        path = template.format(day=day)
+        fs, fs_path = fsspec.core.url_to_fs(path)
+        files[name] = path if fs.exists(fs_path) else None
+    return files
+
+
+def get_parameter_sets(grid):
+    """
+    Get all combinations of the values of the parameters in a grid
+    Args:
+        grid: dictionary with a list of values for each parameter
+
+    Returns:
+        list of dictionaries with a value for each parameter, a single empty dictionary if the grid is empty
+
+    """
+    return [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+
+
+def parse_grid(arguments):
+    """
+    Parse the parameter grid from the command line
+    Args:
+        arguments: list of strings 'name=value1,value2,...'. Values are read as Python literals where possible, e.g.
+            'w2=0,0.5,1' or 'ASSIGNMENT_METHOD=matching,sequence'
+
+    Returns:
+        dictionary with a list of values for each parameter
+
+    """
+    grid = dict()
+    for argument in arguments:
+        name, _, values = argument.partition('=')
+        if not values:
+            raise ValueError(f"Parameter '{argument}' has no values, use 'name=value1,value2,...'")
+        grid[name.strip()] = [parse_value(value.strip()) for value in values.split(',')]
+    return grid
+
+
+def parse_value(value):
+    """
+    Read a value from the command line as a Python literal, or as a string if it is not a literal
+    """
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def get_parameter_module(name):
+    """
+    Get the module in which a parameter of the flextoewijzer is set. Parameters in BACKTEST_MODEL_PARAMETERS are set in
+    the model parameters (mp), the other parameters in config
+    Args:
+        name: name of the parameter
+
+    Returns:
+        module with the parameter, a ValueError is raised if the parameter is unknown
+
+    """
+    module = ff.mp if name in config.BACKTEST_MODEL_PARAMETERS else config
+    if not hasattr(module, name):
+        raise ValueError(f"Unknown backtest parameter '{name}'")
+    return module
+
+
+def set_parameters(parameters):
+    """
+    Set the parameters of the flextoewijzer, see 'get_parameter_module'. All names are checked before any parameter is
+    set, so an unknown name leaves the parameters unchanged
+    Args:
+        parameters: dictionary with the value of each parameter
+
+    Returns:
+        dictionary with the previous value of each parameter, to restore the parameters after a run
+
+    """
+    modules = {name: get_parameter_module(name) for name in parameters}
+    previous = {name: getattr(module, name) for name, module in modules.items()}
+    for name, value in parameters.items():
+        setattr(modules[name], name, value)
+    return previous
+
+
+def compute_kpis(planner):
+    """
+    Compute the KPIs of a day that was replayed with the flex planner. The proportion on time of a ride is computed with
+    'ff.check_order_time' at the arrival of the truck at the first pickup, as when the truck was selected
+    Args:
+        planner: RollingHorizonPlanner of which all events are processed
+
+    Returns:
+        dictionary with the numbers of orders and rollcages (solved), the rollcages expected to be on time, the
+        number of rides, the number of trucks (used), and the hours that the trucks are busy with rides and in shift
+
+    """
+    orders = [order for combination in planner.fulfilled_orders + planner.unfulfilled_orders for order in combination]
+    rc_on_time = sum(ff.check_order_time(combination, pickup_time) * ff.get_order_size(combination)
+                     for combination, _, _, pickup_time, _ in planner.rides)
+    busy_time = sum((arrival_time - dispatch_time for _, _, dispatch_time, _, arrival_time in planner.rides),
+                    datetime.timedelta(0))
+    shift_time = sum((truck.End - truck.Start for truck in planner.trucks), datetime.timedelta(0))
+    return {
+        'n_orders': len(orders),
+        'n_solved': sum(order.Fulfilled for order in orders),
+        'rc_orders': sum(order.Ntot for order in orders),
+        'rc_solved': sum(order.Ntot for order in orders if order.Fulfilled),
+        'rc_on_time': rc_on_time,
+        'n_rides': len(planner.rides),
+        'n_trucks': len(planner.trucks),
+        'n_trucks_used': len({truck.Name for _, truck, _, _, _ in planner.rides}),
+        'busy_hours': busy_time / datetime.timedelta(hours=1),
+        'shift_hours': shift_time / datetime.timedelta(hours=1),
+        'max_replan_seconds': max(planner.replan_durations, default=0)}
+
+
+def add_kpi_ratios(df):
+    """
+    Add the proportions of orders and rollcages solved, the proportion of solved rollcages on time, and the utilisation
+    of the trucks (busy hours over shift hours) to a table of KPIs
+    Args:
+        df: df with the KPIs of 'compute_kpis', per day or summed over days
+
+    Returns:
+        df with the proportions added
+
+    """
+    return df.assign(prop_solved=df['n_solved'] / df['n_orders'],
+                     prop_rc_solved=df['rc_solved'] / df['rc_orders'],
+                     prop_on_time=df['rc_on_time'] / df['rc_solved'],
+                     utilisation=df['busy_hours'] / df['shift_hours'])
+
+
+def run_day(day, parameters, files):
+    """
+    Replay a process day with the flex planner for a combination of parameters, and compute the KPIs of the day. The
+    replans get the compute budget BACKTEST_REPLAN_TIME_BUDGET, so that the runs are deterministic. The parameters are
+    restored afterwards. A day that fails is logged and skipped, so that a single day cannot stop a long backtest
+    Args:
+        day: process day
+        parameters: dictionary with the value of each parameter, see 'set_parameters'
+        files: input files of the day, see 'get_day_files'
+
+    Returns:
+        dictionary with the day, the parameters and the KPIs of the day, None if the day failed
+
+    """
+    started = perf_counter()
+    previous = dict()
+    try:
+        previous = set_parameters(parameters)
+        excel = pd.ExcelFile(files['registratie'])   # The registration is parsed once for the trucks and the orders
+        trucks = ff.read_flex(excel, day)
+        tekorten = ff.read_tekorten(excel, day, files['orders'])
+        planner = RollingHorizonPlanner(trucks, ff.generate_event_list(tekorten, trucks),
+                                        time_budget=config.BACKTEST_REPLAN_TIME_BUDGET)
+        planner.run()
+        kpis = compute_kpis(planner)
+        if files['transport'] is not None:
+            # Planned inter transports of the day, to compare the flex rides with the regular transport capacity
+            inter_transports = mf.read_cleaned_VAR_data(files['transport'], *ingestion.get_process_window(day))
+            kpis['n_inter_transports'] = len(inter_transports)
+            kpis['rc_inter_transports'] = inter_transports['RC groot equivalent gepland'].sum()
+    except Exception:
+        logger.exception('Backtest - %s with parameters %s failed', day, parameters)
+        return None
+    finally:
+        set_parameters(previous)
+    return {'day': day, **parameters, **kpis, 'runtime_seconds': perf_counter() - started}
+
+
+def aggregate_kpis(df_days, parameter_names):
+    """
+    Aggregate the KPIs of the days per combination of parameters. Counts and hours are summed over the days, after which
+    the proportions are computed, so that every order, rollcage and shift hour has the same weight
+    Args:
+        df_days: df with the KPIs of each day and combination of parameters
+        parameter_names: names of the parameters in the grid
+
+    Returns:
+        df with the KPIs of each combination of parameters, the best proportion of rollcages solved first
+
+    """
+    df = df_days.assign(n_days=1)
+    aggregations = {column: 'sum' for column in ['n_days'] + SUM_COLUMNS if column in df.columns}
+    aggregations['max_replan_seconds'] = 'max'
+    if parameter_names:
+        df_summary = df.groupby(list(parameter_names), sort=False, dropna=False).agg(aggregations).reset_index()
+    else:
+        df_summary = df.groupby([0] * len(df)).agg(aggregations).reset_index(drop=True)
+    df_summary = add_kpi_ratios(df_summary)
+    return df_summary.sort_values(['prop_rc_solved', 'prop_on_time'], ascending=False, ignore_index=True)
+
+
+def run_backtest(days, grid, n_workers=None):
+    """
+    Replay every day for every combination of parameters in the grid. Days without a registration are skipped. The runs
+    are divided over a pool of processes, as the flextoewijzer keeps its parameters and caches per process. Unknown
+    parameters raise a ValueError before any day is run
+    Args:
+        days: sequence of process days
+        grid: dictionary with a list of values for each parameter, see 'get_parameter_sets'
+        n_workers: number of processes, defaults to BACKTEST_N_WORKERS in config
+
+    Returns:
+        df_days: df with the KPIs of each day and combination of parameters
+        df_summary: df with the KPIs of each combination of parameters, aggregated over the days
+
+    """
+    n_workers = config.BACKTEST_N_WORKERS if n_workers is None else n_workers
+    n_workers = os.cpu_count() if n_workers is None else n_workers
+    for name in grid:   # Unknown parameters would fail every run, so they are rejected before any work is submitted
+        get_parameter_module(name)
+    parameter_sets = get_parameter_sets(grid)
+    args_list = []
+    for day in days:
+        files = get_day_files(day)
+        if files['registratie'] is None:
+            logger.warning('Backtest - no registration found for %s, the day is skipped', day)
+            continue
+        args_list += [(day, parameters, files) for parameters in parameter_sets]
+    logger.info('Backtest - %s runs of %s parameter sets on %s workers', len(args_list), len(parameter_sets), n_workers)
+
+    rows = [row for row in pf.map_ordered(run_day, args_list, n_workers, 'process') if row is not None]
+    if not rows:
+        logger.warning('Backtest - no day was run successfully')
+        return pd.DataFrame(), pd.DataFrame()
+    df_days = add_kpi_ratios(pd.DataFrame(rows))
+    df_summary = aggregate_kpis(df_days, list(grid.keys()))
+    logger.info('Backtest - %s of %s runs succeeded', len(rows), len(args_list))
+    return df_days, df_summary
+
+
+@instrumentation.instrumented_run('backtest')
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('start', type=datetime.date.fromisoformat, help='first process day, e.g. 2021-10-01')
+    parser.add_argument('end', type=datetime.date.fromisoformat, help='last process day, e.g. 2022-03-31')
+    parser.add_argument('--grid', nargs='*', default=None, metavar='NAME=VALUES',
+                        help='values of the parameters, defaults to BACKTEST_PARAMETER_GRID in config')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    parser.add_argument('--output', default=config.PATH_BACKTEST_RESULTS, help='excel file with the results')
+    args = parser.parse_args()
+
+    logger.info('Backtest - started')
+    grid = config.BACKTEST_PARAMETER_GRID if args.grid is None else parse_grid(args.grid)
+    days = pd.date_range(args.start, args.end).date
+    df_days, df_summary = run_backtest(days, grid, args.workers)
+    with pd.ExcelWriter(args.output) as writer:
+        df_summary.to_excel(writer, sheet_name='summary', index=False)
+        df_days.to_excel(writer, sheet_name='days', index=False)
+    logger.info('Backtest - results saved')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import flex_package.models.modelfunctions.flextoewijzer_functions as ff
+import flex_package.config as config
+import flex_package.instrumentation as instrumentation
+from flex_package.models.modelfunctions.event_queue import EventQueue
+from flex_package.models.modelfunctions.order_index import OpenOrderIndex
+import logging
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+
+class RollingHorizonPlanner:
+    """
+    Rolling-horizon planner for the assignment of flex trucks to orders. Events (orders, arrivals of trucks, starts of
+    shifts and returns to base) are processed in chronological order as they come in. After every event, the orders
+    that are not yet being fulfilled are assigned to the trucks again, within a fixed compute budget. Orders of which
+    the fulfillment has started are committed and are not replanned. Idle trucks with an assigned order start its
+    fulfillment immediately
+    """
+
+    def __init__(self, trucks, events=(), time_budget=None, method=None):
+        """
+        Args:
+            trucks: List of trucks
+            events: Initial events, e.g. as generated by 'generate_event_list'
+            time_budget: Compute budget (seconds) of a single replan, defaults to REPLAN_TIME_BUDGET in config
+            method: Assignment method of 'assign_orders', defaults to ASSIGNMENT_METHOD in config
+        """
+        self.trucks = trucks
+        self.event_list = events if isinstance(events, EventQueue) else EventQueue(events)
+        self.time_budget = config.REPLAN_TIME_BUDGET if time_budget is None else time_budget
+        self.method = method
+        self.fulfilled_orders = []   # Order combinations of which the fulfillment has started
+        self.unfulfilled_orders = []   # Order combinations that are not yet being fulfilled
+        # Index of the orders in the event list and the unfulfilled order combinations, to combine new orders
+        self.open_orders = OpenOrderIndex(ff.mp.truck_cap)
+        for event in self.event_list:
+            if isinstance(event, ff.Order):
+                self.open_orders.add(event, event.Time)
+        self.replan_durations = []   # Compute time (seconds) of each replan
+        # Dispatched order combinations, with the truck, the dispatch time, the arrival at the first stop (pickup) and
+        # the time at which the truck is available again
+        self.rides = []
+        self.time = None
+
+    def add_event(self, event):
+        """
+        Add an event from the live event stream
+        :param event: Order, ArrivalTrigger, StartShiftTrigger or ReturnTrigger
+        """
+        self.event_list.append(event)
+        if isinstance(event, ff.Order):
+            self.open_orders.add(event, event.Time)
+
+    def process_until(self, time):
+        """
+        Process all events up to and including a given time
+        :param time: Current time
+        """
+        while len(self.event_list) > 0 and self.event_list[0].Time <= time:
+            self.process_event(self.event_list.pop(0))
+
+    def run(self):
+        """
+        Process all events
+        :return: List of fulfilled order combinations, and list of order combinations that were not fulfilled
+        """
+        while len(self.event_list) > 0:
+            self.process_event(self.event_list.pop(0))
+        logger.info('Flex planner - %s orders fulfilled, %s not fulfilled, max. replan time %.3f s',
+                    len(self.fulfilled_orders), len(self.unfulfilled_orders), max(self.replan_durations, default=0))
+        logger.info('Flex planner - route cache %s', ff.get_route_cache().info())
+        return self.fulfilled_orders, self.unfulfilled_orders
+
+    def process_event(self, event):
+        """
+        Update the state of the trucks and orders for an event, then replan and dispatch idle trucks
+        :param event: Order, ArrivalTrigger, StartShiftTrigger or ReturnTrigger
+        """
+        self.time = event.Time
+        if isinstance(event, ff.Order):
+            # Orders that are called in at the same time, or open orders, are combined with the new order if possible
+            combination, self.event_list, self.unfulfilled_orders = ff.combine_orders(
+                event, self.event_list, self.unfulfilled_orders, index=self.open_orders)
+            self.unfulfilled_orders.append(combination)
+            self.open_orders.add(combination)
+        elif isinstance(event, ff.StartShiftTrigger):
+            ff.start_shift(event.Truck)
+        elif isinstance(event, ff.ArrivalTrigger):
+            # The truck has delivered its order at the last location of its trajectory, and becomes available
+            truck = event.Truck
+            truck.Location = truck.Location_list[-1][0]
+            self.event_list.append(ff.make_available(truck))
+        elif isinstance(event, ff.ReturnTrigger):
+            if not event.Truck.Occupied:
+                ff.return_to_base(event.Truck, event.Time)
+        self.replan(event.Time)
+        self.dispatch(event.Time)
+
+    def replan(self, time):
+        """
+        Assign the orders that are not yet being fulfilled to the trucks, within the compute budget
+        :param time: Current time
+        """
+        started = perf_counter()
+        ff.assign_orders(self.trucks, self.unfulfilled_orders, time, self.method, started + self.time_budget)
+        duration = perf_counter() - started
+        self.replan_durations.append(duration)
+        if duration > self.time_budget:
+            logger.warning('Replan at %s took %.3f s, budget is %.3f s', time, duration, self.time_budget)
+
+    def dispatch(self, time):
+        """
+        Start the fulfillment of the first assigned order of every idle truck
+        :param time: Current time
+        """
+        for truck in self.trucks:
+            if truck.Active and not truck.Occupied and not truck.Finished and truck.Orderlist:
+                orders = truck.Orderlist[0]
+                self.open_orders.discard(orders)
+                n_stops = len(truck.Location_list)
+                ff.start_order_fulfillment(truck, self.event_list, time, self.fulfilled_orders, self.unfulfilled_orders)
+                self.rides.append((orders, truck, time, truck.Location_list[n_stops][1], truck.Arrival))
+
+
+@instrumentation.instrumented_run('flex_planner')
+def main():
+    logger.info('Flex planner - started')
+    trucks = ff.read_flex(config.PATH_REGISTRATIE, config.process_day)
+    tekorten = ff.read_tekorten(config.PATH_REGISTRATIE, config.process_day)
+    planner = RollingHorizonPlanner(trucks, ff.generate_event_list(tekorten, trucks))
+    planner.run()
+    logger.info('Flex planner - finished')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,55 +1,258 @@
 import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+import flex_package.models.modelfunctions.parallel_functions as pf
 import flex_package.config as config
+import flex_package.instrumentation as instrumentation
+import numpy as np
 import pandas as pd
 import logging
+import random
 import flex_package.visualization.visualize as vis
 
 logger = logging.getLogger(__name__)
 
 
-def main():
-    logger.info('Order generation - started')
+def get_floor_stock(origin, destination, time, afvoer):
+    """
+    Get the current number of RC on the floor for a combination of depot and destination. Every combination gets its own
+    random generator for the dummy deviation, so the result does not depend on the order of execution
+    Args:
+        origin: depot of origin
+        destination: destination depot
+        time: current time
+        afvoer: df containing the predictions for afvoer (used only by the dummy floor stock)
 
-    # Read data from prediction from day before
-    xls = pd.ExcelFile(config.PATH_AFVOER_BASELINE)
+    Returns:
+        Number of RC on the floor
 
-    # Read transport data
-    inter_transports = mf.read_cleaned_SIM_data(config.PATH_TRANSPORT_CLEANED)
+    """
+    rng = random.Random(f'{config.RANDOM_SEED}-{origin}-{destination}-{time}')
+    return mf.get_floor_stock(origin, destination, time, afvoer, rng)
 
-    afvoer_dict = dict()  # Dictionary will contain predicted afvoer and predictions of RC on floor for each depot
-    for name in xls.sheet_names[2:]:     # Loop over all combinations of depot and destination
-        origin = name.split(sep='-')[0]
-        destination = name.split(sep='-')[1]
-        logger.info(origin, destination)
-
-        # Obtain dfs containing predicted number of RC afvoer from depot and planned inter transports
-        afvoer = xls.parse(sheet_name=name)
-        df_inter = mf.generate_inter_df(origin, destination, inter_transports)
-
-        # Get current number of RC on the floor for the destination of interest
-        rc_floor = mf.get_floor_stock(origin, destination, config.current_time, afvoer)
-        # Update the predictions for the afvoer by incorporating the latest version of planned inter transports
-        afvoer = mf.update_inter_transports(afvoer, df_inter, config.current_time, config.truck_capacity)
-        # Update the predictions for the afvoer by incorporating the current number of RC on the depot floor
-        afvoer = mf.update_afvoer(afvoer, config.current_time, rc_floor)
-        # Create flex orders, and add these to the afvoer predictions
-        afvoer, afvoer_orders = mf.add_flex_orders(afvoer, config.current_time, origin, destination)
-
-        # Save the predictions in a dictionary
-        afvoer_dict[name] = afvoer
-    logger.info('Order generation - computations done')
 
-    # Below we save a dataframe with information for all generated flex orders and with the predicted afvoer for each
-    # depot and each destination
+def update_pair(afvoer, df_inter, origin, destination, time, rc_floor=None):
+    """
+    Update the afvoer predictions for a single combination of depot and destination with the latest planned inter
+    transports and the current number of RC on the depot floor. Combinations are independent, so this function can be
+    run in parallel for all combinations
+    Args:
+        afvoer: df containing the baseline predictions for afvoer
+        df_inter: df containing the planned inter transports for the combination
+        origin: depot of origin
+        destination: destination depot
+        time: current time
+        rc_floor: current number of RC on the floor, obtained with 'get_floor_stock' if not given
+
+    Returns:
+        df containing the updated predictions for afvoer
+
+    """
+    # Get current number of RC on the floor for the destination of interest
+    if rc_floor is None:
+        rc_floor = get_floor_stock(origin, destination, time, afvoer)
+    afvoer = update_pair_transports(afvoer, df_inter, origin, destination, time)
+    return update_pair_stock(afvoer, origin, destination, time, rc_floor)
+
+
+def update_pair_transports(afvoer, df_inter, origin, destination, time):
+    """
+    Update the afvoer predictions for a single combination of depot and destination with the latest planned inter
+    transports. The result stays valid as long as the inter transports that are taken into account do not change, see
+    'find_changed_pairs'
+    Args:
+        afvoer: df containing the baseline predictions for afvoer
+        df_inter: df containing the planned inter transports for the combination
+        origin: depot of origin
+        destination: destination depot
+        time: current time
+
+    Returns:
+        df containing the predictions for afvoer, updated with the planned inter transports
+
+    """
+    logger.info('%s - %s', origin, destination)
+    with instrumentation.timed('generate_orders.update_pair_transports', label=f'{origin}-{destination}'):
+        return mf.update_inter_transports(afvoer, df_inter, time, config.truck_capacity)
+
+
+def update_pair_stock(afvoer, origin, destination, time, rc_floor):
+    """
+    Update the afvoer predictions for a single combination of depot and destination with the current number of RC on
+    the depot floor. The stock from the current time on is recomputed, starting from the floor stock
+    Args:
+        afvoer: df containing the predictions for afvoer, updated with the planned inter transports
+        origin: depot of origin
+        destination: destination depot
+        time: current time
+        rc_floor: current number of RC on the floor
+
+    Returns:
+        df containing the updated predictions for afvoer
+
+    """
+    with instrumentation.timed('generate_orders.update_pair_stock', label=f'{origin}-{destination}'):
+        return mf.update_afvoer(afvoer, time, rc_floor)
+
+
+def find_changed_pairs(state, inter_hashes, time):
+    """
+    Compare the inter transports of each combination of depot and destination that are taken into account at the
+    current time against the state of the previous run. A combination has changed if these inter transports differ,
+    which also happens without new transport data when a delivered transport is loaded between the previous and the
+    current time, or if the baseline has inter transports between the previous and the current time (these are only
+    replaced by the planned inter transports after the current time)
+    Args:
+        state: state of the previous run, as returned by 'refresh_orders'
+        inter_hashes: dictionary with for each (origin, destination) tuple the fingerprint of the inter transports that
+            are taken into account at the current time, see 'mf.fingerprint_inter_pairs'
+        time: current time
+
+    Returns:
+        changed: dictionary with for each changed (origin, destination) tuple the fingerprint of the inter transports
+        unchanged: list of (origin, destination) tuples that did not change
+
+    """
+    changed = dict()
+    unchanged = []
+    first_time, last_time = np.datetime64(min(state['time'], time)), np.datetime64(max(state['time'], time))
+    for pair, pair_state in state['pairs'].items():
+        baseline = pair_state['baseline']
+        baseline_times = baseline['date_time'].to_numpy()[baseline['event'].to_numpy() == 'Inter']
+        baseline_inter = (baseline_times > first_time) & (baseline_times <= last_time)
+        if inter_hashes[pair] == pair_state['inter_hash'] and not baseline_inter.any():
+            unchanged.append(pair)
+        else:
+            changed[pair] = inter_hashes[pair]
+    return changed, unchanged
+
+
+def refresh_orders(inter_transports, time, state=None, baseline_dict=None):
+    """
+    Update the afvoer predictions and generate flex orders. Without a previous state, the predictions of all
+    combinations of depot and destination are updated with the planned inter transports, starting from the baseline.
+    With the state of a previous run of the same process day, only the combinations for which the inter transports
+    changed are updated again, the other combinations take the updated predictions from the state. The predictions of
+    all combinations are then updated with the current floor stock and the flex orders are generated from the current
+    time on, so the result is the same as that of a run without a previous state
+    Args:
+        inter_transports: df containing all planned inter transports
+        time: current time
+        state: state of the previous run, or None
+        baseline_dict: dictionary containing for each (origin, destination) tuple the baseline predictions for afvoer,
+            read from the baseline store if not given
+
+    Returns:
+        afvoer_dict: dictionary containing for each (origin, destination) tuple the predicted afvoer, including flex
+            orders
+        afvoer_orders: list of flex orders for all combinations
+        state: state of the present run
+
+    """
+    inter_index = mf.index_pairs(inter_transports, 'Afk laadlocatie', 'Afk loslocatie')
+    if state is not None and state['process_day'] == config.process_day:
+        with instrumentation.timed('generate_orders.find_changed_pairs'):
+            # Fingerprints of the inter transports that are taken into account for each combination
+            inter_hashes = mf.fingerprint_inter_pairs(inter_transports, time, list(state['pairs'].keys()))
+            changed, unchanged = find_changed_pairs(state, inter_hashes, time)
+        logger.info('Incremental refresh - %s of %s combinations changed', len(changed), len(state['pairs']))
+        if baseline_dict is None:
+            baseline_dict = mf.read_baseline_store(config.PATH_AFVOER_BASELINE_STORE, list(changed.keys()))
+        else:
+            baseline_dict = {pair: baseline_dict[pair] for pair in changed.keys()}
+    else:
+        # Read data from prediction from day before
+        if baseline_dict is None:
+            baseline_dict = mf.read_baseline_store(config.PATH_AFVOER_BASELINE_STORE)
+        inter_hashes = mf.fingerprint_inter_pairs(inter_transports, time, list(baseline_dict.keys()))
+        unchanged = []
+        state = {'process_day': config.process_day, 'pairs': dict()}
+
+    pair_args = []   # Arguments of 'update_pair_transports' for each changed combination of depot and destination
+    for (origin, destination), afvoer in baseline_dict.items():   # Loop over all changed depot-destination combinations
+        # Obtain df containing planned inter transports, the predicted number of RC afvoer from depot is in 'afvoer'
+        df_inter = mf.get_pair_df(inter_index, origin, destination, inter_transports)
+        pair_args.append((afvoer.copy(), df_inter.copy(), origin, destination, time))
+
+    # Update the predictions of the changed combinations with the planned inter transports, in parallel if more than
+    # one worker is configured. The results are returned in the order of the combinations, so the output is the same as
+    # for a sequential run
+    afvoer_list = pf.map_ordered(update_pair_transports, pair_args, config.N_WORKERS, config.POOL_TYPE)
+    for args, afvoer in zip(pair_args, afvoer_list):
+        pair = (args[2], args[3])
+        state['pairs'][pair] = {'inter_hash': inter_hashes[pair], 'baseline': baseline_dict[pair], 'afvoer': afvoer}
+
+    # Update the predictions of all combinations with the current floor stock at once, so that the stock of the
+    # unchanged combinations is also recomputed from the current time on
+    rc_floors = {(origin, destination): get_floor_stock(origin, destination, time, pair_state['baseline'])
+                 for (origin, destination), pair_state in state['pairs'].items()}
+    # Dictionary containing predicted afvoer and predictions of RC on floor for each depot
+    updated_dict = mf.update_afvoer_dict({pair: pair_state['afvoer'] for pair, pair_state in state['pairs'].items()},
+                                         time, rc_floors)
+
+    # Create flex orders for all combinations of depot and destination at once, and add these to the afvoer predictions
+    afvoer_dict, afvoer_orders = mf.generate_flex_orders(updated_dict, time)
+    state['time'] = time
+    logger.info('Refresh - %s combinations updated with inter transports, %s unchanged', len(pair_args),
+                len(unchanged))
+    return afvoer_dict, afvoer_orders, state
+
+
+def load_refresh_state(path):
+    """
+    Load the state of the previous run
+    Args:
+        path: path of the pickled state
+
+    Returns:
+        state of the previous run, or None if there is no previous run
+
+    """
+    try:
+        return pd.read_pickle(path)
+    except FileNotFoundError:
+        logger.info('No previous refresh state found, computing all combinations')
+        return None
+
+
+def write_orders(afvoer_dict, afvoer_orders, output_path):
+    """
+    Write the generated flex orders and the predicted afvoer for each depot and each destination to an excel file
+    Args:
+        afvoer_dict: dictionary containing for each (origin, destination) tuple the predicted afvoer
+        afvoer_orders: list of flex orders
+        output_path: path of the excel file
+
+    Returns: None
+
+    """
     df_orders = pd.DataFrame(columns=['Time', 'Origin', 'Destination', 'Size'])
     for order in afvoer_orders:
         row = pd.DataFrame([[order.Time, order.Origin, order.Destination, order.Size]], columns=df_orders.columns)
         df_orders = pd.concat([df_orders, row])
-    output_path = config.PATH_AFVOER_ORDERS
     with pd.ExcelWriter(output_path) as writer:
         df_orders.to_excel(writer, sheet_name='afvoerorders')
-        for key in afvoer_dict.keys():
-            afvoer_dict[key].to_excel(writer, sheet_name=key, index=False)
+        for (origin, destination), afvoer in afvoer_dict.items():
+            afvoer.to_excel(writer, sheet_name=str(origin) + '-' + str(destination), index=False)
+
+
+@instrumentation.instrumented_run('generate_orders', budget=60 * config.REFRESH_INTERVAL)
+def main():
+    logger.info('Order generation - started')
+
+    # Read transport data
+    inter_transports = mf.read_cleaned_SIM_data(config.PATH_TRANSPORT_CLEANED)
+
+    # In incremental mode, the state of the previous run is used to recompute only the combinations that changed
+    state = None
+    if config.BOOL_INCREMENTAL_REFRESH:
+        state = load_refresh_state(config.PATH_REFRESH_STATE)
+    afvoer_dict, afvoer_orders, state = refresh_orders(inter_transports, config.current_time, state)
+    if config.BOOL_INCREMENTAL_REFRESH:
+        pd.to_pickle(state, config.PATH_REFRESH_STATE)
+    logger.info('Order generation - computations done')
+
+    # Below we save a dataframe with information for all generated flex orders and with the predicted afvoer for each
+    # depot and each destination
+    write_orders(afvoer_dict, afvoer_orders, config.PATH_AFVOER_ORDERS)
     logger.info('Order generation - results saved')
 
 
@@ -0,0 +1,143 @@
+"""
+Module with the persistent cache of geocoded addresses and drive times between coordinates.
+"""
+
+import logging
+
+import fsspec
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Address fields that identify a location when geocoding
+ADDRESS_COLUMNS = ['Straat', 'Huisnummer', 'Postcode', 'Plaats', 'Land']
+# Coordinates are rounded to this number of decimals (about 10 cm) in the keys of the duration cache
+COORDINATE_DECIMALS = 6
+
+
+class DriveTimeCache:
+    """
+    On-disk cache with the coordinates of addresses, keyed on the address fields, and with the drive times between
+    pairs of coordinates. Entries older than 'max_age' are discarded when the cache is read, so they are computed again.
+    The cache is stored as two parquet files in a directory, either local or on S3
+    """
+
+    def __init__(self, path, max_age=None):
+        """
+        Args:
+            path: Directory of the cache
+            max_age: Maximum age (pd.Timedelta) of an entry, entries never expire if None
+        """
+        self.fs, self.root = fsspec.core.url_to_fs(path)
+        self.path = path
+        self.max_age = max_age
+        self.df_geocodes = self._read('geocodes', ADDRESS_COLUMNS + ['lat', 'lon'])
+        self.df_durations = self._read('durations', ['lat_from', 'lon_from', 'lat_to', 'lon_to', 'duration'])
+
+    def _read(self, name, columns):
+        """
+        Read a table of the cache, without the expired entries
+        :param name: Name of the table
+        :param columns: Columns of the table, besides the time at which the entry was cached
+        :return: DataFrame with the entries
+        """
+        file = f'{self.root}/{name}.parquet'
+        if not self.fs.exists(file):
+            return pd.DataFrame(columns=columns + ['cached_at'])
+        with self.fs.open(file, 'rb') as f:
+            df = pd.read_parquet(f)
+        if self.max_age is not None:
+            df = df[df['cached_at'] >= pd.Timestamp.now() - self.max_age].reset_index(drop=True)
+        return df
+
+    def write(self):
+        """
+        Write the cache to disk
+        """
+        self.fs.makedirs(self.root, exist_ok=True)
+        for name, df in [('geocodes', self.df_geocodes), ('durations', self.df_durations)]:
+            with self.fs.open(f'{self.root}/{name}.parquet', 'wb') as f:
+                df.to_parquet(f, index=False)
+
+    def clear(self):
+        """
+        Remove all entries from the cache, including the files on disk
+        """
+        if self.fs.exists(self.root):
+            self.fs.rm(self.root, recursive=True)
+        self.df_geocodes = self.df_geocodes.iloc[0:0]
+        self.df_durations = self.df_durations.iloc[0:0]
+
+    def get_coordinates(self, df_addresses, geocode):
+        """
+        Get the coordinates of addresses. Only addresses that are not in the cache are geocoded
+        :param df_addresses: DataFrame with the address fields in ADDRESS_COLUMNS
+        :param geocode: Function that returns (lat, lon) given the address fields in the order of ADDRESS_COLUMNS
+        :return: DataFrame with columns 'lat' and 'lon', with the same index as 'df_addresses'
+        """
+        keys = df_addresses[ADDRESS_COLUMNS].astype(str)
+        cached = self.df_geocodes.drop_duplicates(ADDRESS_COLUMNS, keep='last').set_index(ADDRESS_COLUMNS)
+        key_index = pd.MultiIndex.from_frame(keys)
+        missing = ~key_index.isin(cached.index) & ~keys.duplicated().to_numpy()
+        if missing.any():
+            logger.info('Geocoding %s of %s addresses', missing.sum(), len(keys))
+            coordinates = [geocode(*row) for row in df_addresses.loc[missing, ADDRESS_COLUMNS].itertuples(index=False)]
+            df_new = keys[missing].assign(lat=[lat for lat, lon in coordinates], lon=[lon for lat, lon in coordinates],
+                                          cached_at=pd.Timestamp.now())
+            self.df_geocodes = pd.concat([self.df_geocodes, df_new], ignore_index=True)
+            cached = self.df_geocodes.drop_duplicates(ADDRESS_COLUMNS, keep='last').set_index(ADDRESS_COLUMNS)
+        df_coordinates = cached.loc[key_index, ['lat', 'lon']].astype(float)
+        df_coordinates.index = df_addresses.index
+        return df_coordinates
+
+    def get_durations(self, df_points, compute_matrix):
+        """
+        Get the drive times between all pairs of points. Drive times that are not in the cache are computed pair by
+        pair, or for all points at once if most drive times are missing
+        :param df_points: DataFrame with columns 'lat' and 'lon'
+        :param compute_matrix: Function that returns the square matrix of drive times for a DataFrame of points, in
+        the order of the rows
+        :return: Square array with the drive time from the point of each row to the point of each column
+        """
+        lat = df_points['lat'].to_numpy(dtype=float).round(COORDINATE_DECIMALS)
+        lon = df_points['lon'].to_numpy(dtype=float).round(COORDINATE_DECIMALS)
+        n_points = len(df_points)
+        rows, columns = np.nonzero(~np.eye(n_points, dtype=bool))
+        durations = np.zeros((n_points, n_points))
+        durations[rows, columns] = self._lookup_durations(lat[rows], lon[rows], lat[columns], lon[columns])
+        # Pairs of points at the same coordinates have a drive time of zero
+        missing = np.isnan(durations) & ((lat[:, None] != lat[None, :]) | (lon[:, None] != lon[None, :]))
+        n_missing = int(missing.sum())
+        if n_missing == 0:
+            return np.nan_to_num(durations)
+
+        logger.info('Computing %s of %s drive times', n_missing, len(rows))
+        if n_missing > len(rows) // 2:
+            durations = np.asarray(compute_matrix(df_points), dtype=float)
+            computed = ~np.eye(n_points, dtype=bool)
+        else:
+            # Every call computes the drive times between two points in both directions
+            for i, j in {(min(i, j), max(i, j)) for i, j in zip(*np.nonzero(missing))}:
+                pair_durations = np.asarray(compute_matrix(df_points.iloc[[i, j]]), dtype=float)
+                durations[i, j] = pair_durations[0, 1]
+                durations[j, i] = pair_durations[1, 0]
+            computed = missing | missing.T
+        rows, columns = np.nonzero(computed)
+        df_new = pd.DataFrame({'lat_from': lat[rows], 'lon_from': lon[rows], 'lat_to': lat[columns],
+                               'lon_to': lon[columns], 'duration': durations[rows, columns],
+                               'cached_at': pd.Timestamp.now()})
+        self.df_durations = pd.concat([self.df_durations, df_new], ignore_index=True)
+        return np.nan_to_num(durations)
+
+    def _lookup_durations(self, lat_from, lon_from, lat_to, lon_to):
+        """
+        Look up the drive times between pairs of coordinates in the cache
+        :return: Array with the drive time of each pair, NaN if the pair is not in the cache
+        """
+        key_columns = ['lat_from', 'lon_from', 'lat_to', 'lon_to']
+        cached = self.df_durations.drop_duplicates(key_columns, keep='last')
+        cached = pd.Series(cached['duration'].to_numpy(dtype=float),
+                           index=pd.MultiIndex.from_frame(cached[key_columns].astype(float)))
+        keys = pd.MultiIndex.from_arrays([lat_from, lon_from, lat_to, lon_to], names=key_columns)
+        return cached.reindex(keys).to_numpy()
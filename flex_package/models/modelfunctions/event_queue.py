@@ -0,0 +1,151 @@
+"""
+Module with the event queue of the discrete-event simulation of the flextoewijzer.
+"""
+
+import heapq
+import itertools
+
+# Marker for entries of the heap whose event was removed from the queue
+_REMOVED = object()
+
+
+class EventQueue:
+    """
+    Priority queue of (future) events, ordered by the 'Time' attribute of the events. Events with the same time are
+    kept in the order in which they were added. Adding and popping an event takes O(log n) time. Removed events are only
+    marked as removed, and are skipped when they reach the front of the queue. Events with a 'Truck' attribute
+    (triggers) are registered per truck and type of event, so the triggers of a truck can be cancelled without scanning
+    the queue.
+
+    The queue can be used in place of a chronologically sorted list of events: 'append', 'remove', 'pop(0)',
+    'queue[0]', 'len(queue)' and iterating over the events in chronological order are supported. An event can be in the
+    queue only once.
+    """
+
+    def __init__(self, events=()):
+        """
+        Args:
+            events: Initial events
+        """
+        self._heap = []   # Entries [time, sequence number, event]
+        self._entries = dict()   # Entry of each event in the queue, by id of the event
+        self._handles = dict()   # Entries of the triggers in the queue, by (truck, type of trigger)
+        self._counter = itertools.count()
+        self._n_events = 0
+        for event in events:
+            self.append(event)
+
+    def __len__(self):
+        return self._n_events
+
+    def __getitem__(self, index):
+        if index != 0:
+            raise IndexError('Only the first event of the queue can be accessed by index')
+        self._skip_removed()
+        if not self._heap:
+            raise IndexError('event queue is empty')
+        return self._heap[0][2]
+
+    def __iter__(self):
+        """
+        Iterate over the events in chronological order, without removing them. The heap is traversed from the root, so
+        stopping after the first k events takes O(k log k) time. Events may be removed during the iteration, but events
+        should not be added or popped
+        """
+        heap = self._heap
+        if not heap:
+            return
+        candidates = [(heap[0][0], heap[0][1], 0)]
+        while candidates:
+            _, _, index = heapq.heappop(candidates)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(candidates, (heap[child][0], heap[child][1], child))
+            if heap[index][2] is not _REMOVED:
+                yield heap[index][2]
+
+    def append(self, event):
+        """
+        Add an event to the queue
+        :param event: Event with a 'Time' attribute
+        """
+        if id(event) in self._entries:
+            raise ValueError('Event is already in the queue')
+        entry = [event.Time, next(self._counter), event]
+        self._entries[id(event)] = entry
+        truck = getattr(event, 'Truck', None)
+        if truck is not None:
+            self._handles.setdefault((truck, type(event)), []).append(entry)
+        heapq.heappush(self._heap, entry)
+        self._n_events += 1
+
+    def pop(self, index=0):
+        """
+        Remove and return the first event of the queue
+        :param index: Position of the event, only 0 is supported
+        :return: First event
+        """
+        if index != 0:
+            raise IndexError('Only the first event can be popped from the queue')
+        self._skip_removed()
+        if not self._heap:
+            raise IndexError('pop from empty event queue')
+        entry = heapq.heappop(self._heap)
+        event = entry[2]
+        self._discard(entry)
+        return event
+
+    def remove(self, event):
+        """
+        Remove an event from the queue
+        :param event: Event to remove
+        """
+        entry = self._entries.get(id(event))
+        if entry is None:
+            raise ValueError('Event is not in the queue')
+        self._discard(entry)
+        self._compact()
+
+    def cancel_triggers(self, truck, trigger_type):
+        """
+        Remove all triggers of a given type for a truck from the queue
+        :param truck: Truck for which the triggers are removed
+        :param trigger_type: Type of the triggers, e.g. ReturnTrigger
+        :return: Number of removed triggers
+        """
+        entries = list(self._handles.get((truck, trigger_type), []))
+        for entry in entries:
+            self._discard(entry)
+        self._compact()
+        return len(entries)
+
+    def _discard(self, entry):
+        """
+        Mark an entry as removed, and remove it from the registers of the queue
+        :param entry: Entry of the heap
+        """
+        event = entry[2]
+        del self._entries[id(event)]
+        key = (getattr(event, 'Truck', None), type(event))
+        if key[0] is not None:
+            handles = self._handles[key]
+            handles[:] = [handle for handle in handles if handle is not entry]
+            if not handles:
+                del self._handles[key]
+        entry[2] = _REMOVED
+        self._n_events -= 1
+
+    def _skip_removed(self):
+        """
+        Pop removed entries from the front of the heap
+        """
+        while self._heap and self._heap[0][2] is _REMOVED:
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        """
+        Rebuild the heap without the removed entries once these make up more than half of the heap
+        """
+        if len(self._heap) > 2 * self._n_events + 64:
+            self._heap = [entry for entry in self._heap if entry[2] is not _REMOVED]
+            heapq.heapify(self._heap)
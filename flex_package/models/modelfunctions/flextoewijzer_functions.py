@@ -1,4 +1,6 @@
 import datetime as dt
+import logging
+from time import perf_counter
 
 import pandas as pd
 import numpy as np
@@ -7,9 +9,38 @@ import PySources.Rijtijden.geocoderen as geocoderen
 import PySources.Rijtijden.prepare_distance_time_matrices as prepare_distance_time_matrices
 import PySources.ModelParams as mp
 import itertools
+from scipy.optimize import linear_sum_assignment
+
+import flex_package.config as config
+import flex_package.data.location_aliases as la
+from flex_package.instrumentation import instrument
+from flex_package.models.modelfunctions.drive_time_cache import DriveTimeCache
+from flex_package.models.modelfunctions.event_queue import EventQueue
+from flex_package.models.modelfunctions.location_registry import DriveTimeMatrix, FinalDepartureTable, \
+    LocationRegistry
+from flex_package.models.modelfunctions.order_index import OpenOrderIndex
+from flex_package.models.modelfunctions.route_planner import RouteCache, RoutePlanner
+
+logger = logging.getLogger(__name__)
+
+# Registry with the type of each location, built from mp.depot_info, see 'get_location_registry'
+_location_registry = None
+# Drive-time matrix built from mp.drive_times, see 'get_drive_time_matrix'
+_drive_time_matrix = None
+# Final-departure table built from mp.final_departure_inter1 and mp.final_departure_inter2, see
+# 'get_final_departure_table'
+_final_departure_table = None
+# Planner of the routes of combined orders, see 'get_route_planner'
+_route_planner = None
+# Cache of the cumulative drive times along routes, see 'get_route_cache'
+_route_cache = None
 
 
 class Truck:
+    __slots__ = ('Name', 'Location', 'Destination', 'Base', 'Start', 'End', 'Load', 'Occupied', 'Arrival',
+                 'LastArrival', 'Returntime', 'Location_list', 'Active', 'External', 'Blueflex', 'Finished',
+                 'Orderlist', 'CompletedOrders', 'Moving_to_Pickup')
+
     def __init__(self, name=None, location=None, destination=None, base=None, start=None, end=None, ext=None):
         self.Name = name
         self.Location = location
@@ -58,6 +89,9 @@ class StartShiftTrigger:
 
 
 class Order:
+    __slots__ = ('Time', 'NprioA', 'NprioB', 'NprioC', 'NprioD', 'Ntot', 'Origin', 'Destination', 'Solved', 'Call_time',
+                 'Combination', 'Fulfilled', 'PickupLoc', 'Inter')
+
     def __init__(self, time=None, a=None, b=None, c=None, d=None, origin=None, destination=None, flex=None):
         self.Time = time
         self.NprioA = a
@@ -73,17 +107,13 @@ class Order:
         self.Fulfilled = False
         self.PickupLoc = origin
 
-
-        try:
-            origin_type = mp.depot_info[mp.depot_info['Name'] == origin]['DepotType'].iloc[0]
-        except:
-            print("origin not found in depot info")
-            origin_type = None
-        try:
-            destination_type = mp.depot_info[mp.depot_info['Name'] == destination]['DepotType'].iloc[0]
-        except:
-            print("destination not found in depot info")
-            destination_type = None
+        registry = get_location_registry()
+        origin_type = registry.get_type(origin)
+        if origin_type is None:
+            logger.warning('Origin %s not found in depot info', origin)
+        destination_type = registry.get_type(destination)
+        if destination_type is None:
+            logger.warning('Destination %s not found in depot info', destination)
         inter = 1
         if destination_type == 'CROSS':
             inter = 0
@@ -99,15 +129,84 @@ def nearest_truck(location, trucks):
     :param trucks: List of trucks
     :return: The closest truck
     """
-    min_time = dt.timedelta(hours=999999)
-    closest_truck = None
-    for truck in trucks:
-        if not truck.Occupied:
-            time = compute_travelling_time(truck.Location, location)
-            if time < min_time:
-                min_time = time
-                closest_truck = truck
-    return closest_truck
+    available_trucks = [truck for truck in trucks if not truck.Occupied]
+    if not available_trucks:
+        return None
+    seconds = get_drive_time_matrix().get_seconds_many([truck.Location for truck in available_trucks],
+                                                       [location] * len(available_trucks))
+    return available_trucks[int(np.argmin(seconds))]
+
+
+def get_location_registry():
+    """
+    Get the registry with the type of each location. The registry is built from mp.depot_info on first use
+    :return: LocationRegistry
+    """
+    global _location_registry
+    if _location_registry is None:
+        _location_registry = LocationRegistry.from_depot_info(mp.depot_info)
+    return _location_registry
+
+
+def get_drive_time_matrix():
+    """
+    Get the matrix with the drive times between all locations. The matrix is built from mp.drive_times on first use
+    :return: DriveTimeMatrix
+    """
+    global _drive_time_matrix
+    if _drive_time_matrix is None:
+        _drive_time_matrix = DriveTimeMatrix.from_frame(mp.drive_times)
+    return _drive_time_matrix
+
+
+def get_final_departure_table():
+    """
+    Get the table with the final departure times of all prios. The table is built from mp.final_departure_inter1 and
+    mp.final_departure_inter2 on first use
+    :return: FinalDepartureTable
+    """
+    global _final_departure_table
+    if _final_departure_table is None:
+        _final_departure_table = FinalDepartureTable.from_dicts(mp.final_departure_inter1, mp.final_departure_inter2)
+    return _final_departure_table
+
+
+def get_route_planner():
+    """
+    Get the planner of the routes of combined orders. The planner is built on first use, with half the loading time as
+    handling time of every stop
+    :return: RoutePlanner
+    """
+    global _route_planner
+    if _route_planner is None:
+        _route_planner = RoutePlanner(get_drive_time_matrix(), 0.5 * mp.Loading_time.total_seconds())
+    return _route_planner
+
+
+def get_route_cache():
+    """
+    Get the cache of the cumulative drive times along routes. The cache is built on first use, and holds at most
+    ROUTE_CACHE_SIZE routes
+    :return: RouteCache
+    """
+    global _route_cache
+    if _route_cache is None:
+        _route_cache = RouteCache(get_drive_time_matrix(), config.ROUTE_CACHE_SIZE)
+    return _route_cache
+
+
+def reload_model_data():
+    """
+    Discard the location registry, the drive-time matrix, the final-departure table, the route planner and the route
+    cache, so these are built again from the model parameters on next use. Should be called when mp.depot_info,
+    mp.drive_times, the final departure times or the loading time are replaced
+    """
+    global _location_registry, _drive_time_matrix, _final_departure_table, _route_planner, _route_cache
+    _location_registry = None
+    _drive_time_matrix = None
+    _final_departure_table = None
+    _route_planner = None
+    _route_cache = None
 
 
 def compute_travelling_time(origin, destination):
@@ -115,16 +214,16 @@ def compute_travelling_time(origin, destination):
     Function to return the travelling time between two locations, using a matrix that contains all the travelling times
     :param origin: Starting location
     :param destination: Ending location
-    :param drive_times: Matrix with drivetimes
     :return: The travelling time between the location
     """
     if origin == destination:
         travel_time = dt.timedelta(seconds=0)
     else:
-        travel_time = mp.drive_times.loc[origin, destination]
+        travel_time = get_drive_time_matrix().get_travel_time(origin, destination)
     return travel_time
 
 
+@instrument
 def select_truck(trucks, orders, time, force_solution=None):
     """
     Function that generates a list of all available trucks that could accept an order. The functions checks whether the
@@ -133,7 +232,7 @@ def select_truck(trucks, orders, time, force_solution=None):
     :param force_solution: If true, the selected truck will be forced to take the order, even if it will cause the
     truck to have a longer shift than planned
     :param trucks: List of trucks
-    :param orders: List of orders (either 1 order or 2 combined orders with the same starting location)
+    :param orders: List of orders (a single order or a combination of orders)
     :param time: Current time
     :return: List of trucks that could finish the order in time
     """
@@ -147,7 +246,7 @@ def select_truck(trucks, orders, time, force_solution=None):
                 continue
             start_time = get_order_starting_time(truck, time)
             route, travel_time = get_best_route(truck, orders)
-            end_time = start_time + travel_time[-1] + mp.Loading_time + (len(orders) - 1) * 0.5 * mp.Loading_time
+            end_time = start_time + travel_time[-1] + get_handling_time(route)
             loading_time = start_time + travel_time[1]
             prop_on_time = check_order_time(orders, loading_time)
             S_tot = compute_truck_efficiency(orders, time, start_time, travel_time[-1])*prop_on_time
@@ -195,23 +294,21 @@ def proportion_on_time(origin, destination, NRC_per_prio, inter, end_time):
     :param end_time: expected arrival time
     :return: expected proportion on time
     """
-    prios = ('A', 'B', 'C', 'D')
-    on_time = []
-    for prio in prios:
-        try:
-            if inter == 0:
-                final_departure_time = mp.final_departure_inter1[(origin, destination, prio)]
-            else:
-                final_departure_time = mp.final_departure_inter2[(origin, destination, prio)]
-            if final_departure_time > end_time:
-                on_time.append(1)
-            else:
-                on_time.append(0)
-        except:
-            "Prio combination not recognised"
-            on_time.append(1)
-    prop_on_time = sum(np.multiply(NRC_per_prio, on_time)) / sum(NRC_per_prio)
-    return prop_on_time
+    return float(proportion_on_time_many(origin, destination, NRC_per_prio, inter, [end_time])[0])
+
+
+def proportion_on_time_many(origin, destination, NRC_per_prio, inter, end_times):
+    """
+    Compute the expected proportion on time of an order for a number of expected arrival times at once, e.g. for all
+    candidate trucks. Prio combinations that are not recognised are always on time
+    :param origin: Origin of order to be fulfilled
+    :param destination: Destination of order to be fulfilled
+    :param NRC_per_prio: Number of rollcages for each prio
+    :param inter: Type of transport, 0 for depot to crossdock, 1 for crossdock to fulfillment depot
+    :param end_times: Sequence of expected arrival times
+    :return: array with the expected proportion on time for each arrival time
+    """
+    return get_final_departure_table().get_proportion_on_time(origin, destination, NRC_per_prio, inter, end_times)
 
 
 def get_order_starting_time(truck, time):
@@ -243,28 +340,73 @@ def get_order_size(orders):
     return NRC
 
 
-def assign_orders(trucks, unfulfilled_orders, time):
+@instrument
+def assign_orders(trucks, unfulfilled_orders, time, method=None, deadline=None):
     """
     Assign orders to trucks
     :param trucks: List of available trucks
     :param unfulfilled_orders: List of orders to be fulfilled
     :param time: Current time
+    :param method: 'sequence' to assign the orders greedily in the original and the reversed sequence, or 'matching' to
+    also consider the assignment found by solving an assignment problem per round (see 'match_orders'). The plan with
+    the best optimization criterion is kept. Defaults to ASSIGNMENT_METHOD in config
+    :param deadline: Value of time.perf_counter() after which no further plans are evaluated, the first plan is always
+    evaluated. No deadline if None
     :return: List of trucks (with assigned orders added to state of truck)
     """
+    method = config.ASSIGNMENT_METHOD if method is None else method
+    if method not in ('matching', 'sequence'):
+        raise ValueError(f"Unknown assignment method '{method}', use 'matching' or 'sequence'")
+
     #perm = itertools.permutations(unfulfilled_orders)
     unfulfilled_orders_reverse = unfulfilled_orders.copy()
     unfulfilled_orders_reverse.reverse()
-    perm = [unfulfilled_orders, unfulfilled_orders_reverse]
+    plans = [(optimize_truck_assignment, unfulfilled_orders), (optimize_truck_assignment, unfulfilled_orders_reverse)]
+    if method == 'matching':
+        plans.insert(0, (match_orders, unfulfilled_orders))
     optimal_efficiency = 0
-    best_sequence = None
-    for order_sequence in perm:
+    best_plan = None
+    best_assignment = None
+    for plan in plans:
+        assign, order_sequence = plan
         trucks = free_unfulfilled_orders(trucks)
-        efficiency = optimize_truck_assignment(trucks, order_sequence, time)
+        efficiency = assign(trucks, order_sequence, time, deadline=deadline)
         if efficiency > optimal_efficiency:
-            best_sequence = order_sequence
-    if optimal_efficiency > 0:
-        trucks = free_unfulfilled_orders(trucks)
-        optimize_truck_assignment(trucks, best_sequence, time)
+            optimal_efficiency = efficiency
+            best_plan = plan
+            best_assignment = save_assignment(trucks)
+        if deadline is not None and perf_counter() > deadline:
+            break
+    # The last evaluated plan is still applied to the trucks, the assignment of another plan is restored
+    if optimal_efficiency > 0 and best_plan is not plan:
+        restore_assignment(trucks, best_assignment)
+    return trucks
+
+
+def save_assignment(trucks):
+    """
+    Save the orders assigned to each truck, so the assignment can be restored after evaluating other plans
+    :param trucks: List of trucks
+    :return: Saved assignment
+    """
+    return [(list(truck.Orderlist), truck.LastArrival, truck.Destination,
+             [[suborder.PickupLoc for suborder in order] for order in truck.Orderlist]) for truck in trucks]
+
+
+def restore_assignment(trucks, assignment):
+    """
+    Restore an assignment saved with 'save_assignment'
+    :param trucks: List of trucks, in the same order as when the assignment was saved
+    :param assignment: Saved assignment
+    :return: List of trucks
+    """
+    for truck, (orderlist, last_arrival, destination, pickup_locations) in zip(trucks, assignment):
+        truck.Orderlist = list(orderlist)
+        truck.LastArrival = last_arrival
+        truck.Destination = destination
+        for order, order_pickup_locations in zip(orderlist, pickup_locations):
+            for suborder, pickup_location in zip(order, order_pickup_locations):
+                suborder.PickupLoc = pickup_location
     return trucks
 
 
@@ -284,18 +426,133 @@ def free_unfulfilled_orders(trucks):
     return trucks
 
 
-def optimize_truck_assignment(trucks, order_sequence, time):
+def optimize_truck_assignment(trucks, order_sequence, time, deadline=None):
     """
     Find optimal assignment of trucks to sequence of orders
     :param trucks: List of trucks
     :param order_sequence: Sequence of trucks
     :param time: Current time
+    :param deadline: Value of time.perf_counter() after which no further orders are assigned, the first order is always
+    assigned. No deadline if None
     :return: Criterion of optimization
     """
     S_tot = 0
     for order in order_sequence:
         truck, S_truck = select_truck(trucks, order, time)
         S_tot += S_truck
+        if deadline is not None and perf_counter() > deadline:
+            break
+    return S_tot
+
+
+def compute_efficiency_matrix(trucks, orders, time):
+    """
+    Compute the optimization criterion of 'select_truck' for every combination of truck and order at once. The best
+    route of each order is found for all candidate trucks at once with the route planner, and the criterion is computed
+    with array operations
+    :param trucks: List of trucks
+    :param orders: List of orders (each a single order or a combination of orders)
+    :param time: Current time
+    :return: Array (trucks x orders) with the criterion, 0 if the truck cannot fulfill the order in time, and a
+    dictionary with the best route for each (truck index, order index) with a positive criterion
+    """
+    efficiency = np.zeros((len(trucks), len(orders)))
+    planner = get_route_planner()
+    routes = []   # Best route of all combinations
+    pair_trucks = []   # Index of the truck for each route
+    pair_orders = []   # Index of the order for each route
+    total_seconds = []   # Drive time (seconds) of each route
+    first_seconds = []   # Drive time (seconds) to the first pickup of each route
+    for o, order in enumerate(orders):
+        candidates = [t for t, truck in enumerate(trucks)
+                      if not truck.Finished and not (truck.Blueflex and truck.Base != order[0].Origin)]
+        if not candidates:
+            continue
+        order_routes, drive_seconds, pickup_seconds = planner.get_best_routes(
+            [get_route_start_location(trucks[t]) for t in candidates], [trucks[t].Base for t in candidates],
+            get_order_locations(order))
+        routes += order_routes
+        pair_trucks += candidates
+        pair_orders += [o] * len(candidates)
+        total_seconds.append(drive_seconds)
+        first_seconds.append(pickup_seconds)
+    if not routes:
+        return efficiency, dict()
+
+    # Only routes that take less than 24h are considered
+    total_seconds = np.concatenate(total_seconds)
+    first_seconds = np.concatenate(first_seconds)
+    best = np.flatnonzero(total_seconds < dt.timedelta(hours=24).total_seconds())
+    t_best, o_best = np.array(pair_trucks)[best], np.array(pair_orders)[best]
+
+    # Start time, end time and truck shift end, in seconds relative to the current time
+    start_seconds = np.array([(get_order_starting_time(truck, time) - time).total_seconds() for truck in trucks])
+    end_shift_seconds = np.array([(truck.End - time).total_seconds() for truck in trucks])
+    handling_seconds = np.array([get_handling_time(routes[r]).total_seconds() for r in best])
+    end_seconds = start_seconds[t_best] + total_seconds[best] + handling_seconds
+    loading_time_seconds = start_seconds[t_best] + first_seconds[best]
+
+    # Optimization criterion of 'compute_truck_efficiency'. Like timedelta.seconds, times are in whole seconds
+    NRC = np.array([get_order_size(order) for order in orders])[o_best]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        S_best = NRC / (np.floor(total_seconds[best]) % 86400)
+        S_worst = NRC / (np.floor(total_seconds[best] + start_seconds[t_best]) % 86400)
+    S_order = mp.w1 * S_best + mp.w2 * S_worst
+
+    # Proportion of rollcages on time of 'check_order_time', for all candidate trucks of an order at once
+    loading_times = np.datetime64(time, 'us') + np.rint(loading_time_seconds * 1e6).astype('timedelta64[us]')
+    prop_on_time = np.zeros(len(best))
+    for o, order in enumerate(orders):
+        in_order = o_best == o
+        if not in_order.any():
+            continue
+        origin = order[0].Origin
+        destination = order[-1].Destination
+        on_time_rc = np.zeros(in_order.sum())
+        for suborder in order:
+            prios = [suborder.NprioA, suborder.NprioB, suborder.NprioC, suborder.NprioD]
+            on_time_rc += suborder.Ntot * proportion_on_time_many(origin, destination, prios, suborder.Inter,
+                                                                  loading_times[in_order])
+        prop_on_time[in_order] = on_time_rc / get_order_size(order)
+
+    S_tot = S_order * prop_on_time
+    # Routes without any driving (e.g. an order from a location to itself) have no finite criterion and are skipped
+    feasible = (end_seconds < end_shift_seconds[t_best]) & (S_tot > 0) & np.isfinite(S_tot)
+    efficiency[t_best[feasible], o_best[feasible]] = S_tot[feasible]
+    best_routes = {(t, o): routes[r] for t, o, r in zip(t_best[feasible], o_best[feasible], best[feasible])}
+    return efficiency, best_routes
+
+
+@instrument
+def match_orders(trucks, orders, time, deadline=None):
+    """
+    Assign orders to trucks by solving an assignment problem that maximizes the total optimization criterion. Each
+    round, every truck can get at most one order. The assigned orders are added to the trucks, which changes their
+    starting time for the next order, and the remaining orders are assigned in the next round, until no order can be
+    assigned
+    :param trucks: List of trucks
+    :param orders: List of orders (each a single order or a combination of orders)
+    :param time: Current time
+    :param deadline: Value of time.perf_counter() after which no further rounds are done, the first round is always
+    done. No deadline if None
+    :return: Total optimization criterion of the assigned orders
+    """
+    remaining_orders = list(orders)
+    S_tot = 0
+    while remaining_orders:
+        efficiency, best_routes = compute_efficiency_matrix(trucks, remaining_orders, time)
+        truck_indices, order_indices = linear_sum_assignment(efficiency, maximize=True)
+        assigned = [(t, o) for t, o in zip(truck_indices, order_indices) if efficiency[t, o] > 0]
+        if not assigned:
+            break
+        for t, o in assigned:
+            route = best_routes[(t, o)]
+            add_order_to_truck(trucks[t], remaining_orders[o], time, travelling_time_trajectory(route), route)
+            S_tot += efficiency[t, o]
+        assigned_orders = {o for t, o in assigned}
+        remaining_orders = [order for o, order in enumerate(remaining_orders) if o not in assigned_orders]
+        if deadline is not None and perf_counter() > deadline:
+            break
     return S_tot
 
 
@@ -339,118 +596,44 @@ def add_order_to_truck(truck, order, time, travel_time, route):
 
 def travelling_time_trajectory(trajectory):
     """
-    Compute total travelling time for a trajectory (i.e.,sequence of locations)
+    Compute total travelling time for a trajectory (i.e.,sequence of locations). The travelling times are taken from
+    the route cache where possible
     :param trajectory: Sequence of locations
-    :return: Total travelling time
+    :return: List with the travelling time from the start of the trajectory to each location
+    """
+    return list(get_route_cache().get_travel_times(trajectory))
+
+
+def get_handling_time(route):
     """
-    total_time = [dt.timedelta(hours=0)]
-    for start, end in zip(trajectory, trajectory[1:]):
-        total_time.append(total_time[-1] + compute_travelling_time(start, end))
-    return total_time
+    Compute the time needed to load and unload along a route, half the loading time at every stop between the start
+    location and the base
+    :param route: Sequence of locations
+    :return: Handling time
+    """
+    return 0.5 * mp.Loading_time * (len(route) - 2)
 
 
 def get_start_location(name):
     """
-    Function that extracts the starting location for each truck from the registration documents.
+    Function that extracts the starting location for each truck from the registration documents. The location is the
+    first word of the name without digits, unless the name or this word is an alias in the location alias table
     :param name: Name that is in the registration document
     :return: Location
     """
-    name = name.strip()
-    if name == 'EXT WW':
-        name = 'XWW'
-    if name == 'EX WW':
-        name = 'XWW'
-    location = name.split(" ")[0]
-    location = ''.join([i for i in location if not i.isdigit()])
-    location = location.upper()
-    name = name.upper()
-    if location == 'ALP':
-        location = 'ALR'
-    if location == 'NWG':
-        location = 'NIWG'
-    if location == 'VILV':
-        location = 'VIL'
-    if location == 'ELST':
-        location = 'ELT'
-    if location == 'EXW':
-        location = 'XWW'
-    if location == 'BOL':
-        location = 'BFC'
-    if name == 'BFC ':
-        location = 'BFC'
-    if name == 'BOL 2':
-        location = 'TB'
-    if name == 'BOL.COM':
-        location = 'TB'
-    if location == 'BOL.COM':
-        location = 'TB'
-    if location == 'WW':
-        location = 'XWW'
-    if name == 'BLUE ALR':
-        location = 'ALR'
-    if name == 'BLUEFL ALR':
-        location = 'ALR'
-    if name == 'BLUE ALM':
-        location = 'ALR'
-    if name == 'BLUEFL TB':
-        location = 'TB'
-    if name == 'FLEX ALR':
-        location = 'ALR'
-    if name == 'BOLVW':
-        location = 'HT'
-    if name == 'BLUE FLEX ALR':
-        location = 'ALR'
-    if name == 'BLUE FLEX TB':
-        location = 'TB'
-    if name == 'BLUE TB':
-        location = 'TB'
-    if location == 'EXWW':
-        location = 'XWW'
-    if location == 'ZMB':
-        location = 'ZBM'
-    if location == 'EXTWW':
-        location = 'XWW'
-    if name == 'FLEX EXT WW':
-        location = 'XWW'
-    if location == 'EXT':
-        location = 'XWW'
-    if location == 'XSAD':
-        location = 'XASD'
-    if location == 'WMG':
-        location = 'WML'
-    if location == 'WVWN':
-        location = 'WVN'
-    if location == 'ZWO':
-        location = 'ZL'
-    if location == 'EX WW':
-        location = 'XWW'
-    if location == 'ZWD':
-        location = 'ZL'
-    if name == 'FLEX WMG':
-        location = 'WML'
-    if name == 'NWG EMB A':
-        location = 'NIWG'
-    if name == 'FLEX BOL':
-        location = 'BFC'
-    if name == 'FLEX BOL 2':
-        location = 'BFC'
-    if location == 'FLEX':
-        location = 'BFC'
-    if location == 'FLEX':
-        location = 'ASD ZO'
-    if name == 'FLEX BOL 1':
-        location = 'BFC'
-    if name == 'FLEX BFC':
-        location = 'TB'
-    if name == 'BLUEFLEX ALR':
-        location = 'ALR'
-    if name == 'BLUEFLEX TB':
-        location = 'TB'
-    if name == 'BLUEFLEX TB':
-        location = 'TB'
-    if name == 'BLEUFLEX TB':
-        location = 'TB'
-    return location
+    return get_start_locations(pd.Series([name])).iloc[0]
+
+
+def get_start_locations(names):
+    """
+    Vectorized version of 'get_start_location' that extracts the starting locations of all trucks at once
+    :param names: Series with the names that are in the registration document
+    :return: Series with the locations
+    """
+    names = names.str.strip().str.upper()
+    codes = names.str.split(" ").str[0].str.replace(r'\d', '', regex=True)
+    codes = la.normalize_locations(codes, 'start_code')
+    return la.normalize_locations(names, 'start_name', default=codes)
 
 
 def fulfill_order(order, truck, time):
@@ -492,7 +675,7 @@ def start_order_fulfillment(truck, event_list, time, fulfilled_orders, unfulfill
     """
     Start fullfilment of an order
     :param truck: Truck to fulfill order
-    :param event_list: List of all (future) events
+    :param event_list: Queue of all (future) events
     :param time: Current time
     :param fulfilled_orders: List of fulfilled orders
     :param unfulfilled_orders: List of unfulfilled orders
@@ -509,8 +692,7 @@ def start_order_fulfillment(truck, event_list, time, fulfilled_orders, unfulfill
     # events. These are to be replaced, now that the route of the truck was altered
     event_list = remove_return_trigger(event_list, truck)
     event_list = remove_arrival_trigger(event_list, truck)
-    event_list.append(Arrival)  # Add new arrival trigger
-    event_list = sorted(event_list, key=lambda x: x.Time)  # Sort updated event list by time
+    event_list.append(Arrival)  # Add new arrival trigger, the queue keeps the events ordered by time
     # Update list of fulfilled orders
     (fulfilled_orders, unfulfilled_orders) = update_order_list(order, fulfilled_orders, unfulfilled_orders)
     return truck, event_list, fulfilled_orders, unfulfilled_orders
@@ -529,62 +711,60 @@ def set_order_to_fulfilled(order, truckname):
     return order
 
 
+def get_route_start_location(truck):
+    """
+    Get the location from which a truck starts its next route
+    :param truck: Truck
+    :return: Destination of the truck if it is on its way, otherwise its location
+    """
+    if truck.Arrival is not None:
+        return truck.Destination
+    return truck.Location
+
+
+def get_order_locations(order):
+    """
+    Get the locations of an order, or combination of orders
+    :param order: List of orders
+    :return: List with an (origin, destination) tuple for each order
+    """
+    return [(suborder.Origin, suborder.Destination) for suborder in order]
+
+
+@instrument
 def get_best_route(truck, order):
     """
-    Compute travelling time for truck to fulfill order, and find optimal route
+    Compute travelling time for truck to fulfill order, and find optimal route. The route planner considers all
+    sequences of pickups and drops of the orders of a combination, where each order is picked up before it is dropped
     :param truck: Truck to fulfill order
     :param order: Order to be fulfilled
-    :return: Optimal route, and corresponding travelling time
+    :return: Optimal route, and corresponding travelling time. None, None if the route takes 24 hours or more
     """
-    if truck.Arrival is not None:
-        start_location = truck.Destination
-    else:
-        start_location = truck.Location
-    if len(order) == 1:
-        routes = [[start_location, order[0].Origin, order[0].Destination, truck.Base]]
-    elif len(order) == 2 and order[0].Origin == order[1].Origin:
-        routes = [[start_location, order[0].Origin, order[0].Destination, order[1].Destination, truck.Base],
-                  [start_location, order[0].Origin, order[1].Destination, order[0].Destination, truck.Base]]
-    else:
-        routes = [[start_location, order[0].Origin, order[1].Origin, order[1].Destination, truck.Base],
-                  [start_location, order[1].Origin, order[0].Origin, order[0].Destination, truck.Base]]
-    travel_time_min = dt.timedelta(hours=24)
-    best_route = None
-    best_travel_time = None
-    for route in routes:
-        travel_time = travelling_time_trajectory(route)
-        if travel_time[-1] < travel_time_min:
-            travel_time_min = travel_time[-1]
-            best_route = route
-            best_travel_time = travel_time
-    if best_route is not None:
-        return best_route, best_travel_time
-    else:
+    best_route, drive_seconds = get_route_planner().get_best_route(get_route_start_location(truck), truck.Base,
+                                                                   get_order_locations(order))
+    if drive_seconds >= dt.timedelta(hours=24).total_seconds():
         return None, None
+    return best_route, travelling_time_trajectory(best_route)
 
 
 def move_to_pickup_loc(truck, event_list, time):
     truck.Moving_to_Pickup = True
     event_list = remove_return_trigger(event_list, truck)
     event_list = remove_arrival_trigger(event_list, truck)
-    arrival_time = time + mp.drive_times.loc[truck.Location, truck.Orderlist[0][0].PickupLoc]
+    arrival_time = time + compute_travelling_time(truck.Location, truck.Orderlist[0][0].PickupLoc)
     arrival = ArrivalTrigger(arrival_time, truck, truck.Orderlist[0][0].PickupLoc)
-    event_list.append(arrival)  # Add new arrival trigger
-    event_list = sorted(event_list, key=lambda x: x.Time)  # Sort updated event list by time
+    event_list.append(arrival)  # Add new arrival trigger, the queue keeps the events ordered by time
     return truck, event_list
 
 
 def remove_return_trigger(event_list, truck):
     """
     Function to remove the trigger for a truck to return to its base from the event list
-    :param event_list: List of (chronological) events
+    :param event_list: Queue of (chronological) events
     :param truck: Truck for which the trigger is to be removed
     :return: New version of the event list
     """
-    for event in list(event_list):
-        if isinstance(event, ReturnTrigger):
-            if event.Truck == truck:
-                event_list.remove(event)
+    event_list.cancel_triggers(truck, ReturnTrigger)
     return event_list
 
 
@@ -592,14 +772,11 @@ def remove_arrival_trigger(event_list, truck):
     """
     Function that removes the trigger for a truck to arrive at its destination from the event list. This function is
     called when a truck gets a new destination
-    :param event_list: List of (chronological) events
+    :param event_list: Queue of (chronological) events
     :param truck: Truck for which the trigger is to be removed
     :return: New version of the list of events
     """
-    for event in list(event_list):
-        if isinstance(event, ArrivalTrigger):
-            if event.Truck == truck:
-                event_list.remove(event)
+    event_list.cancel_triggers(truck, ArrivalTrigger)
     return event_list
 
 
@@ -656,27 +833,32 @@ def check_unfulfilled_orders(truck, orderlist, time):
     :param loading_unloading_time: Time needed for the truck to load and unload a single order
     :return: The order closest to the truck's present location
     """
-    min_travel_time = dt.timedelta(hours=24)
-    closest_order = None
-    base_time = compute_travelling_time(truck.Location, truck.Base)
-    for order in orderlist:
-        travel_time = compute_travelling_time(truck.Location, order.Origin)
-        return_time = compute_travelling_time(order.Destination, truck.Base)
-        fulfillment_time = mp.Loading_time + compute_travelling_time(order.Origin, order.Destination)
-        total_time = time + travel_time + return_time + fulfillment_time
-        if total_time < truck.End:
-            extra_time = travel_time + fulfillment_time + return_time - base_time
-            if extra_time < min_travel_time:
-                min_travel_time = extra_time
-                closest_order = order
-    return closest_order
+    if not orderlist:
+        return None
+    drive_times = get_drive_time_matrix()
+    n_orders = len(orderlist)
+    origins = [order.Origin for order in orderlist]
+    destinations = [order.Destination for order in orderlist]
+    # Drive times (seconds) to the origin, from the origin to the destination, and from the destination back to base
+    drive_seconds = (drive_times.get_seconds_many([truck.Location] * n_orders, origins).astype(np.int64)
+                     + drive_times.get_seconds_many(origins, destinations)
+                     + drive_times.get_seconds_many(destinations, [truck.Base] * n_orders))
+    loading_seconds = mp.Loading_time.total_seconds()
+    base_seconds = drive_times.get_seconds(truck.Location, truck.Base)
+    extra_seconds = drive_seconds + loading_seconds - base_seconds
+    # Only orders that can be finished before the end of the shift, with less than 24 hours extra time, are considered
+    feasible = (drive_seconds + loading_seconds < (truck.End - time).total_seconds()) \
+        & (extra_seconds < dt.timedelta(hours=24).total_seconds())
+    if not feasible.any():
+        return None
+    return orderlist[int(np.argmin(np.where(feasible, extra_seconds, np.inf)))]
 
 
 def clean_orders(tekorten):
     """
     Function to clean data with orders from the registration documents
     :param tekorten: Input data from registration document
-    :return: Cleaned data
+    :return: Cleaned data, with the time of day of each order in column 'Tijd' as a timedelta since midnight
     """
     tekorten = tekorten[tekorten['Tijd'].notnull()]
     tekorten = tekorten[tekorten['Totaal'] > 0]
@@ -687,56 +869,10 @@ def clean_orders(tekorten):
     tekorten = tekorten[tekorten['Naar'].str.contains('ECS')==False]
     tekorten = tekorten[tekorten['Naar'] != 'FR']
     pd.options.mode.chained_assignment = None
-    tekorten['Tijd'] = tekorten['Tijd'].apply(lambda x: x.replace("u", ":") if type(x) == str else x)
-    tekorten['Tijd'] = tekorten['Tijd'].apply(lambda x: x.replace("U", ":") if type(x) == str else x)
-    tekorten['Tijd'] = tekorten['Tijd'].apply(
-        lambda x: dt.datetime.strptime(x, "%H:%M").time() if type(x) == str else x
-    )
-    pd.options.mode.chained_assignment = "warn"
-    pd.options.mode.chained_assignment = None
-    tekorten['Van'] = tekorten['Van'].apply(lambda x: x.strip())
-    tekorten['Naar'] = tekorten['Naar'].apply(lambda x: x.strip())
-    tekorten['Van'] = tekorten['Van'].apply(lambda x: x.upper())
-    tekorten['Naar'] = tekorten['Naar'].apply(lambda x: x.upper())
-    tekorten.replace(['TIEL'], ['TL'], inplace=True)
-    tekorten.replace(['ALP'], ['ALR'], inplace=True)
-    tekorten.replace(['NWG'], ['NIWG'], inplace=True)
-    tekorten.replace(['ZMB'], ['ZBM'], inplace=True)
-    tekorten.replace(['WVWN'], ['WVN'], inplace=True)
-    tekorten.replace(['XSAD'], ['XASD'], inplace=True)
-    tekorten.replace(['XTL'], ['TL'], inplace=True)
-    tekorten.replace(['TL '], ['TL'], inplace=True)
-    tekorten.replace(['ELST'], ['ELT'], inplace=True)
-    tekorten.replace(['EXTWW'], ['XWW'], inplace=True)
-    tekorten.replace(['WW'], ['XWW'], inplace=True)
-    tekorten.replace(['Ex WW'], ['XWW'], inplace=True)
-    tekorten.replace(['ASDZO'], ['ASD'], inplace=True)
-    tekorten.replace(['ASD ZO'], ['ASD'], inplace=True)
-    tekorten.replace(['ASZO'], ['ASD'], inplace=True)
-    tekorten.replace(['SNI (BE)'], ['SNI'], inplace=True)
-    tekorten.replace(['OEV (BE)'], ['OEV'], inplace=True)
-    tekorten.replace(['OEVEL'], ['OEV'], inplace=True)
-    tekorten.replace(['VIL (BE)'], ['VIL'], inplace=True)
-    tekorten.replace(['VILV'], ['VIL'], inplace=True)
-    tekorten.replace(['DTD (BE)'], ['DTD'], inplace=True)
-    tekorten.replace(['WMG'], ['WML'], inplace=True)
-    tekorten.replace(['WML (BE)'], ['WML'], inplace=True)
-    tekorten.replace(['ARD (BE)'], ['ARD'], inplace=True)
-    tekorten.replace(['NAM (BE)'], ['NAM'], inplace=True)
-    tekorten.replace(['STT (BE)'], ['STT'], inplace=True)
-    tekorten.replace(['TEM'], ['NAM'], inplace=True)    ### Deze nog vervangen..
-    tekorten.replace(['TEM (BE)'], ['NAM'], inplace=True)
-    tekorten.replace(['STN'], ['STT'], inplace=True)
-    tekorten.replace(['WB (BE)'], ['WB'], inplace=True)
-    tekorten.replace(['ZWO'], ['ZL'], inplace=True)
-    tekorten.replace(['ZWD'], ['ZL'], inplace=True)
-    tekorten.replace(['EXT WW'], ['XWW'], inplace=True)
-    tekorten.replace(['EX WW'], ['XWW'], inplace=True)
-    tekorten.replace(['SKP NMG'], ['SKP'], inplace=True)
-    tekorten.replace(['SKP NMG '], ['SKP'], inplace=True)
-    tekorten.replace(['SKP '], ['SKP'], inplace=True)
-    tekorten.replace(['BFC '], ['BFC'], inplace=True)
-    tekorten.replace(['WMG'], ['WML'], inplace=True)
+    tekorten['Tijd'] = parse_times(tekorten['Tijd'])
+    tekorten = tekorten.dropna(subset=['Tijd'])
+    for column in ['Van', 'Naar']:
+        tekorten[column] = la.normalize_locations(tekorten[column].str.strip().str.upper(), 'registration')
     tekorten = tekorten[tekorten['Naar'] != tekorten['Van']]
     pd.options.mode.chained_assignment = "warn"
   #  tekorten['A'] = tekorten['A'].apply(lambda x: x if type(x) == int else 0)
@@ -744,123 +880,120 @@ def clean_orders(tekorten):
   #  tekorten['C'] = tekorten['C'].apply(lambda x: x if type(x) == int else 0)
   #  tekorten['D'] = tekorten['D'].apply(lambda x: x if type(x) == int else 0)
   #  tekorten['BE'] = tekorten['BE'].apply(lambda x: x if type(x) == int else 0)
-    tekorten['Tijd'] = tekorten['Tijd'].apply(lambda x: x.time() if type(x) == dt.datetime else x)
     return tekorten
 
 
-def combine_orders(order, event_list, unfulfilled_orders):
+def combine_orders(order, event_list, unfulfilled_orders, max_orders=None, index=None):
     """
     Check if the present order can be combined with any other orders that were called in at the same time, or are still
-    unresolved
+    unresolved. Orders can be combined if they share their origin or destination and their rollcages fit in a truck.
+    Orders called in at the same time are added first, then the unresolved orders, each time the one with the most
+    rollcages that still fits, up to a max. number of orders per ride. The orders of a combination are linked to each
+    other in their state
     :param order: Present order
-    :param event_list: List of upcoming events (to check if there are any orders called in at the same time)
+    :param event_list: Queue of upcoming events (to check if there are any orders called in at the same time)
     :param unfulfilled_orders: List of previous orders that are not yet completed
-    :return: List of combined orders (may consist of only the present order, or include an additional order
-    """
-    for cord in event_list:
-        if cord.Time <= order.Time and isinstance(cord, Order):
-            order, cord = check_combination(order, cord)
-            if order.Combination == cord:
-                event_list.remove(cord)
-                return [order, cord], event_list, unfulfilled_orders
-
-    for cord in unfulfilled_orders:
-        if len(cord) == 1:
-            order, cord[0] = check_combination(order, cord[0])
-            if order.Combination == cord[0]:
-                unfulfilled_orders.remove(cord)
-                return [order, cord[0]], event_list, unfulfilled_orders
-
-    return [order], event_list, unfulfilled_orders
-
-
-def check_combination(order1, order2):
-    """
-    Check whether two orders can be combined. If the combination is possible, a link to one order is stored in the state
-    of the other order, and vice versa.
-    :param order1: First order
-    :param order2: Second order
-    :return: Both orders
-    """
-    if order1.Ntot + order2.Ntot <= mp.truck_cap:
-        if order1.Origin == order2.Origin or order1.Destination == order2.Destination:
-            order1.Combination = order2
-            order2.Combination = order1
-    return order1, order2
+    :param max_orders: Max. number of orders in a combination, defaults to MAX_ORDERS_PER_RIDE in config
+    :param index: OpenOrderIndex of the pending orders in the event list and the unfulfilled orders, kept up to date
+    by the caller. Combined orders are removed from the index. If None, an index is built from the event list and the
+    unfulfilled orders
+    :return: List of combined orders (may consist of only the present order, or include additional orders)
+    """
+    max_orders = config.MAX_ORDERS_PER_RIDE if max_orders is None else max_orders
+    if index is None:
+        index = OpenOrderIndex.from_events(mp.truck_cap, event_list, unfulfilled_orders, order.Time, Order)
+    index.discard(order)
+    combination = [order]
+    while len(combination) < max_orders:
+        cord = index.find(combination, max_orders, order.Time)
+        if cord is None:
+            break
+        index.discard(cord)
+        event_list.remove(cord)
+        combination.append(cord)
+    while len(combination) < max_orders:
+        cord = index.find(combination, max_orders)
+        if cord is None:
+            break
+        index.discard(cord)
+        unfulfilled_orders.remove(cord)
+        combination += cord
+
+    if len(combination) > 1:
+        for suborder in combination:
+            suborder.Combination = [cord for cord in combination if cord is not suborder]
+    return combination, event_list, unfulfilled_orders
+
+
+def parse_times(values):
+    """
+    Parse the times of day in a column of the registration documents, with vectorized string operations. Times are
+    written as '8:30', '08u30' or '08:30:00', or are read from Excel as datetime.time or datetime objects
+    :param values: Series with the times
+    :return: Series with the time since midnight as timedelta, NaT for values that are not a time of day
+    """
+    types = values.map(type)
+    is_datetime = types.isin([dt.datetime, pd.Timestamp])
+    text = values.where(types.isin([str, dt.time])).astype(str).str.strip().str.replace('[uU]', ':', regex=True)
+    valid = text.str.fullmatch(r'\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?')
+    text = text.where(text.str.count(':') == 2, text + ':00')
+    times = pd.to_timedelta(text.where(valid), errors='coerce')
+    if is_datetime.any():
+        datetimes = pd.to_datetime(values.where(is_datetime))
+        times = times.where(~is_datetime, datetimes - datetimes.dt.normalize())
+    return times.where(times < pd.Timedelta(days=1))
 
 
 def add_date(tekorten, day):
     """
-    Add date to the afvoertekorten read from the registration document (field contains only time)
-    :param tekorten: List of afvoertekorten read from the registration document
+    Add date to the afvoertekorten read from the registration document (field contains only time). Orders are in
+    chronological order, so from the first order before 4:00 on, all orders are on the next day
+    :param tekorten: List of afvoertekorten read from the registration document, as cleaned by 'clean_orders'
     :param day: Process day
     :return: List of afvoertekorten, including added dates
     """
-    next_day = 0
-    for ind, row in tekorten.iterrows():
-        time = row['Tijd']
-        if time < dt.time(4, 00) and next_day == 0:
-            day = day + dt.timedelta(days=1)
-            next_day = 1
-        tekorten.at[ind, 'Tijd'] = dt.datetime.combine(day, row['Tijd'])
+    next_day = (tekorten['Tijd'] < pd.Timedelta(hours=4)).cummax()
+    tekorten['Tijd'] = pd.Timestamp(day) + pd.to_timedelta(next_day.astype(int), unit='D') + tekorten['Tijd']
     return tekorten
 
 
+@instrument
 def read_flex(registratie_path, day):
     """
     Function that reads the available flex trucks from the registration maintained by Control Room. Some data cleaning
-    is performed, and a list of Trucks is initialised.
-    :param registratie_path: Path to the registration document
+    is performed, and a list of Trucks is initialised. The shift times are parsed with vectorized operations
+    :param registratie_path: Path to the registration document, or the document opened as pd.ExcelFile, so that it is
+    parsed only once when the afvoertekorten are read as well
+    :param day: Process day
     :return: List of initialised trucks.
     """
-    try:
-        df = pd.read_excel(registratie_path, sheet_name='Flex')
-    except:
-        df = pd.read_excel(registratie_path, sheet_name='Flex Nieuw')
+    excel = registratie_path if isinstance(registratie_path, pd.ExcelFile) else pd.ExcelFile(registratie_path)
+    df = pd.read_excel(excel, sheet_name='Flex' if 'Flex' in excel.sheet_names else 'Flex Nieuw')
 
     df.rename(columns={"Unnamed: 2": "TStart", "Unnamed: 3": "TEnd"}, inplace=True)
     df.rename(columns={"Start": "TStart", "Eind": "TEnd"}, inplace=True)
 
-    df['TStart'] = df['TStart'].apply(lambda x: x.replace('u', ':') if type(x) == str else x)
-    df['TStart'] = df['TStart'].apply(lambda x: x.replace('U', ':') if type(x) == str else x)
-    df['TStart'] = df['TStart'].apply(lambda x: dt.datetime.strptime(x, "%H:%M").time() if (type(x) == str and len(x) == 5) else x)
-    df['TStart'] = df['TStart'].apply(lambda x: dt.datetime.strptime(x, "%H:%M:%S").time() if (type(x) == str and len(x) == 8) else x)
-    df['TStart'] = df['TStart'].apply(lambda x: x if type(x) == dt.time else np.nan)
-    df = df.dropna(subset=['TStart'])
-
-    df['TEnd'] = df['TEnd'].apply(lambda x: x.replace('u', ':') if type(x) == str else x)
-    df['TEnd'] = df['TEnd'].apply(lambda x: x.replace('U', ':') if type(x) == str else x)
-    df['TEnd'] = df['TEnd'].apply(lambda x: dt.datetime.strptime(x, "%H:%M").time() if (type(x) == str and len(x) == 5) else x)
-    df['TEnd'] = df['TEnd'].apply(lambda x: dt.datetime.strptime(x, "%H:%M:%S").time() if (type(x) == str and len(x) == 8) else x)
-    df['TEnd'] = df['TEnd'].apply(lambda x: x if type(x) == dt.time else np.nan)
-    df = df.dropna(subset=['TEnd'])
-    df = df.reset_index(drop=True)
-
-    start_day = day
-    df['StartDay'] = start_day
-    for ind, row in df.iterrows():
-        if type(row['TStart']) == dt.time:
-            if row['TStart'] < dt.time(hour=6):
-                start_day = day + dt.timedelta(hours=24)
-            df['StartDay'].iloc[ind] = start_day
-    df = df.dropna(subset=['Flex ', 'TStart', 'TEnd'])
-    df['EndDay'] = df.apply(lambda x: x.StartDay if x.TEnd > x.TStart else day + dt.timedelta(hours=24), axis=1)
-
-    df['Flex '] = df['Flex '].apply(lambda x: x.upper())
-
-    if 'Laden' in df.columns:
-        df['Laden'] = df['Laden'].apply(lambda x: x.upper() if type(x) == str else x)
-        df = df.drop(df[df['Laden'].str.contains('UITGELEEND') == True].index)
-    if 'Leeg' in df.columns:
-        df['Leeg'] = df['Leeg'].astype(str)
-        df['Leeg'] = df['Leeg'].apply(lambda x: x.upper() if type(x) == str else x)
-        df = df.drop(df[df['Leeg'].str.contains('UITGELEEND') == True].index)
-
-
-    df['ShiftStart'] = df.apply(lambda x: dt.datetime.combine(x.StartDay, x.TStart), axis=1)
-    df['ShiftEnd'] = df.apply(lambda x: dt.datetime.combine(x.EndDay, x.TEnd), axis=1)
-
-    df['External'] = df['Wagencode '].apply(lambda x: False if len(str(x)) == 3 else True)
+    df['TStart'] = parse_times(df['TStart'])
+    df['TEnd'] = parse_times(df['TEnd'])
+    df = df.dropna(subset=['TStart', 'TEnd']).reset_index(drop=True)
+
+    # Shifts are in chronological order, so from the first shift that starts before 6:00 on, all shifts start on the
+    # next day. Shifts that end before they start, end on the next day
+    df['StartDay'] = (df['TStart'] < pd.Timedelta(hours=6)).cummax().astype(int)
+    df['EndDay'] = df['StartDay'].where(df['TEnd'] > df['TStart'], 1)
+    df = df.dropna(subset=['Flex '])
+
+    df['Flex '] = df['Flex '].astype(str).str.upper()
+
+    for column in ['Laden', 'Leeg']:
+        if column in df.columns:
+            df = df[~df[column].astype(str).str.upper().str.contains('UITGELEEND')]
+
+    midnight = pd.Timestamp(day)
+    df['ShiftStart'] = midnight + pd.to_timedelta(df['StartDay'], unit='D') + df['TStart']
+    df['ShiftEnd'] = midnight + pd.to_timedelta(df['EndDay'], unit='D') + df['TEnd']
+
+    df['External'] = df['Wagencode '].astype(str).str.len() != 3
 
     trucks = generate_trucks(df)
 
@@ -870,31 +1003,37 @@ def read_flex(registratie_path, day):
 def generate_trucks(df):
     """
     Function to initialize trucks that are available for the day, using input data from the registration documents
-    maintained by control room
-    :param df: dataframe based on registration document
-    :param start_day: date at the start of the process
+    maintained by control room. The names, start locations and types of all trucks are derived at once
+    :param df: dataframe based on registration document, with the start and end of the shifts in columns 'ShiftStart'
+    and 'ShiftEnd'
     :return: list of available trucks, including initital state for each truck
     """
+    names = df['Flex '].str.replace(" ", "")
+    start_locations = get_start_locations(df['Flex '])
+    blueflex = names.str.contains('BLUE|BOL')
     truck_list = []
-    for ind, row in df.iterrows():
-        startloc = get_start_location(row['Flex '])
-        name = row['Flex '].replace(" ", "")
-        truck = Truck(name=name, location=startloc, start=row['ShiftStart'], end=row['ShiftEnd'], base=startloc, ext=row['External'])
-        if 'BLUE' in truck.Name or 'BOL' in truck.Name:
-            truck.Blueflex = True
+    for name, startloc, start, end, ext, blue in zip(names, start_locations, df['ShiftStart'], df['ShiftEnd'],
+                                                       df['External'].tolist(), blueflex.tolist()):
+        truck = Truck(name=name, location=startloc, start=start, end=end, base=startloc, ext=ext)
+        truck.Blueflex = blue
         truck_list.append(truck)
     return truck_list
 
 
-def read_tekorten(registratie_path, day):
+@instrument
+def read_tekorten(registratie_path, day, predictions_path=None):
     """
     Function to read afvoertekorten, either from a file generated based on afvoerpredictions, or from the registration
     maintained by control room.
-    :param registratie_path:
+    :param registratie_path: Path to the registration document, or the document opened as pd.ExcelFile
+    :param day: Process day
+    :param predictions_path: Path to the file generated based on afvoerpredictions, used if mp.Afvoer_predictions is
+    set. Defaults to 'generated_orders.xlsx'
     :return: Dataframe containing afvoertekorten
     """
     if mp.Afvoer_predictions:
-        Tekorten = pd.read_excel("generated_orders.xlsx", sheet_name='orders')
+        predictions_path = "generated_orders.xlsx" if predictions_path is None else predictions_path
+        Tekorten = pd.read_excel(predictions_path, sheet_name='orders')
     else:
         Tekorten = pd.read_excel(registratie_path, sheet_name='Afvoertekorten')
         Tekorten = clean_orders(Tekorten)
@@ -907,9 +1046,9 @@ def generate_event_list(tekorten, truck_list):
     Function to generate an initial list with events read in from the registration document
     :param tekorten: Afvoertekorten, as read from registration document
     :param truck_list: List of trucks, taken from registration document
-    :return: list of events
+    :return: queue of events, ordered by time
     """
-    event_list = []
+    event_list = EventQueue()
     tekorten.fillna({'A': 0, 'B': 0, 'C': 0, 'D': 0, 'BE': 0}, inplace=True)
 
     tekorten['Oplossing'] = tekorten.apply(lambda x: x.Oplossing.upper() if x.Status == 'Opgelost' and type(x.Oplossing) == str else None, axis=1)
@@ -926,7 +1065,6 @@ def generate_event_list(tekorten, truck_list):
         return_time = truck.End - return_time
         return_event = ReturnTrigger(truck, return_time)
         event_list.append(return_event)
-    event_list = sorted(event_list, key=lambda x: x.Time)
     return event_list
 
 
@@ -963,77 +1101,50 @@ def check_shift_extension(trucks, orders, time):
     """
     Function that generates a list of all external trucks that could accept an order if the shift were extended.
     :param trucks: List of trucks
-    :param orders: List of orders (either 1 order or 2 combined orders with the same starting location)
+    :param orders: List of orders (a single order or a combination of orders)
     :param time: Current time
     :return: List of trucks that could finish the order in time
     """
     available_trucks = []
-    if len(orders) == 1:
-        for truck in trucks:
-            if truck.Active and truck.External:
-                if truck.Arrival is not None:
-                    start_time = truck.Arrival
-                else:
-                    start_time = time
-
-                travel_time_pickup = compute_travelling_time(truck.Location, orders[0].Origin)
-                travel_time_delivery = compute_travelling_time(orders[0].Origin, orders[0].Destination)
-                travel_time_return = compute_travelling_time(orders[0].Destination, truck.Base)
-                end_time = start_time + travel_time_pickup + travel_time_delivery + travel_time_return + \
-                    mp.Loading_time
-                if end_time < (truck.End + mp.shift_extension):
-                    available_trucks.append(truck)
-    if len(orders) == 2:
-        for truck in trucks:
-            if truck.Active and truck.External:
-                if truck.Arrival is not None:
-                    start_time = truck.Arrival
-                else:
-                    start_time = time
-
-                travel_time_pickup = compute_travelling_time(truck.Location, orders[0].Origin)
-                travel_time_delivery1 = compute_travelling_time(orders[0].Origin, orders[0].Destination)
-                travel_time_delivery2 = compute_travelling_time(orders[0].Origin, orders[1].Destination)
-                if travel_time_delivery1 < travel_time_delivery2:
-                    travel_time_delivery_tot = travel_time_delivery1 + \
-                                               compute_travelling_time(
-                                                   orders[0].Destination, orders[1].Destination
-                                               )
-                    travel_time_return = compute_travelling_time(orders[1].Destination, truck.Base)
-                else:
-                    travel_time_delivery_tot = travel_time_delivery1 + \
-                                               compute_travelling_time(
-                                                   orders[1].Destination, orders[0].Destination
-                                               )
-                    travel_time_return = compute_travelling_time(orders[0].Destination, truck.Base)
-                end_time = start_time + travel_time_pickup + travel_time_delivery_tot + \
-                    travel_time_return + mp.Loading_time * 1.5
-                if end_time < (truck.End + mp.shift_extension):
-                    available_trucks.append(truck)
+    planner = get_route_planner()
+    for truck in trucks:
+        if truck.Active and truck.External:
+            if truck.Arrival is not None:
+                start_time = truck.Arrival
+            else:
+                start_time = time
+
+            route, drive_seconds = planner.get_best_route(truck.Location, truck.Base, get_order_locations(orders))
+            end_time = start_time + dt.timedelta(seconds=drive_seconds) + get_handling_time(route)
+            if end_time < (truck.End + mp.shift_extension):
+                available_trucks.append(truck)
     return available_trucks
 
 
-def compute_drive_times(path):
+@instrument
+def compute_drive_times(path, cache_path=None):
+    """
+    Compute the drive times between all addresses in the address list. Coordinates and drive times are taken from the
+    drive-time cache where possible, so only new or changed addresses are geocoded and routed
+    :param path: Path of the address list
+    :param cache_path: Directory of the drive-time cache, defaults to PATH_DRIVE_TIME_CACHE in config
+    :return: DataFrame with the drive times (datetime.timedelta) between all locations
+    """
     df = pd.read_csv(path, sep=';')
+    cache = DriveTimeCache(config.PATH_DRIVE_TIME_CACHE if cache_path is None else cache_path,
+                           pd.Timedelta(days=config.DRIVE_TIME_CACHE_MAX_AGE))
 
-    for i in df.index:
-        lat, lon = geocoderen.geocoderen(df.loc[i, "Straat"],
-                                         df.loc[i, "Huisnummer"],
-                                         df.loc[i, "Postcode"],
-                                         df.loc[i, "Plaats"],
-                                         df.loc[i, "Land"])
-        df.loc[i, "lat"] = lat
-        df.loc[i, "lon"] = lon
+    df[["lat", "lon"]] = cache.get_coordinates(df, geocoderen.geocoderen)
     afk = df['Afk']
 
     df = prepare_distance_time_matrices.add_AdresID(df)
 
     df = df[["AdresID", "lat", "lon"]]
-    df_distances, df_durations = prepare_distance_time_matrices.times_distances_from_scratch(df)
+    durations = cache.get_durations(
+        df, lambda df_points: prepare_distance_time_matrices.times_distances_from_scratch(df_points)[1])
+    cache.write()
 
-    df_durations = df_durations / 60
-    df_durations.columns = afk
-    df_durations.index = afk
+    df_durations = pd.DataFrame(durations / 60, index=afk, columns=afk)
     df_durations = df_durations.applymap(format_drive_times)
     return df_durations
 
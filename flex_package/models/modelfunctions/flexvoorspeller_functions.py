@@ -1,11 +1,13 @@
 import numpy as np
 import pandas as pd
-import datetime
 import csv
+import hashlib
 import boto3
 import random
+import fsspec
 import flex_package.config as config
-import awswrangler as wr
+import flex_package.data.ingestion as ingestion
+from flex_package.instrumentation import instrument
 
 
 class Order:
@@ -16,15 +18,16 @@ class Order:
         self.Destination = destination
 
 
-def read_afvoer_data(file):
+@instrument
+def read_afvoer_data(file, start=None, end=None):
     """
     Function that reads the 'afvoerline' predictions from a datafile generated by the 'afvoerlijnvoorspeller'
     :param file: path from which to read the datafile
+    :param start: predictions before this time are dropped while reading, e.g. the start of the process day
+    :param end: predictions at or after this time are dropped while reading, e.g. the end of the process day
     :return: DataFrame with predicted afvoer for each depot
     """
-    df = wr.s3.read_csv(file)
-    df['date_time'] = df['date_time'].apply(lambda x: datetime.datetime.strptime(x, '%d/%m/%Y %H:%M'))
-    return df
+    return ingestion.read_afvoer_csv(file, start, end)
 
 
 def generate_destinations(origin, df_afv):
@@ -35,6 +38,30 @@ def generate_destinations(origin, df_afv):
     :return: List of destinations
     """
     destinations = list(df_afv[df_afv['origin'] == origin]['crossdock'].unique())
+    return remove_excluded_destinations(origin, destinations)
+
+
+def generate_destination_dict(df_afv):
+    """
+    Generate the lists of destinations to be considered for all depots of origin at once. Gives the same destinations as
+    'generate_destinations', but uses a single groupby instead of filtering the dataframe for every depot
+    :param df_afv: Dataframe containing the 'afvoer' generated at each depot for crossdocks
+    :return: Dictionary containing the list of destinations for each depot of origin
+    """
+    destination_dict = dict()
+    for origin, crossdocks in df_afv.groupby('origin', sort=False, observed=True)['crossdock']:
+        destination_dict[origin] = remove_excluded_destinations(origin, list(crossdocks.unique()))
+    return destination_dict
+
+
+def remove_excluded_destinations(origin, destinations):
+    """
+    Remove the destinations for which no afvoer is considered, i.e. the depot of origin itself and some locations that
+    are not crossdocks
+    :param origin: Depot from which the 'afvoer' is considered
+    :param destinations: List of possible destinations
+    :return: List of destinations
+    """
     if origin in destinations:
         destinations.remove(origin)
     if 'XXX' in destinations:
@@ -76,6 +103,33 @@ def generate_inter_df(origin, destination, df_int):
     return df
 
 
+def index_pairs(df, origin_column, destination_column):
+    """
+    Split a dataframe into slices for each combination of origin and destination in a single groupby pass. Looking up
+    a pair in the result replaces filtering the full dataframe with boolean masks for every pair
+    :param df: Dataframe to be split, e.g. afvoer predictions or inter transports
+    :param origin_column: Name of the column containing the origin
+    :param destination_column: Name of the column containing the destination
+    :return: Dictionary containing the dataframe for each (origin, destination) tuple
+    """
+    return {pair: df_pair for pair, df_pair in df.groupby([origin_column, destination_column], sort=False,
+                                                           observed=True)}
+
+
+def get_pair_df(pair_index, origin, destination, df):
+    """
+    Get the slice of a dataframe for a combination of origin and destination from an index made with 'index_pairs'
+    :param pair_index: Dictionary containing the dataframe for each (origin, destination) tuple
+    :param origin: Origin
+    :param destination: Destination
+    :param df: Dataframe from which the index was made, used to return an empty slice for unknown pairs
+    :return: Dataframe with the rows for the combination of origin and destination
+    """
+    if (origin, destination) in pair_index:
+        return pair_index[(origin, destination)]
+    return df.iloc[0:0]
+
+
 def generate_event_times(df_afv, df_int):
     """
     Makes a chronologically sorted list of all times at which an event takes place, and removes any duplicates. Events
@@ -151,6 +205,7 @@ def add_inter_transports(afv, afv_time, df_int, origin, destination, time, max_l
     return afv_time
 
 
+@instrument
 def update_inter_transports(afv_time, df_int, time, max_load):
     """
     Function to add the effects of inter transports on the stock of rollcages present at a depot. For each inter-
@@ -167,23 +222,42 @@ def update_inter_transports(afv_time, df_int, time, max_load):
     # In the loop below, we remove inter transports from the dataframe documenting changes in the number of RC on the
     # floor. The reason that these are removed is to replace them with the most recent numbers
     for ind, row in afv_time.iterrows():
-        if row['date_time'] > config.current_time and row['event'] == 'Inter':
+        if row['date_time'] > time and row['event'] == 'Inter':
             afv_time.drop(index=ind, inplace=True)
 
     # In the loop below we add the most recent version of planned inter transports to the df
-    df_int.drop_duplicates(subset="Dagorder nummer", keep='first', inplace=True)
-    for index, row in df_int.iterrows():
-        # Note, the if statement in the line below  should be changed in the final version to contain only planned
-        # transports and not delivered transports, Currently it includes delivered transports to accomodate use of
-        # historical data
-        if row['Status'] == 'Planned' or (row['Status'] == 'Delivered' and row['loading_time'] > time):
-            loading_time = row['loading_time']
-            row = pd.DataFrame([[loading_time, -max_load, 'Inter', 0]], columns=afv_time.columns)
-            afv_time = pd.concat([afv_time, row])
+    for loading_time in select_inter_transports(df_int, time)['loading_time']:
+        row = pd.DataFrame([[loading_time, -max_load, 'Inter', 0]], columns=afv_time.columns)
+        afv_time = pd.concat([afv_time, row])
     afv_time.sort_values(by=['date_time'], inplace=True)
     return afv_time
 
 
+def select_inter_transports(df_int, time):
+    """
+    Select the inter transports that are taken into account at a given time. Delivered transports only count while they
+    are loaded after the current time, so the selection of a depot-crossdock combination can change over time while
+    the transport data stays the same
+    :param df_int: DataFrame containing inter transports
+    :param time: Current time
+    :return: DataFrame containing the inter transports that are taken into account, one per 'Dagorder nummer'
+    """
+    df_int = df_int.drop_duplicates(subset="Dagorder nummer", keep='first')
+    return df_int[is_inter_transport_selected(df_int, time)]
+
+
+def is_inter_transport_selected(df_int, time):
+    """
+    Check which inter transports are taken into account at a given time, see 'select_inter_transports'
+    :param df_int: DataFrame containing inter transports
+    :param time: Current time
+    :return: Boolean Series, True for the inter transports that are taken into account
+    """
+    # Note, the selection below should be changed in the final version to contain only planned transports and not
+    # delivered transports, Currently it includes delivered transports to accomodate use of historical data
+    return (df_int['Status'] == 'Planned') | ((df_int['Status'] == 'Delivered') & (df_int['loading_time'] > time))
+
+
 def add_order_to_afvoer_rt(afv_time, time, origin, destination, order):
     """
     Function to add the effects of a flex order to the afvoerlijn
@@ -248,6 +322,7 @@ def check_flex_order(df, rc_thresh, rc_thresh_future, time):
     return False
 
 
+@instrument
 def update_afvoer(afv_time, time, rc_floor):
     """
     Function to update the afvoer prediction for a specific origin and destination. The scanned number of rollcages
@@ -271,6 +346,45 @@ def update_afvoer(afv_time, time, rc_floor):
     return afv_time
 
 
+@instrument
+def update_afvoer_dict(afvoer_dict, time, rc_floors):
+    """
+    Vectorized version of 'update_afvoer' that updates the afvoer predictions of all combinations of depot and
+    destination at once. The changes in stock from the current time on are placed in a single padded (pairs x rows)
+    array, starting with the floor stock of each pair, over which the stock is computed in one pass with
+    'compute_clamped_stock'
+    :param afvoer_dict: Dictionary containing for each (origin, destination) tuple the predictions of afvoer as function
+    of time, sorted by time
+    :param time: Current time
+    :param rc_floors: Dictionary containing for each (origin, destination) tuple the current number of RC on the floor
+    :return: Dictionary containing for each (origin, destination) tuple the updated afvoer predictions
+    """
+    pairs = list(afvoer_dict.keys())
+    updated_dict = {pair: afvoer.reset_index(drop=True) for pair, afvoer in afvoer_dict.items()}
+    if len(pairs) == 0:
+        return updated_dict
+    lengths = [len(updated_dict[pair]) for pair in pairs]
+    df = pd.concat([updated_dict[pair][['date_time', 'rc_forecast']] for pair in pairs], ignore_index=True)
+    pair_ids = np.repeat(np.arange(len(pairs)), lengths)
+    future = (df['date_time'] >= time).to_numpy()
+    future_pairs = pair_ids[future]
+    future_counts = np.bincount(future_pairs, minlength=len(pairs))
+    if future_counts.max() == 0:
+        return updated_dict
+    slot = np.arange(len(future_pairs)) - (np.cumsum(future_counts) - future_counts)[future_pairs]
+    deltas = np.zeros((len(pairs), future_counts.max()))
+    deltas[future_pairs, slot] = df['rc_forecast'].to_numpy(dtype=float)[future]
+    # The first row at or after the current time holds the floor stock. Pairs without such rows only get padding
+    deltas[:, 0] = [rc_floors[pair] for pair in pairs]
+    stock = compute_clamped_stock(deltas)
+
+    future_rows = np.split(future, np.cumsum(lengths)[:-1])
+    for i, (pair, rows) in enumerate(zip(pairs, future_rows)):
+        if future_counts[i] > 0:
+            updated_dict[pair].loc[rows, 'stock'] = stock[i, :future_counts[i]]
+    return updated_dict
+
+
 def create_new_order_realtime(time, truck_cap, origin, destination, afv_orders):
     """
     Function to create a flex order. The flex order is added to the list of all flex orders, and to a list of flex
@@ -287,7 +401,7 @@ def create_new_order_realtime(time, truck_cap, origin, destination, afv_orders):
     return afv_orders
 
 
-def get_floor_stock(origin, destination, current_time, afvoer):
+def get_floor_stock(origin, destination, current_time, afvoer, rng=None):
     """
     Get an assessment of the current stock at a depot of origin, intended for transport to a specific destination.
     Currently, this is a dummy function that returns the predicted stock with some deviation. This dummy function should
@@ -296,43 +410,155 @@ def get_floor_stock(origin, destination, current_time, afvoer):
     :param destination: Destination
     :param current_time: Time
     :param afvoer: predicted afvoer (used only in the dummy function)
+    :param rng: random.Random instance used for the deviation (used only in the dummy function), defaults to the global
+    random generator
     :return:
     """
-    predicted_afvoer = afvoer[afvoer['date_time'] <= current_time]['stock'].iloc[-1]
-    stock = max(0, predicted_afvoer + random.randint(-10, 10))
+    rng = random if rng is None else rng
+    predicted_afvoer = get_predicted_stock(afvoer, current_time)
+    stock = max(0, predicted_afvoer + rng.randint(-10, 10))
     return stock
 
 
-def read_cleaned_VAR_data(path_transport):
+def get_predicted_stock(afvoer, time):
+    """
+    Get the predicted number of RC on the depot floor at a specific time
+    :param afvoer: predicted afvoer
+    :param time: Time
+    :return: Predicted stock at the last event before or at the given time
+    """
+    return afvoer[afvoer['date_time'] <= time]['stock'].iloc[-1]
+
+
+def fingerprint_inter(df_inter):
+    """
+    Compute a fingerprint of the planned inter transports for a depot-crossdock combination. The fingerprint changes
+    whenever a transport is added, removed or changed, and is used to detect which combinations need to be updated
+    :param df_inter: DataFrame containing inter transports
+    :return: Fingerprint (hexadecimal string)
+    """
+    hashes = pd.util.hash_pandas_object(df_inter.reset_index(drop=True), index=False)
+    return hashlib.sha1(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def fingerprint_inter_pairs(df_int, time, pairs):
+    """
+    Vectorized version of 'fingerprint_inter' that computes the fingerprints of the inter transports that are taken into
+    account at a given time (see 'select_inter_transports') for all depot-crossdock combinations at once. The rows are
+    hashed in one pass, after which the fingerprint of a combination is computed from the hashes of its rows
+    :param df_int: DataFrame containing the inter transports of all combinations
+    :param time: Current time
+    :param pairs: List of (origin, destination) tuples
+    :return: Dictionary containing for each (origin, destination) tuple the fingerprint, equal to the fingerprint of
+    'select_inter_transports' for the inter transports of the combination
+    """
+    columns = ['Afk laadlocatie', 'Afk loslocatie']
+    df_int = df_int.drop_duplicates(subset=columns + ['Dagorder nummer'], keep='first')
+    df_int = df_int[is_inter_transport_selected(df_int, time)]
+    hashes = pd.util.hash_pandas_object(df_int.reset_index(drop=True), index=False).to_numpy()
+    rows = df_int.reset_index(drop=True).groupby(columns, sort=False, observed=True).indices
+    return {pair: hashlib.sha1(hashes[rows[pair]].tobytes() if pair in rows else b'').hexdigest() for pair in pairs}
+
+
+@instrument
+def read_cleaned_VAR_data(path_transport, start=None, end=None):
     """
     Read transport data from VAR that was already cleaned to filter the relevant rides and columns
     Args:
         path_transport: path for reading the data
+        start: transports that are loaded before this time are dropped while reading
+        end: transports that are loaded at or after this time are dropped while reading
 
     Returns: dataframe containing the transport data
 
     """
-    df = pd.read_csv(path_transport, sep=',')
-    df['loading_time'] = df['loading_time'].apply(lambda x: datetime.datetime.strptime(x, '%Y-%m-%d %H:%M:%S'))
-    return df
+    return ingestion.read_transport_csv(path_transport, start, end)
 
-def read_cleaned_SIM_data(path_transport):
+@instrument
+def read_cleaned_SIM_data(path_transport, start=None, end=None):
     """
     Read transport data from Simacan that was already cleaned to filter the relevant rides and columns
     Args:
         path_transport: path for reading the data
+        start: transports that are loaded before this time are dropped while reading
+        end: transports that are loaded at or after this time are dropped while reading
 
     Returns: dataframe containing the transport data
 
     """
-    df = pd.read_csv(path_transport, sep=',')
-    df['loading_time'] = df['loading_time'].apply(lambda x: datetime.datetime.strptime(x, '%Y-%m-%d %H:%M:%S'))
-    return df
+    return ingestion.read_transport_csv(path_transport, start, end)
+
+
+def write_baseline_store(stock_dict, df_summary, path):
+    """
+    Write the baseline predictions to a columnar (parquet) store. The stock predictions of all combinations of depot and
+    destination are stored in a single long-format dataset, partitioned by origin and destination, so that readers can
+    load only the combinations they need. Any previous version of the store is removed first
+    Args:
+        stock_dict: Dictionary containing for each (origin, destination) tuple a df with the predicted stock
+        df_summary: Dataframe with one row per (origin, destination) combination, in the order of 'stock_dict'
+        path: Directory of the store, either local or on S3
+
+    Returns: None
+
+    """
+    fs, root = fsspec.core.url_to_fs(path)
+    if fs.exists(root):
+        fs.rm(root, recursive=True)
+    df_stock = pd.concat([df.assign(origin=origin, destination=destination)
+                          for (origin, destination), df in stock_dict.items()], ignore_index=True)
+    df_stock.to_parquet(f'{path}/stock', partition_cols=['origin', 'destination'], index=False)
+    df_summary.to_parquet(f'{path}/summary.parquet', index=False)
+
+
+def read_baseline_summary(path):
+    """
+    Read the summary of the baseline predictions from the columnar store written by 'write_baseline_store'
+    Args:
+        path: Directory of the store
 
+    Returns: dataframe with one row per combination of depot and destination, in the order of the baseline
+
+    """
+    return pd.read_parquet(f'{path}/summary.parquet')
+
+
+@instrument
+def read_baseline_store(path, pairs=None):
+    """
+    Read the baseline stock predictions from the columnar store written by 'write_baseline_store'. Only the partitions
+    of the requested combinations of depot and destination are read
+    Args:
+        path: Directory of the store
+        pairs: List of (origin, destination) tuples to read, defaults to all combinations in the baseline
+
+    Returns: dictionary containing for each (origin, destination) tuple a df with the predicted stock, in the order of
+    'pairs'
+
+    """
+    if pairs is None:
+        df_summary = read_baseline_summary(path)
+        pairs = list(zip(df_summary['origin'], df_summary['destination']))
+    if len(pairs) == 0:
+        return dict()
+    filters = [[('origin', '=', origin), ('destination', '=', destination)] for origin, destination in pairs]
+    df = pd.read_parquet(f'{path}/stock', filters=filters)
+    df['origin'] = df['origin'].astype(str)
+    df['destination'] = df['destination'].astype(str)
+    stock_index = index_pairs(df, 'origin', 'destination')
+    stock_dict = dict()
+    for origin, destination in pairs:
+        df_pair = get_pair_df(stock_index, origin, destination, df)
+        stock_dict[(origin, destination)] = df_pair.drop(columns=['origin', 'destination']).reset_index(drop=True)
+    return stock_dict
+
+
+@instrument
 def generate_stock_prediction(df_afvoer, df_inter):
     """
     In htis function the forecasted numbers of scanned rolcages are combined with the planned inter transports in order
-    to obtain an estimate of the number of RC present on the depot floor, as function of time
+    to obtain an estimate of the number of RC present on the depot floor, as function of time. This is the row-by-row
+    reference implementation, the baseline uses 'generate_stock_predictions', which handles all pairs at once
     Args:
         df_afvoer: Dataframe containing forecasted numbers of scanned rollcages for 15 minute time intervals
         df_inter: Dataframe containing planned inter transports
@@ -365,6 +591,78 @@ def generate_stock_prediction(df_afvoer, df_inter):
     return df_stock
 
 
+def compute_clamped_stock(deltas):
+    """
+    Compute the running stock for one or more sequences of changes in stock, where the stock can never drop below zero.
+    The first element of a sequence is the starting stock, every next element is added to the previous stock:
+    stock[i] = max(0, stock[i - 1] + deltas[i])
+    Args:
+        deltas: Array containing changes in stock, with the sequences running along the last axis
+
+    Returns:
+        Array containing the stock after every change, with the same shape as 'deltas'
+
+    """
+    stock = np.cumsum(deltas, axis=-1)
+    if stock.shape[-1] > 1:
+        # Each time the stock is clamped at zero, the running sum restarts from zero. The stock is therefore equal to
+        # the running sum minus the lowest (negative) value the running sum has reached so far, ignoring the starting
+        # stock
+        stock[..., 1:] -= np.minimum.accumulate(np.minimum(stock[..., 1:], 0), axis=-1)
+    return stock
+
+
+@instrument
+def generate_stock_predictions(df_afv, df_int, pairs):
+    """
+    Vectorized version of 'generate_stock_prediction' that estimates the number of RC present on the depot floor for all
+    combinations of depot and destination at once. The afvoer predictions and planned inter transports of all pairs are
+    combined into a single array of events, sorted by pair and time, over which the stock is computed in one pass
+    Args:
+        df_afv: Dataframe containing forecasted numbers of scanned rollcages for all depots and crossdocks
+        df_int: Dataframe containing planned inter transports between all depots and crossdocks
+        pairs: List of (origin, destination) tuples for which the stock is predicted
+
+    Returns:
+        Dictionary containing for each (origin, destination) tuple a dataframe in the same format as the output of
+        'generate_stock_prediction'
+
+    """
+    if len(pairs) == 0:
+        return dict()
+    pair_index = pd.MultiIndex.from_tuples(pairs)
+    afv_pair = pair_index.get_indexer(pd.MultiIndex.from_frame(df_afv[['origin', 'crossdock']]))
+    int_pair = pair_index.get_indexer(pd.MultiIndex.from_frame(df_int[['Afk laadlocatie', 'Afk loslocatie']]))
+    afv_mask = afv_pair >= 0
+    int_mask = int_pair >= 0
+
+    pair_ids = np.concatenate([afv_pair[afv_mask], int_pair[int_mask]])
+    times = np.concatenate([df_afv['date_time'].to_numpy()[afv_mask], df_int['loading_time'].to_numpy()[int_mask]])
+    deltas = np.concatenate([df_afv['rc_forecast'].to_numpy()[afv_mask],
+                             -df_int['RC groot equivalent gepland'].to_numpy()[int_mask]])
+    events = np.array(['Prediction'] * afv_mask.sum() + ['Inter'] * int_mask.sum(), dtype=object)
+
+    # Sort the events by pair and time. Sorting is stable, so predictions come before inter transports at the same time
+    order = np.lexsort((times, pair_ids))
+    pair_ids, times, deltas, events = pair_ids[order], times[order], deltas[order], events[order]
+
+    # Place the events of each pair in a row of a (pairs x events) array, padded with zeros, to compute the stock for
+    # all pairs at once
+    counts = np.bincount(pair_ids, minlength=len(pairs))
+    starts = np.cumsum(counts) - counts
+    position = np.arange(len(pair_ids)) - starts[pair_ids]
+    padded_deltas = np.zeros((len(pairs), counts.max()), dtype=deltas.dtype)
+    padded_deltas[pair_ids, position] = deltas
+    stock = compute_clamped_stock(padded_deltas)[pair_ids, position]
+
+    df_stock = pd.DataFrame({'date_time': times, 'rc_forecast': deltas, 'event': events, 'stock': stock})
+    stock_dict = dict()
+    for pair, start, count in zip(pairs, starts, counts):
+        stock_dict[pair] = df_stock.iloc[start:start + count].reset_index(drop=True)
+    return stock_dict
+
+
+@instrument
 def add_flex_orders(afvoer, time, origin, destination):
     """
     This function checks whether flex orders are needed, and creates any needed orders
@@ -394,3 +692,290 @@ def add_flex_orders(afvoer, time, origin, destination):
             afvoer_orders = create_new_order_realtime(t, order_size, origin, destination, afvoer_orders)
             afvoer = add_final_orders_rt(afvoer, t, order_size)
     return afvoer, afvoer_orders
+
+
+def compute_flex_order_counts(stock, first_rows, last_rows, rc_thresh, rc_thresh_future, truck_cap):
+    """
+    Compute how many flex orders are made at each time, for one or more stock curves at once. This gives the same number
+    of orders as repeatedly calling 'check_flex_order' and 'add_order_to_afvoer_rt' in 'add_flex_orders'. An order
+    made at some time lowers the corrected stock of all later rows by the truck capacity, so at each time the number of
+    orders follows directly from the lowest future stock, which is obtained from a suffix minimum.
+    Args:
+        stock: Array (curves x rows) with the predicted stock, sorted by time. Curves with fewer rows are padded with
+            inf
+        first_rows: Array (curves x times) with the index of the first row at each time at which orders can be made,
+            times are sorted and padded with -1
+        last_rows: Array (curves x times) with the index of the last row at each time, padded with -1
+        rc_thresh: Threshold for current stock above which a flex order is made
+        rc_thresh_future: Threshold for min. future stock above which a flex order is made
+        truck_cap: Max. truck capacity
+
+    Returns:
+        counts: Array (curves x times) with the number of flex orders made at each time
+        reductions: Array (curves x times) with the total size of the orders made before each time
+
+    """
+    stock = np.asarray(stock, dtype=float)
+    n_curves, n_rows = stock.shape
+    active = first_rows >= 0
+    first_rows = np.where(active, first_rows, 0)
+    last_rows = np.where(active, last_rows, 0)
+
+    # Lowest stock after the last row at each time, inf if there are no later rows
+    suffix_min = np.full((n_curves, n_rows + 1), np.inf)
+    suffix_min[:, :-1] = np.minimum.accumulate(stock[:, ::-1], axis=1)[:, ::-1]
+    future_min = np.take_along_axis(suffix_min, last_rows + 1, axis=1)
+    first_stock = np.take_along_axis(stock, first_rows, axis=1)
+    last_stock = np.take_along_axis(stock, last_rows, axis=1)
+    # Lowest stock of the other rows at the same time as the first row (e.g. an inter transport at the same time as a
+    # prediction), inf if there are none
+    other_min = np.full(first_rows.shape, np.inf)
+    for offset in range(1, int((last_rows - first_rows).max(initial=0)) + 1):
+        rows = np.minimum(first_rows + offset, n_rows - 1)
+        other_min = np.where(offset <= last_rows - first_rows,
+                             np.minimum(other_min, np.take_along_axis(stock, rows, axis=1)), other_min)
+    more_rows = (last_rows > first_rows) | np.isfinite(future_min)
+
+    counts = np.zeros(first_rows.shape, dtype=int)
+    reductions = np.zeros(first_rows.shape)
+    reduction = np.zeros(n_curves)
+    for k in range(first_rows.shape[1]):
+        reductions[:, k] = reduction
+        # Conditions of 'check_flex_order' for the first order at this time
+        make_order = active[:, k] & more_rows[:, k] & \
+            (first_stock[:, k] - reduction >= rc_thresh) & \
+            (other_min[:, k] - reduction >= rc_thresh_future) & \
+            (future_min[:, k] - reduction >= rc_thresh_future)
+        # Every additional order lowers the future stock and the stock of the previous flex order by the truck capacity
+        margin = np.minimum(future_min[:, k], last_stock[:, k]) - reduction - rc_thresh_future
+        extra_orders = np.maximum(0, np.floor(np.where(make_order, margin, 0) / truck_cap))
+        counts[:, k] = np.where(make_order, 1 + extra_orders, 0)
+        reduction = reduction + counts[:, k] * truck_cap
+    return counts, reductions
+
+
+@instrument
+def generate_flex_orders(afvoer_dict, time, rc_thresh=None, rc_thresh_future=None, truck_cap=None):
+    """
+    Vectorized version of 'add_flex_orders' that creates the needed flex orders for all combinations of depot and
+    destination at once. The stock curves of all pairs are placed in a single array, after which the number of orders at
+    each 15 min. interval is computed with 'compute_flex_order_counts'. Rows at the same time are ordered as in
+    'add_order_to_afvoer_rt': predictions first, then inter transports, then flex orders.
+    Args:
+        afvoer_dict: Dictionary containing for each (origin, destination) tuple a df with predictions for afvoer for the
+            remainder of the process
+        time: current time
+        rc_thresh: Threshold for current stock above which a flex order is made, defaults to config.rc_threshold
+        rc_thresh_future: Threshold for min. future stock above which a flex order is made, defaults to
+            config.rc_threshold_future
+        truck_cap: Max. truck capacity, defaults to config.truck_capacity
+
+    Returns:
+        afvoer_dict: Dictionary containing for each (origin, destination) tuple a df with predictions for afvoer for the
+            remainder of the process, updated with flex orders
+        afvoer_orders: list of needed flex orders for all pairs
+
+    """
+    rc_thresh = config.rc_threshold if rc_thresh is None else rc_thresh
+    rc_thresh_future = config.rc_threshold_future if rc_thresh_future is None else rc_thresh_future
+    truck_cap = config.truck_capacity if truck_cap is None else truck_cap
+    pairs = [pair for pair in afvoer_dict.keys() if len(afvoer_dict[pair]) > 0]
+    if len(pairs) == 0:
+        return {pair: afvoer.assign(stock_corrected=afvoer['stock']) for pair, afvoer in afvoer_dict.items()}, []
+
+    columns = ['date_time', 'rc_forecast', 'event', 'stock']
+    df = pd.concat([afvoer_dict[pair][columns] for pair in pairs], ignore_index=True)
+    df['pair'] = np.repeat(np.arange(len(pairs)), [len(afvoer_dict[pair]) for pair in pairs])
+    df = df.sort_values(['pair', 'date_time', 'event'], ascending=[True, True, False]).reset_index(drop=True)
+    pair_ids = df['pair'].to_numpy()
+    times = df['date_time'].to_numpy()
+    stock = df['stock'].to_numpy(dtype=float)
+
+    # Rows of the same pair at the same time form a group. Orders can be made for the groups at or after the current
+    # time
+    new_group = np.ones(len(df), dtype=bool)
+    new_group[1:] = (pair_ids[1:] != pair_ids[:-1]) | (times[1:] != times[:-1])
+    group_ids = np.cumsum(new_group) - 1
+    group_first = np.flatnonzero(new_group)
+    group_last = np.append(group_first[1:], len(df)) - 1
+    group_pair = pair_ids[group_first]
+    candidate = times[group_first] >= np.datetime64(time)
+
+    # Place the stock curves and the candidate groups of all pairs in padded (pairs x rows) and (pairs x times) arrays
+    pair_counts = np.bincount(pair_ids, minlength=len(pairs))
+    pair_starts = np.cumsum(pair_counts) - pair_counts
+    padded_stock = np.full((len(pairs), pair_counts.max()), np.inf)
+    padded_stock[pair_ids, np.arange(len(df)) - pair_starts[pair_ids]] = stock
+    candidate_counts = np.bincount(group_pair[candidate], minlength=len(pairs))
+    candidate_pair = group_pair[candidate]
+    slot = np.arange(len(candidate_pair)) - (np.cumsum(candidate_counts) - candidate_counts)[candidate_pair]
+    first_rows = np.full((len(pairs), candidate_counts.max(initial=0)), -1)
+    last_rows = np.full(first_rows.shape, -1)
+    first_rows[candidate_pair, slot] = group_first[candidate] - pair_starts[candidate_pair]
+    last_rows[candidate_pair, slot] = group_last[candidate] - pair_starts[candidate_pair]
+
+    counts, reductions = compute_flex_order_counts(padded_stock, first_rows, last_rows, rc_thresh, rc_thresh_future,
+                                                   truck_cap)
+    group_counts = np.zeros(len(group_first), dtype=int)
+    group_reductions = np.zeros(len(group_first))
+    group_counts[candidate] = counts[candidate_pair, slot]
+    group_reductions[candidate] = reductions[candidate_pair, slot]
+    df['stock_corrected'] = stock - group_reductions[group_ids]
+
+    # Flex orders made during the process are placed after the last row at their time. Any remaining rollcages at the
+    # end of the process are taken by final orders, placed after the last row of the pair
+    flex_groups = np.repeat(np.arange(len(group_first)), group_counts)
+    flex_number = np.arange(len(flex_groups)) - np.repeat(np.cumsum(group_counts) - group_counts, group_counts) + 1
+    df_flex = pd.DataFrame({
+        'date_time': times[group_first[flex_groups]],
+        'rc_forecast': -truck_cap,
+        'event': 'Flex',
+        'stock': stock[group_first[flex_groups]],
+        'stock_corrected': stock[group_last[flex_groups]] - group_reductions[flex_groups] - flex_number * truck_cap,
+        'pair': group_pair[flex_groups],
+        'size': pd.Series(truck_cap, index=range(len(flex_groups)), dtype=object)})
+    flex_position = [group_last[flex_groups], flex_number]
+
+    pair_last = pair_starts + pair_counts - 1
+    final_stock = stock[pair_last] - np.bincount(group_pair, weights=group_counts, minlength=len(pairs)) * truck_cap
+    final_counts = np.ceil(np.maximum(final_stock, 0) / truck_cap).astype(int)
+    final_pairs = np.repeat(np.arange(len(pairs)), final_counts)
+    final_number = np.arange(len(final_pairs)) - np.repeat(np.cumsum(final_counts) - final_counts, final_counts) + 1
+    final_remaining = final_stock[final_pairs] - (final_number - 1) * truck_cap
+    final_size = np.minimum(truck_cap, final_remaining)
+    df_final = pd.DataFrame({
+        'date_time': times[pair_last[final_pairs]],
+        'rc_forecast': -final_size,
+        'event': 'Flex',
+        'stock': stock[group_first[group_ids[pair_last[final_pairs]]]],
+        'stock_corrected': final_remaining - final_size,
+        'pair': final_pairs,
+        'size': pd.Series(final_size, dtype=object)})
+    final_position = [pair_last[final_pairs], len(df) + final_number]
+
+    df = pd.concat([df, df_flex, df_final], ignore_index=True)
+    order = np.lexsort((np.concatenate([np.zeros(len(pair_ids), dtype=int), flex_position[1], final_position[1]]),
+                        np.concatenate([np.arange(len(pair_ids)), flex_position[0], final_position[0]])))
+    df = df.iloc[order]
+
+    afvoer_orders = []
+    updated_dict = dict()
+    for pair_id, df_pair in df.groupby('pair', sort=True):
+        origin, destination = pairs[pair_id]
+        df_orders = df_pair[df_pair['size'].notna()]
+        for t, size in zip(df_orders['date_time'], df_orders['size']):
+            afvoer_orders = create_new_order_realtime(t, size, origin, destination, afvoer_orders)
+        updated_dict[(origin, destination)] = df_pair[columns + ['stock_corrected']].reset_index(drop=True)
+    for pair, afvoer in afvoer_dict.items():
+        if pair not in updated_dict:
+            updated_dict[pair] = afvoer.assign(stock_corrected=afvoer['stock'])
+    return {pair: updated_dict[pair] for pair in afvoer_dict.keys()}, afvoer_orders
+
+
+@instrument
+def simulate_flex_order_scenarios(afvoer, time, n_scenarios, floor_noise, forecast_error_sd, rng, rc_thresh=None,
+                                  rc_thresh_future=None, truck_cap=None):
+    """
+    Compute the number of flex orders for a number of stochastic scenarios of a single combination of depot and
+    destination at once. In every scenario, the floor stock deviates from the predicted stock by a random whole number
+    of RC, and the predicted afvoer of every later time-step has a random relative error. The stock curves of all
+    scenarios are placed in a single (scenarios x rows) array, after which the stock is computed with
+    'compute_clamped_stock' and the number of orders with 'compute_flex_order_counts', as in 'generate_flex_orders'
+    Args:
+        afvoer: df containing predictions for afvoer, updated with 'update_afvoer' for the current time
+        time: current time
+        n_scenarios: Number of scenarios
+        floor_noise: Max. deviation (#RC) of the floor stock from the predicted stock, drawn uniformly
+        forecast_error_sd: Standard deviation of the relative error of the predicted afvoer, drawn from a normal
+            distribution
+        rng: numpy.random.Generator used to draw the scenarios
+        rc_thresh: Threshold for current stock above which a flex order is made, defaults to config.rc_threshold
+        rc_thresh_future: Threshold for min. future stock above which a flex order is made, defaults to
+            config.rc_threshold_future
+        truck_cap: Max. truck capacity, defaults to config.truck_capacity
+
+    Returns:
+        times: Array with the times at which flex orders can be made
+        counts: Array (scenarios x times) with the number of flex orders at each time, including the final orders at
+            the end of the process
+
+    """
+    rc_thresh = config.rc_threshold if rc_thresh is None else rc_thresh
+    rc_thresh_future = config.rc_threshold_future if rc_thresh_future is None else rc_thresh_future
+    truck_cap = config.truck_capacity if truck_cap is None else truck_cap
+    afvoer = afvoer.reset_index(drop=True)
+    future = (afvoer['date_time'] >= time).to_numpy()
+    if not future.any():
+        # No flex orders can be made anymore, only the final orders for the stock at the end of the process remain
+        stock = afvoer['stock'].to_numpy(dtype=float)[-1:] if len(afvoer) > 0 else np.zeros(0)
+        counts = np.ceil(np.maximum(stock, 0) / truck_cap).astype(int)
+        return afvoer['date_time'].to_numpy()[-1:], np.tile(counts, (n_scenarios, 1))
+
+    # The first row at or after the current time holds the floor stock, see 'update_afvoer'. Later predictions get a
+    # relative error, planned inter transports are kept as they are
+    df_future = afvoer[future]
+    deltas = np.tile(df_future['rc_forecast'].to_numpy(dtype=float), (n_scenarios, 1))
+    prediction = (df_future['event'] == 'Prediction').to_numpy()
+    prediction[0] = False
+    errors = rng.normal(0, forecast_error_sd, size=(n_scenarios, int(prediction.sum())))
+    deltas[:, prediction] *= np.maximum(0, 1 + errors)
+    deltas[:, 0] = np.maximum(0, df_future['stock'].iloc[0] +
+                              rng.integers(-floor_noise, floor_noise, size=n_scenarios, endpoint=True))
+    stock = compute_clamped_stock(deltas)
+
+    # Rows at the same time are ordered as in 'generate_flex_orders', and form a group at which orders can be made
+    order = df_future[['date_time', 'event']].reset_index(drop=True).sort_values(
+        ['date_time', 'event'], ascending=[True, False]).index.to_numpy()
+    stock = stock[:, order]
+    times = df_future['date_time'].to_numpy()[order]
+    new_group = np.ones(len(times), dtype=bool)
+    new_group[1:] = times[1:] != times[:-1]
+    group_first = np.flatnonzero(new_group)
+    group_last = np.append(group_first[1:], len(times)) - 1
+    first_rows = np.tile(group_first, (n_scenarios, 1))
+    last_rows = np.tile(group_last, (n_scenarios, 1))
+
+    counts, _ = compute_flex_order_counts(stock, first_rows, last_rows, rc_thresh, rc_thresh_future, truck_cap)
+    # Any remaining rollcages at the end of the process are taken by final orders
+    final_stock = stock[:, -1] - counts.sum(axis=1) * truck_cap
+    counts[:, -1] += np.ceil(np.maximum(final_stock, 0) / truck_cap).astype(int)
+    return times[group_first], counts
+
+
+def scenario_quantile(values, quantile):
+    """
+    Compute a quantile of whole numbers over the scenarios, rounded up to a value that occurs in the scenarios
+    Args:
+        values: Array with the scenarios along the first axis
+        quantile: Quantile between 0 and 1
+
+    Returns:
+        Array with the quantile of 'values' along the first axis
+
+    """
+    index = min(max(int(np.ceil(quantile * len(values))) - 1, 0), len(values) - 1)
+    return np.sort(values, axis=0)[index]
+
+
+def summarize_order_scenarios(times, counts, risk_quantile):
+    """
+    Summarize the distribution of the number of flex orders over the scenarios at each time. The risk-adjusted
+    recommendation is the number of orders that is enough up to each time in a fraction 'risk_quantile' of the
+    scenarios. It is taken from the quantile of the cumulative number of orders, so the recommendations at all times add
+    up to the recommendation for the whole process
+    Args:
+        times: Array with the times at which flex orders can be made
+        counts: Array (scenarios x times) with the number of flex orders at each time
+        risk_quantile: Fraction of the scenarios for which the recommended number of orders is sufficient
+
+    Returns:
+        df with for each time the mean number of orders, the probability of at least one order and the recommended
+        number of orders
+
+    """
+    cumulative = scenario_quantile(np.cumsum(counts, axis=1), risk_quantile)
+    return pd.DataFrame({
+        'date_time': times,
+        'mean_orders': counts.mean(axis=0),
+        'prob_order': (counts > 0).mean(axis=0),
+        'recommended_orders': np.diff(cumulative, prepend=0)})
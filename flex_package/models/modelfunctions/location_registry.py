@@ -0,0 +1,200 @@
+"""
+Module with the location registry, the drive-time matrix and the final-departure table of the flextoewijzer.
+"""
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+
+class LocationRegistry:
+    """
+    Registry that interns location codes (e.g. 'ALR', 'XASD') to integer ids, so data per location can be kept in
+    NumPy arrays and looked up by position. Optionally, the registry also holds the type of each location
+    """
+
+    def __init__(self, locations, types=None):
+        """
+        Args:
+            locations: Sequence of unique location codes, the id of a location is its position in the sequence
+            types: Sequence with the type of each location (e.g. 'DEPOT', 'CROSS'), or None
+        """
+        self.locations = list(locations)
+        self._ids = {location: i for i, location in enumerate(self.locations)}
+        if len(self._ids) != len(self.locations):
+            raise ValueError('Location codes in the registry must be unique')
+        self._types = dict() if types is None else dict(zip(self.locations, types))
+
+    @classmethod
+    def from_depot_info(cls, df_depot_info):
+        """
+        Create the registry from the depot information. If a name occurs more than once, the first row is used
+        :param df_depot_info: DataFrame with the location code in column 'Name' and the type in column 'DepotType'
+        :return: LocationRegistry
+        """
+        df_depot_info = df_depot_info.drop_duplicates('Name')
+        return cls(df_depot_info['Name'], df_depot_info['DepotType'])
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __contains__(self, location):
+        return location in self._ids
+
+    def get_id(self, location):
+        """
+        Get the id of a location
+        :param location: Location code
+        :return: Integer id of the location, raises a KeyError for an unknown location
+        """
+        return self._ids[location]
+
+    def get_type(self, location, default=None):
+        """
+        Get the type of a location
+        :param location: Location code
+        :param default: Value returned for a location without a type
+        :return: Type of the location
+        """
+        return self._types.get(location, default)
+
+    def get_ids(self, locations):
+        """
+        Get the ids of a sequence of locations
+        :param locations: Sequence of location codes
+        :return: Array with the integer ids of the locations, raises a KeyError for an unknown location
+        """
+        return np.fromiter((self._ids[location] for location in locations), dtype=np.intp, count=len(locations))
+
+
+class DriveTimeMatrix:
+    """
+    Drive times between all registered locations, in whole seconds in an int32 array. The drive time from a location
+    to itself is zero
+    """
+
+    def __init__(self, registry, seconds):
+        """
+        Args:
+            registry: LocationRegistry of the locations in the matrix
+            seconds: Square array with the drive time (seconds) from the location of each row to the location of each
+                column, in the order of the registry
+        """
+        seconds = np.asarray(seconds)
+        if seconds.shape != (len(registry), len(registry)):
+            raise ValueError(f'Drive-time matrix of shape {seconds.shape} does not match {len(registry)} locations')
+        self.registry = registry
+        self.seconds = seconds.astype(np.int32)
+        np.fill_diagonal(self.seconds, 0)
+
+    @classmethod
+    def from_frame(cls, df_drive_times):
+        """
+        Create the matrix from a DataFrame with drive times, as produced by 'compute_drive_times'
+        :param df_drive_times: DataFrame with the location codes as index and columns, and drive times as
+        datetime.timedelta objects
+        :return: DriveTimeMatrix
+        """
+        df_drive_times = df_drive_times.loc[:, df_drive_times.index]
+        seconds = df_drive_times.apply(pd.to_timedelta).to_numpy(dtype='timedelta64[ms]').astype(np.int64)
+        return cls(LocationRegistry(df_drive_times.index), np.rint(seconds / 1000))
+
+    def get_seconds(self, origin, destination):
+        """
+        Get the drive time between two locations
+        :param origin: Starting location
+        :param destination: Ending location
+        :return: Drive time (seconds)
+        """
+        return int(self.seconds[self.registry.get_id(origin), self.registry.get_id(destination)])
+
+    def get_travel_time(self, origin, destination):
+        """
+        Get the drive time between two locations
+        :param origin: Starting location
+        :param destination: Ending location
+        :return: Drive time as datetime.timedelta
+        """
+        return dt.timedelta(seconds=self.get_seconds(origin, destination))
+
+    def get_seconds_many(self, origins, destinations):
+        """
+        Get the drive times between pairs of locations in a single lookup
+        :param origins: Sequence of starting locations
+        :param destinations: Sequence of ending locations, of the same length as 'origins'
+        :return: Array with the drive time (seconds) for each pair
+        """
+        return self.seconds[self.registry.get_ids(origins), self.registry.get_ids(destinations)]
+
+
+class FinalDepartureTable:
+    """
+    Final departure times of the rollcages of each prio, for all combinations of origin and destination and both types
+    of transport, in a dense datetime64 array indexed by (origin id, destination id, prio, inter). Combinations without
+    a final departure time are NaT
+    """
+
+    prios = ('A', 'B', 'C', 'D')
+
+    def __init__(self, registry, departure_times):
+        """
+        Args:
+            registry: LocationRegistry of the origins and destinations in the table
+            departure_times: datetime64 array of shape (locations, locations, prios, 2)
+        """
+        self.registry = registry
+        self.departure_times = np.asarray(departure_times, dtype='datetime64[us]')
+
+    @classmethod
+    def from_dicts(cls, final_departure_inter1, final_departure_inter2):
+        """
+        Create the table from dictionaries with the final departure times
+        :param final_departure_inter1: Final departure times for transport from depot to crossdock (inter = 0), keyed
+        on (origin, destination, prio)
+        :param final_departure_inter2: Final departure times for transport from crossdock to fulfillment depot
+        (inter = 1), keyed on (origin, destination, prio)
+        :return: FinalDepartureTable
+        """
+        dicts = (final_departure_inter1, final_departure_inter2)
+        locations = sorted({location for final_departure in dicts for key in final_departure for location in key[:2]})
+        registry = LocationRegistry(locations)
+        prio_ids = {prio: i for i, prio in enumerate(cls.prios)}
+        departure_times = np.full((len(locations), len(locations), len(cls.prios), 2), np.datetime64('NaT'),
+                                  dtype='datetime64[us]')
+        for inter, final_departure in enumerate(dicts):
+            for (origin, destination, prio), departure_time in final_departure.items():
+                if prio in prio_ids:
+                    departure_times[registry.get_id(origin), registry.get_id(destination), prio_ids[prio], inter] = \
+                        np.datetime64(departure_time, 'us')
+        return cls(registry, departure_times)
+
+    def get_departure_times(self, origin, destination, inter):
+        """
+        Get the final departure time of each prio
+        :param origin: Origin of the order
+        :param destination: Destination of the order
+        :param inter: Type of transport, 0 for depot to crossdock, 1 for crossdock to fulfillment depot
+        :return: datetime64 array with the final departure time of each prio, NaT if unknown
+        """
+        if origin not in self.registry or destination not in self.registry:
+            return np.full(len(self.prios), np.datetime64('NaT'), dtype='datetime64[us]')
+        return self.departure_times[self.registry.get_id(origin), self.registry.get_id(destination), :, int(inter != 0)]
+
+    def get_proportion_on_time(self, origin, destination, NRC_per_prio, inter, end_times):
+        """
+        Get the proportion of rollcages that is on time for a number of expected arrival times. Rollcages of a prio are
+        on time if the final departure time is after the arrival time, or if the final departure time is unknown
+        :param origin: Origin of the order
+        :param destination: Destination of the order
+        :param NRC_per_prio: Number of rollcages for each prio
+        :param inter: Type of transport, 0 for depot to crossdock, 1 for crossdock to fulfillment depot
+        :param end_times: Sequence of expected arrival times
+        :return: Array with the proportion on time for each arrival time
+        """
+        departure_times = self.get_departure_times(origin, destination, inter)
+        end_times = np.asarray(end_times, dtype='datetime64[us]')
+        on_time = np.isnat(departure_times) | (departure_times > end_times[..., None])
+        NRC_per_prio = np.asarray(NRC_per_prio, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return on_time @ NRC_per_prio / NRC_per_prio.sum()
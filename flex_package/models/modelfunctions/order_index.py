@@ -0,0 +1,116 @@
+"""
+Module with the index of open orders of the flextoewijzer, used to find the orders with which a new order can be
+combined.
+"""
+
+import bisect
+import itertools
+import math
+
+
+class OpenOrderIndex:
+    """
+    Index of open orders by origin and by destination. Orders can be combined in a single ride if they share their
+    origin or destination and their rollcages fit in a truck. Within an origin or destination, the entries are bucketed
+    by number of orders and sorted by number of rollcages, so the largest entry that fits in the remaining capacity of
+    a truck is found by bisection, without scanning all open orders.
+
+    An entry is either a single order that was called in but is not yet processed (pending), together with its call
+    time, or a list of orders (a combination) that is not yet being fulfilled (open). Pending orders can only be
+    combined with orders called in at the same time. Entries are identified by identity, like the events of the event
+    queue.
+    """
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity: Max. number of rollcages in a combination of orders, e.g. the truck capacity
+        """
+        self.capacity = capacity
+        # Sorted (size, -sequence number, id) of the entries, by (time, field, location, number of orders)
+        self._buckets = dict()
+        self._entries = dict()   # Entry (item, keys, sort key) by id of the item
+        self._counter = itertools.count()
+
+    @classmethod
+    def from_events(cls, capacity, event_list, unfulfilled_orders, time, order_type):
+        """
+        Create the index from the events and the open orders, e.g. for a single combination outside the flex planner
+        :param capacity: Max. number of rollcages in a combination of orders
+        :param event_list: Queue of upcoming events, orders called in at or before the given time are added as pending
+        :param unfulfilled_orders: List of combinations of orders that are not yet being fulfilled
+        :param time: Current time
+        :param order_type: Class of the order events
+        :return: OpenOrderIndex
+        """
+        index = cls(capacity)
+        for event in event_list:   # Events are visited in chronological order
+            if event.Time > time:
+                break
+            if isinstance(event, order_type):
+                index.add(event, event.Time)
+        for orders in unfulfilled_orders:
+            index.add(orders)
+        return index
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return id(item) in self._entries
+
+    def add(self, item, time=None):
+        """
+        Add an entry to the index
+        :param item: Pending order, or open combination of orders (list)
+        :param time: Call time of a pending order, None for an open combination
+        """
+        if id(item) in self._entries:
+            raise ValueError('Order is already in the index')
+        orders = item if isinstance(item, list) else [item]
+        sort_key = (sum(order.Ntot for order in orders), -next(self._counter), id(item))
+        keys = {(time, 'origin', order.Origin, len(orders)) for order in orders} \
+            | {(time, 'destination', order.Destination, len(orders)) for order in orders}
+        for key in keys:
+            bisect.insort(self._buckets.setdefault(key, []), sort_key)
+        self._entries[id(item)] = (item, keys, sort_key)
+
+    def discard(self, item):
+        """
+        Remove an entry from the index, if present
+        :param item: Pending order, or open combination of orders
+        """
+        entry = self._entries.pop(id(item), None)
+        if entry is None:
+            return
+        _, keys, sort_key = entry
+        for key in keys:
+            bucket = self._buckets[key]
+            del bucket[bisect.bisect_left(bucket, sort_key)]
+            if not bucket:
+                del self._buckets[key]
+
+    def find(self, orders, max_orders, time=None):
+        """
+        Find the entry that can be combined with a combination of orders. An entry can be combined if it shares an
+        origin or a destination with the combination, and the combined rollcages and orders do not exceed the capacity
+        and the max. number of orders. Of these entries, the one with the most rollcages is returned, the first one
+        added in case of a tie
+        :param orders: Combination of orders
+        :param max_orders: Max. number of orders in a combination
+        :param time: Call time of the pending orders to search, None to search the open combinations
+        :return: Pending order or open combination, None if no entry can be combined
+        """
+        room = self.capacity - sum(order.Ntot for order in orders)
+        best = None
+        for n_orders in range(1, max_orders - len(orders) + 1):
+            keys = [(time, 'origin', order.Origin, n_orders) for order in orders] \
+                + [(time, 'destination', order.Destination, n_orders) for order in orders]
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if not bucket:
+                    continue
+                position = bisect.bisect_right(bucket, (room, math.inf))
+                if position > 0 and (best is None or bucket[position - 1] > best):
+                    best = bucket[position - 1]
+        return None if best is None else self._entries[best[2]][0]
@@ -0,0 +1,39 @@
+"""
+Module with generic functions for running independent computations in parallel.
+"""
+
+import concurrent.futures
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def map_ordered(func, args_list, n_workers=1, pool_type='process'):
+    """
+    Apply a function to a list of arguments, either sequentially or in parallel using a pool of workers. The results are
+    always returned in the order of the arguments, so the output does not depend on the number of workers
+    Args:
+        func: Function to apply. When using a process pool, the function must be defined at module level
+        args_list: List of tuples with the positional arguments for each function call
+        n_workers: Number of workers. With 1 worker (or None), the function calls are done one after another
+        pool_type: Type of pool, 'process' or 'thread'
+
+    Returns:
+        List with the results of the function calls
+
+    """
+    args_list = list(args_list)
+    if n_workers is None or n_workers <= 1 or len(args_list) <= 1:
+        return [func(*args) for args in args_list]
+
+    if pool_type == 'process':
+        executor_class = concurrent.futures.ProcessPoolExecutor
+    elif pool_type == 'thread':
+        executor_class = concurrent.futures.ThreadPoolExecutor
+    else:
+        raise ValueError(f"Unknown pool type '{pool_type}', use 'process' or 'thread'")
+
+    logger.debug('Running %s calls of %s on %s %s workers', len(args_list), func.__name__, n_workers, pool_type)
+    chunksize = max(1, len(args_list) // (4 * n_workers))
+    with executor_class(max_workers=n_workers) as executor:
+        return list(executor.map(func, *zip(*args_list), chunksize=chunksize))
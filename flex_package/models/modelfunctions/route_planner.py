@@ -0,0 +1,241 @@
+"""
+Module with the route planner of the flextoewijzer, which finds the best sequence of pickups and drops of a combination
+of orders, and the cache of the drive times along routes.
+"""
+
+import collections
+import datetime as dt
+
+import numpy as np
+
+
+class RoutePlanner:
+    """
+    Planner of the routes of trucks that fulfill a combination of orders. A route starts at the location of the truck,
+    visits the origin (pickup) and the destination (drop) of every order, where an order is always picked up before it
+    is dropped, and ends at the base of the truck. Consecutive visits of the same location are merged into a single
+    stop. The cost of a route is its drive time plus a handling time for every stop
+
+    The best route is found by dynamic programming over partial trajectories, with as state the orders that are picked
+    up, the orders that are dropped and the current location. The cost to go from a state to the base does not depend
+    on the start location of the truck, so it is memoized per combination of orders and base, and shared by all
+    candidate trucks and all replans. For k orders, there are at most 3^k * 2k states
+    """
+
+    def __init__(self, drive_times, stop_seconds):
+        """
+        Args:
+            drive_times: DriveTimeMatrix with the drive times between all locations
+            stop_seconds: Handling time (seconds) of every stop of a route, e.g. half the loading time
+        """
+        self.drive_times = drive_times
+        self.stop_seconds = stop_seconds
+        self._memo = dict()   # Cost to go and next state of every visited state, by orders and base
+        self._suffixes = dict()   # Best route from the first pickup of each order onwards, by orders and base
+
+    def __len__(self):
+        return len(self._suffixes)
+
+    def clear(self):
+        """
+        Discard the memoized partial trajectories, e.g. when the drive times are changed
+        """
+        self._memo.clear()
+        self._suffixes.clear()
+
+    def _get_cost_to_go(self, state, origins, destinations, base, memo):
+        """
+        Get the minimal cost to fulfill the remaining orders from a state and drive back to the base
+        :param state: Tuple with the bit mask of the picked up orders, the bit mask of the dropped orders and the
+        location id of the current location
+        :param origins: Tuple with the location id of the origin of each order
+        :param destinations: Tuple with the location id of the destination of each order
+        :param base: Location id of the base
+        :param memo: Memoized partial trajectories of the orders and the base
+        :return: Cost to go (seconds) and the next state, None if all orders are dropped
+        """
+        result = memo.get(state)
+        if result is not None:
+            return result
+        picked, dropped, location = state
+        seconds = self.drive_times.seconds
+        if dropped == (1 << len(origins)) - 1:
+            result = (float(seconds[location, base]), None)
+        else:
+            result = (np.inf, None)
+            for i in range(len(origins)):
+                bit = 1 << i
+                if not picked & bit:
+                    next_state = (picked | bit, dropped, origins[i])
+                elif not dropped & bit:
+                    next_state = (picked, dropped | bit, destinations[i])
+                else:
+                    continue
+                next_location = next_state[2]
+                step = 0 if next_location == location else seconds[location, next_location] + self.stop_seconds
+                cost = step + self._get_cost_to_go(next_state, origins, destinations, base, memo)[0]
+                if cost < result[0]:
+                    result = (cost, next_state)
+        memo[state] = result
+        return result
+
+    def _get_suffix(self, first, origins, destinations, base, memo):
+        """
+        Get the best route from the first pickup of an order onwards
+        :param first: Index of the order that is picked up first
+        :param origins: Tuple with the location id of the origin of each order
+        :param destinations: Tuple with the location id of the destination of each order
+        :param base: Location id of the base
+        :param memo: Memoized partial trajectories of the orders and the base
+        :return: Cost (seconds) of the route, list with the location ids of the route, and its drive time (seconds)
+        """
+        state = (1 << first, 0, origins[first])
+        cost = self._get_cost_to_go(state, origins, destinations, base, memo)[0]
+        route = [origins[first]]
+        drive_seconds = 0
+        while state is not None:
+            state = self._get_cost_to_go(state, origins, destinations, base, memo)[1]
+            location = base if state is None else state[2]
+            # Consecutive visits of the same location are a single stop, the route always ends at the base
+            if state is None or location != route[-1]:
+                drive_seconds += int(self.drive_times.seconds[route[-1], location])
+                route.append(location)
+        return cost, route, drive_seconds
+
+    def _get_suffixes(self, origins, destinations, base):
+        """
+        Get the best route from the first pickup of each order onwards, computed once per combination of orders and
+        base
+        :param origins: Tuple with the location id of the origin of each order
+        :param destinations: Tuple with the location id of the destination of each order
+        :param base: Location id of the base
+        :return: List with for each order the cost (seconds), the location ids and the drive time (seconds) of the route
+        """
+        key = (origins, destinations, base)
+        suffixes = self._suffixes.get(key)
+        if suffixes is None:
+            memo = self._memo.setdefault(key, dict())
+            suffixes = [self._get_suffix(i, origins, destinations, base, memo) for i in range(len(origins))]
+            self._suffixes[key] = suffixes
+        return suffixes
+
+    def _get_order_ids(self, orders):
+        """
+        Get the location ids of the orders of a combination
+        :param orders: Sequence with an (origin, destination) tuple for each order of the combination
+        :return: Tuple with the location id of the origin of each order, and tuple with the location id of the
+        destination of each order
+        """
+        get_id = self.drive_times.registry.get_id
+        return tuple(get_id(origin) for origin, _ in orders), tuple(get_id(destination) for _, destination in orders)
+
+    def get_best_routes(self, starts, bases, orders):
+        """
+        Find the best route of a combination of orders for a number of trucks at once, e.g. all candidate trucks. The
+        first stop is always the origin of an order, also if the truck is already there
+        :param starts: Sequence with the start location of each truck
+        :param bases: Sequence with the base of each truck
+        :param orders: Sequence with an (origin, destination) tuple for each order of the combination
+        :return: List with the best route (sequence of locations) of each truck, array with the drive time (seconds) of
+        each route, and array with the drive time (seconds) to the first stop of each route
+        """
+        registry = self.drive_times.registry
+        seconds = self.drive_times.seconds
+        origins, destinations = self._get_order_ids(orders)
+        start_ids = registry.get_ids(starts)
+        base_ids = registry.get_ids(bases)
+        routes = [None] * len(start_ids)
+        drive_seconds = np.zeros(len(start_ids), dtype=np.int64)
+        first_seconds = np.zeros(len(start_ids), dtype=np.int64)
+        for base in np.unique(base_ids):
+            suffixes = self._get_suffixes(origins, destinations, int(base))
+            in_base = np.flatnonzero(base_ids == base)
+            to_pickup = seconds[np.ix_(start_ids[in_base], origins)].astype(np.int64)
+            costs = to_pickup + self.stop_seconds + np.array([suffix[0] for suffix in suffixes])
+            first = np.argmin(costs, axis=1)
+            for truck, start, i in zip(in_base, start_ids[in_base], first):
+                _, suffix, suffix_seconds = suffixes[i]
+                routes[truck] = [registry.locations[location] for location in [start] + suffix]
+                first_seconds[truck] = seconds[start, origins[i]]
+                drive_seconds[truck] = first_seconds[truck] + suffix_seconds
+        return routes, drive_seconds, first_seconds
+
+    def get_best_route(self, start, base, orders):
+        """
+        Find the best route of a combination of orders for a single truck
+        :param start: Start location of the truck
+        :param base: Base of the truck
+        :param orders: Sequence with an (origin, destination) tuple for each order of the combination
+        :return: Best route (sequence of locations) and its drive time (seconds)
+        """
+        registry = self.drive_times.registry
+        seconds = self.drive_times.seconds
+        origins, destinations = self._get_order_ids(orders)
+        start_id = registry.get_id(start)
+        suffixes = self._get_suffixes(origins, destinations, registry.get_id(base))
+        costs = [seconds[start_id, origin] + suffix[0] for origin, suffix in zip(origins, suffixes)]
+        first = costs.index(min(costs))
+        _, suffix, suffix_seconds = suffixes[first]
+        route = [start] + [registry.locations[location] for location in suffix]
+        return route, int(seconds[start_id, origins[first]]) + suffix_seconds
+
+
+class RouteCache:
+    """
+    Bounded cache of the cumulative drive times along routes, keyed by the tuple of location ids of the route. Most
+    routes of an evening run between a small set of depots and crossdocks, so these are looked up in the drive-time
+    matrix only once. When the cache is full, the least recently used route is discarded. Hits and misses are counted,
+    to check whether the cache is large enough
+    """
+
+    def __init__(self, drive_times, maxsize):
+        """
+        Args:
+            drive_times: DriveTimeMatrix with the drive times between all locations
+            maxsize: Max. number of routes in the cache
+        """
+        self.drive_times = drive_times
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._routes = collections.OrderedDict()   # Cumulative drive times by location ids, least recently used first
+
+    def __len__(self):
+        return len(self._routes)
+
+    def clear(self):
+        """
+        Discard all routes and reset the counters, e.g. when the drive times are changed
+        """
+        self._routes.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_travel_times(self, route):
+        """
+        Get the cumulative drive times along a route
+        :param route: Sequence of locations
+        :return: Tuple with the drive time from the start of the route to each location, as datetime.timedelta
+        """
+        key = tuple(self.drive_times.registry.get_ids(route).tolist())
+        travel_times = self._routes.get(key)
+        if travel_times is not None:
+            self.hits += 1
+            self._routes.move_to_end(key)
+            return travel_times
+        self.misses += 1
+        seconds = self.drive_times.seconds[list(key[:-1]), list(key[1:])]
+        total_seconds = np.concatenate([[0], np.cumsum(seconds)])
+        travel_times = tuple(dt.timedelta(seconds=int(second)) for second in total_seconds)
+        self._routes[key] = travel_times
+        if len(self._routes) > self.maxsize:
+            self._routes.popitem(last=False)
+        return travel_times
+
+    def info(self):
+        """
+        Returns: dictionary with the number of hits and misses, the hit rate, and the current and max. number of routes
+        """
+        calls = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / calls if calls else 0.0,
+                'size': len(self._routes), 'maxsize': self.maxsize}
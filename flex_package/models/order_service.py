@@ -0,0 +1,135 @@
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+import flex_package.models.generate_orders as go
+import flex_package.config as config
+import flex_package.instrumentation as instrumentation
+import datetime
+import fsspec
+import logging
+import time as systime
+
+logger = logging.getLogger(__name__)
+
+
+class OrderService:
+    """
+    Resident service that generates flex orders during the process day. The baseline predictions and the planned inter
+    transports are read once at startup and kept in memory, together with the state of the previous refresh, so every
+    refresh only recomputes the combinations of depot and destination that changed. A refresh is done every
+    'interval', or immediately when a trigger file is dropped, in which case the planned inter transports are read
+    again before refreshing
+    """
+
+    def __init__(self, baseline_path, transport_path, output_path, trigger_path, interval=None, poll_seconds=None,
+                 start_time=None):
+        """
+        Args:
+            baseline_path: directory of the baseline store
+            transport_path: path of the cleaned transport data
+            output_path: path of the excel file the flex orders are written to
+            trigger_path: path of the trigger file
+            interval: time between two refreshes, defaults to REFRESH_INTERVAL in config
+            poll_seconds: interval (seconds) at which the trigger file is checked, defaults to TRIGGER_POLL_SECONDS
+                in config
+            start_time: time of the process day at which the service starts, if given the process day is replayed
+                from this time on, otherwise the wall clock is followed
+        """
+        self.transport_path = transport_path
+        self.output_path = output_path
+        self.trigger_fs, self.trigger_path = fsspec.core.url_to_fs(trigger_path)
+        self.interval = datetime.timedelta(minutes=config.REFRESH_INTERVAL) if interval is None else interval
+        self.poll_seconds = config.TRIGGER_POLL_SECONDS if poll_seconds is None else poll_seconds
+        # Offset between the time of the process day and the wall clock
+        self.time_offset = datetime.timedelta(0) if start_time is None else start_time - datetime.datetime.now()
+
+        logger.info('Order service - loading data')
+        self.baseline_dict = mf.read_baseline_store(baseline_path)
+        self.end_time = max(afvoer['date_time'].iloc[-1] for afvoer in self.baseline_dict.values())
+        self.inter_transports = mf.read_cleaned_SIM_data(transport_path)
+        self.state = None
+        self.afvoer_orders = []
+
+    def now(self):
+        """
+        Returns: current time of the process day
+        """
+        return datetime.datetime.now() + self.time_offset
+
+    def reload_transports(self):
+        """
+        Read the planned inter transports again, e.g. after a new version of the transport plan was dropped
+
+        Returns: None
+
+        """
+        logger.info('Order service - reloading transport data')
+        self.inter_transports = mf.read_cleaned_SIM_data(self.transport_path)
+
+    def refresh(self, time):
+        """
+        Update the afvoer predictions with the planned inter transports in memory, and write the flex orders
+        Args:
+            time: current time of the process day
+
+        Returns:
+            list of flex orders for all combinations
+
+        """
+        with instrumentation.instrumented_run('order_service', budget=self.interval.total_seconds()):
+            afvoer_dict, self.afvoer_orders, self.state = go.refresh_orders(
+                self.inter_transports, time, self.state, self.baseline_dict)
+            go.write_orders(afvoer_dict, self.afvoer_orders, self.output_path)
+        logger.info('Order service - %s flex orders at %s', len(self.afvoer_orders), time)
+        return self.afvoer_orders
+
+    def wait_for_trigger(self, deadline):
+        """
+        Wait until the next refresh is due, or until the trigger file is dropped. The trigger file is removed
+        Args:
+            deadline: wall clock time of the next scheduled refresh
+
+        Returns:
+            True if the trigger file was dropped, False otherwise
+
+        """
+        while True:
+            if self.trigger_fs.exists(self.trigger_path):
+                self.trigger_fs.rm(self.trigger_path)
+                return True
+            remaining = (deadline - datetime.datetime.now()).total_seconds()
+            if remaining <= 0:
+                return False
+            systime.sleep(min(self.poll_seconds, remaining))
+
+    def run(self, max_refreshes=None):
+        """
+        Refresh the flex orders until the end of the process day
+        Args:
+            max_refreshes: maximum number of refreshes, no maximum if None
+
+        Returns: None
+
+        """
+        logger.info('Order service - started')
+        n_refreshes = 0
+        deadline = datetime.datetime.now() + self.interval   # Wall clock time of the next scheduled refresh
+        while self.now() <= self.end_time:
+            self.refresh(self.now())
+            n_refreshes += 1
+            if max_refreshes is not None and n_refreshes >= max_refreshes:
+                break
+            if self.wait_for_trigger(deadline):
+                self.reload_transports()
+            else:
+                deadline = max(deadline + self.interval, datetime.datetime.now())
+        logger.info('Order service - stopped after %s refreshes', n_refreshes)
+
+
+def main():
+    start_time = config.current_time if config.BOOL_REPLAY_TIME else None
+    service = OrderService(config.PATH_AFVOER_BASELINE_STORE, config.PATH_TRANSPORT_CLEANED, config.PATH_AFVOER_ORDERS,
+                           config.PATH_REFRESH_TRIGGER, start_time=start_time)
+    service.run()
+
+
+if __name__ == '__main__':
+    main()
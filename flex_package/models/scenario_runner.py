@@ -0,0 +1,81 @@
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+import flex_package.models.generate_orders as go
+import flex_package.config as config
+import flex_package.instrumentation as instrumentation
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def run_scenarios(baseline_dict, inter_transports, time, n_scenarios=None, seed=None):
+    """
+    Evaluate stochastic scenarios of the floor stock and the predicted afvoer for all combinations of depot and
+    destination, and summarize the resulting number of flex orders. The predictions of each combination are updated with
+    the planned inter transports and the predicted floor stock, after which all scenarios of the combination are
+    computed at once with 'mf.simulate_flex_order_scenarios'
+    Args:
+        baseline_dict: dictionary containing for each (origin, destination) tuple the baseline predictions for afvoer
+        inter_transports: df containing all planned inter transports
+        time: current time
+        n_scenarios: number of scenarios, defaults to N_SCENARIOS in config
+        seed: seed of the random generator, defaults to RANDOM_SEED in config
+
+    Returns:
+        df_intervals: df with for each combination and each time the distribution of the number of flex orders and the
+            recommended number of orders
+        df_summary: df with for each combination the distribution of the total number of flex orders and the
+            recommended number of orders
+
+    """
+    n_scenarios = config.N_SCENARIOS if n_scenarios is None else n_scenarios
+    seed = config.RANDOM_SEED if seed is None else seed
+    inter_index = mf.index_pairs(inter_transports, 'Afk laadlocatie', 'Afk loslocatie')
+    # Every combination gets its own random generator, so the scenarios do not depend on the other combinations
+    seeds = np.random.SeedSequence(seed).spawn(len(baseline_dict))
+    interval_list = []
+    summary_list = []
+    for ((origin, destination), baseline), pair_seed in zip(baseline_dict.items(), seeds):
+        df_inter = mf.get_pair_df(inter_index, origin, destination, inter_transports)
+        rc_floor = mf.get_predicted_stock(baseline, time)
+        afvoer = go.update_pair(baseline.copy(), df_inter.copy(), origin, destination, time, rc_floor)
+        times, counts = mf.simulate_flex_order_scenarios(
+            afvoer, time, n_scenarios, config.SCENARIO_FLOOR_NOISE, config.SCENARIO_FORECAST_ERROR_SD,
+            np.random.default_rng(pair_seed))
+        df_pair = mf.summarize_order_scenarios(times, counts, config.SCENARIO_RISK_QUANTILE)
+        interval_list.append(df_pair.assign(origin=origin, destination=destination))
+        totals = counts.sum(axis=1)
+        summary_list.append({
+            'origin': origin,
+            'destination': destination,
+            'mean_orders': totals.mean(),
+            'std_orders': totals.std(),
+            'p05_orders': mf.scenario_quantile(totals, 0.05),
+            'p50_orders': mf.scenario_quantile(totals, 0.5),
+            'p95_orders': mf.scenario_quantile(totals, 0.95),
+            'prob_order': (totals > 0).mean(),
+            'recommended_orders': df_pair['recommended_orders'].sum()})
+    columns = ['origin', 'destination', 'date_time', 'mean_orders', 'prob_order', 'recommended_orders']
+    df_intervals = pd.concat(interval_list, ignore_index=True)[columns] if interval_list else \
+        pd.DataFrame(columns=columns)
+    df_summary = pd.DataFrame(summary_list)
+    logger.info('Scenario runner - %s scenarios for %s combinations, %s recommended flex orders', n_scenarios,
+                len(baseline_dict), df_summary['recommended_orders'].sum() if len(df_summary) > 0 else 0)
+    return df_intervals, df_summary
+
+
+@instrumentation.instrumented_run('scenario_runner', budget=60 * config.REFRESH_INTERVAL)
+def main():
+    logger.info('Scenario runner - started')
+    baseline_dict = mf.read_baseline_store(config.PATH_AFVOER_BASELINE_STORE)
+    inter_transports = mf.read_cleaned_SIM_data(config.PATH_TRANSPORT_CLEANED)
+    df_intervals, df_summary = run_scenarios(baseline_dict, inter_transports, config.current_time)
+    with pd.ExcelWriter(config.PATH_SCENARIO_ORDERS) as writer:
+        df_summary.to_excel(writer, sheet_name='summary', index=False)
+        df_intervals.to_excel(writer, sheet_name='intervals', index=False)
+    logger.info('Scenario runner - results saved')
+
+
+if __name__ == '__main__':
+    main()
@@ -26,6 +26,7 @@ setup(
     description='Set of tools for obtaining information on when and where afvoertekorten are expected and for suggesting possible solutions using flex rides',
     author='DKS',
     packages=find_packages(where='.', exclude=['tests']),
+    package_data={'flex_package': ['data/location_aliases.csv']},
     install_requires=parse_requirements(ROOT / 'requirements.txt'),
     extras_require={
         'dev': ['flake8', 'mypy', 'pylama', 'notebook'],
@@ -0,0 +1,62 @@
+"""
+Shared fixtures of the tests.
+"""
+
+import datetime
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+
+def make_model_params():
+    """Model parameters of a tiny network of two depots and two crossdocks, with the attributes of
+    PySources.ModelParams that are used by the flextoewijzer.
+    """
+
+    locations = ['ALR', 'HT', 'XASD', 'TL']
+    minutes = [[0, 30, 40, 50], [30, 0, 45, 35], [40, 45, 0, 25], [50, 35, 25, 0]]
+    final_departure = datetime.datetime(2022, 1, 31, 21)
+    return types.SimpleNamespace(
+        depot_info=pd.DataFrame({'Name': locations, 'DepotType': ['DEPOT', 'DEPOT', 'CROSS', 'CROSS']}),
+        drive_times=pd.DataFrame([[datetime.timedelta(minutes=m) for m in row] for row in minutes], index=locations,
+                                 columns=locations),
+        final_departure_inter1={(origin, destination, prio): final_departure + datetime.timedelta(hours=i)
+                                for origin in locations for destination in locations
+                                for i, prio in enumerate('ABCD')},
+        final_departure_inter2={(origin, destination, prio): final_departure + datetime.timedelta(hours=i + 1)
+                                for origin in locations for destination in locations
+                                for i, prio in enumerate('ABCD')},
+        Loading_time=datetime.timedelta(minutes=30),
+        shift_extension=datetime.timedelta(hours=1),
+        truck_cap=48,
+        w1=1,
+        w2=0.5,
+        Afvoer_predictions=False)
+
+
+@pytest.fixture
+def ff(monkeypatch):
+    """The functions of the flextoewijzer, with the model parameters of 'make_model_params'. PySources is not part of
+    this package, so it is replaced by empty modules if it is not installed.
+    """
+
+    try:
+        import PySources.ModelParams  # noqa: F401
+    except ImportError:
+        parents = dict()
+        for name in ['PySources', 'PySources.ModelParams', 'PySources.Rijtijden', 'PySources.Rijtijden.geocoderen',
+                     'PySources.Rijtijden.prepare_distance_time_matrices']:
+            module = types.ModuleType(name)
+            parent, _, child = name.rpartition('.')
+            if parent:
+                setattr(parents[parent], child, module)
+            parents[name] = module
+            monkeypatch.setitem(sys.modules, name, module)
+    import flex_package.models.modelfunctions.flextoewijzer_functions as ff
+
+    monkeypatch.setattr(ff, 'mp', make_model_params())
+    ff.reload_model_data()
+    yield ff
+    ff.reload_model_data()
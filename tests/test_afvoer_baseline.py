@@ -0,0 +1,58 @@
+"""
+Testing the computation of the afvoer baseline.
+"""
+
+import datetime
+import logging
+
+import pytest
+
+import flex_package.config as config
+import flex_package.models.afvoer_baseline as afvoer_baseline
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+from flex_package.data import ingestion
+from test_flexvoorspeller_functions import afvoer_behoefte, inter_transports, pairs, start
+
+
+@pytest.fixture
+def input_files(tmp_path, monkeypatch):
+    """Predictions and transports of the test data in csv files, with the process day of the test data in config."""
+
+    afvoer_behoefte.assign(date_time=afvoer_behoefte['date_time'].dt.strftime(ingestion.AFVOER_TIME_FORMAT)).to_csv(
+        tmp_path / 'afvoer.csv', index=False)
+    inter_transports.to_csv(tmp_path / 'transport.csv', index=False)
+    monkeypatch.setattr(config, 'PATH_AFVOER', str(tmp_path / 'afvoer.csv'))
+    monkeypatch.setattr(config, 'PATH_TRANSPORT_CLEANED', str(tmp_path / 'transport.csv'))
+    monkeypatch.setattr(config, 'PATH_AFVOER_BASELINE_STORE', str(tmp_path / 'baseline'))
+    monkeypatch.setattr(config, 'BOOL_EXPORT_EXCEL', False)
+    monkeypatch.setattr(config, 'process_day', start.date())
+    return tmp_path
+
+
+def test_afvoer_baseline(input_files):
+    """Test that the baseline of the process day is written to the baseline store.
+    """
+
+    afvoer_baseline.main()
+    baseline_dict = mf.read_baseline_store(config.PATH_AFVOER_BASELINE_STORE)
+    assert sorted(baseline_dict.keys()) == sorted(pairs)
+    assert (baseline_dict[('ALR', 'XASD')]['event'] == 'Inter').any()
+
+
+def test_afvoer_baseline_window(input_files, monkeypatch, caplog):
+    """Test that a process window without predictions stops with an error that gives the data range, and that a
+    window without inter transports is logged.
+    """
+
+    monkeypatch.setattr(config, 'process_day', start.date() - datetime.timedelta(days=365))
+    with pytest.raises(ValueError, match='No predicted afvoer .* run from 2022-01-31 16:00:00'):
+        afvoer_baseline.main()
+
+    monkeypatch.setattr(config, 'process_day', start.date())
+    inter_transports.assign(loading_time=inter_transports['loading_time'] - datetime.timedelta(days=2)).to_csv(
+        input_files / 'transport.csv', index=False)
+    with caplog.at_level(logging.WARNING, logger=afvoer_baseline.__name__):
+        afvoer_baseline.main()
+    assert 'no inter transports in the process window' in caplog.text
+    baseline_dict = mf.read_baseline_store(config.PATH_AFVOER_BASELINE_STORE)
+    assert not any((afvoer['event'] == 'Inter').any() for afvoer in baseline_dict.values())
@@ -0,0 +1,168 @@
+"""
+Testing the backtest of the flextoewijzer.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import flex_package.config as config
+
+
+@pytest.fixture
+def backtest(ff):
+    """The backtest module, with the model parameters of the 'ff' fixture."""
+
+    import flex_package.models.backtest as backtest
+    return backtest
+
+
+def test_parse_grid(backtest):
+    """Test that the values of the parameters are read as Python literals, or as strings.
+    """
+
+    grid = backtest.parse_grid(['w2=0,0.5,1', 'ASSIGNMENT_METHOD=matching,sequence', ' MAX_ORDERS_PER_RIDE = 2, 3',
+                                'Afvoer_predictions=True', 'PATH=a=b'])
+    assert grid == {'w2': [0, 0.5, 1], 'ASSIGNMENT_METHOD': ['matching', 'sequence'], 'MAX_ORDERS_PER_RIDE': [2, 3],
+                    'Afvoer_predictions': [True], 'PATH': ['a=b']}
+    assert [type(value) for value in grid['w2']] == [int, float, int]
+    assert backtest.parse_grid([]) == {}
+    for argument in ['w2', 'w2=']:
+        with pytest.raises(ValueError):
+            backtest.parse_grid([argument])
+
+
+def test_get_parameter_sets(backtest):
+    """Test that every combination of values is a parameter set, and that an empty grid is a single empty set.
+    """
+
+    assert backtest.get_parameter_sets({'w2': [0, 1], 'MAX_ORDERS_PER_RIDE': [2, 3]}) == [
+        {'w2': 0, 'MAX_ORDERS_PER_RIDE': 2}, {'w2': 0, 'MAX_ORDERS_PER_RIDE': 3},
+        {'w2': 1, 'MAX_ORDERS_PER_RIDE': 2}, {'w2': 1, 'MAX_ORDERS_PER_RIDE': 3}]
+    assert backtest.get_parameter_sets({}) == [{}]
+
+
+def test_set_parameters(backtest, ff, monkeypatch):
+    """Test that the parameters are set in the model parameters or in config, and are restored with the previous values.
+    An unknown parameter leaves all parameters unchanged.
+    """
+
+    monkeypatch.setattr(config, 'MAX_ORDERS_PER_RIDE', 2)
+    previous = backtest.set_parameters({'w2': 0.8, 'MAX_ORDERS_PER_RIDE': 3})
+    assert (ff.mp.w2, config.MAX_ORDERS_PER_RIDE) == (0.8, 3)
+    assert not hasattr(ff.mp, 'MAX_ORDERS_PER_RIDE')
+    assert previous == {'w2': 0.5, 'MAX_ORDERS_PER_RIDE': 2}
+    assert backtest.set_parameters(previous) == {'w2': 0.8, 'MAX_ORDERS_PER_RIDE': 3}
+    assert (ff.mp.w2, config.MAX_ORDERS_PER_RIDE) == (0.5, 2)
+
+    with pytest.raises(ValueError):
+        backtest.set_parameters({'w2': 0.8, 'UNKNOWN_PARAMETER': 1})
+    assert ff.mp.w2 == 0.5
+    assert not hasattr(config, 'UNKNOWN_PARAMETER')
+
+
+def test_unknown_parameter(backtest, ff, monkeypatch):
+    """Test that a run of a day with an unknown parameter fails without changing the parameters, and that the backtest
+    rejects an unknown parameter before any day is run.
+    """
+
+    files = {'registratie': 'registratie.xlsx', 'transport': None, 'orders': None}
+    assert backtest.run_day(datetime.date(2022, 1, 31), {'w2': 0.8, 'UNKNOWN_PARAMETER': 1}, files) is None
+    assert ff.mp.w2 == 0.5
+
+    def map_ordered(*args):
+        raise AssertionError('No work may be submitted')
+
+    monkeypatch.setattr(backtest.pf, 'map_ordered', map_ordered)
+    monkeypatch.setattr(backtest, 'get_day_files', lambda day: files)
+    with pytest.raises(ValueError, match='UNKNOWN_PARAMETER'):
+        backtest.run_backtest([datetime.date(2022, 1, 31)], {'w2': [0, 1], 'UNKNOWN_PARAMETER': [1]}, n_workers=2)
+
+
+def write_registration(path):
+    """Registration of a process day with three flex trucks and the orders of the evening."""
+
+    df_flex = pd.DataFrame({'Flex ': ['ALR 1', 'HT 1', 'XASD 1'], 'Wagencode ': ['AB1', 'CD2', 'EF3'],
+                            'Start': ['18:00', '18:30', '19:00'], 'Eind': ['23:00', '22:00', '2:00']})
+    df_orders = pd.DataFrame({
+        'Tijd': ['18:00', '18:00', '18:15', '19:00', '19:30', '20:00', '21:00', '22:30'],
+        'A': [10, 20, 30, 15, 40, 5, 25, 10], 'B': [5, 0, 0, 10, 0, 5, 0, 10], 'C': 0, 'D': [0, 5, 0, 0, 0, 10, 5, 0],
+        'BE': 0, 'Van': ['ALR', 'HT', 'ALR', 'HT', 'ALR', 'HT', 'ALR', 'HT'],
+        'Naar': ['XASD', 'TL', 'TL', 'XASD', 'XASD', 'TL', 'XASD', 'TL'], 'Status': 'Open', 'Oplossing': None})
+    df_orders['Totaal'] = df_orders[['A', 'B', 'C', 'D', 'BE']].sum(axis=1)
+    with pd.ExcelWriter(path) as writer:
+        df_flex.to_excel(writer, sheet_name='Flex', index=False)
+        df_orders.to_excel(writer, sheet_name='Afvoertekorten', index=False)
+    return df_orders
+
+
+def test_run_day(backtest, ff, monkeypatch, tmp_path):
+    """Test that a day is replayed with the parameters of the run and an unlimited replan budget, that the KPIs count
+    the orders and rides of the day, and that repeated runs give the same KPIs.
+    """
+
+    df_orders = write_registration(tmp_path / 'registratie.xlsx')
+    files = {'registratie': str(tmp_path / 'registratie.xlsx'), 'transport': None, 'orders': None}
+    planners = []
+
+    class RecordedPlanner(backtest.RollingHorizonPlanner):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            planners.append(self)
+
+    monkeypatch.setattr(backtest, 'RollingHorizonPlanner', RecordedPlanner)
+    day = datetime.date(2022, 1, 31)
+    row = backtest.run_day(day, {'w2': 0.8, 'MAX_ORDERS_PER_RIDE': 1}, files)
+    assert ff.mp.w2 == 0.5 and config.MAX_ORDERS_PER_RIDE == 2
+    assert planners[0].time_budget == config.BACKTEST_REPLAN_TIME_BUDGET == float('inf')
+    assert (row['day'], row['w2'], row['MAX_ORDERS_PER_RIDE']) == (day, 0.8, 1)
+    assert (row['n_orders'], row['rc_orders'], row['n_trucks']) == (len(df_orders), df_orders['Totaal'].sum(), 3)
+    # Every ride takes a single order
+    assert 0 < row['n_solved'] == row['n_rides'] == len(planners[0].fulfilled_orders)
+    assert row['rc_solved'] == sum(order.Ntot for orders in planners[0].fulfilled_orders for order in orders)
+    assert 0 < row['rc_on_time'] <= row['rc_solved']
+    assert 0 < row['n_trucks_used'] <= 3
+    assert 0 < row['busy_hours'] < row['shift_hours'] == 5 + 3.5 + 7
+
+    # Repeated runs give the same KPIs, apart from the compute times
+    kpis = [{name: value for name, value in backtest.run_day(day, {}, files).items()
+             if name not in ('runtime_seconds', 'max_replan_seconds')} for _ in range(2)]
+    assert kpis[0] == kpis[1]
+
+
+def make_kpis(day, w2, n_orders, n_solved, max_replan_seconds):
+    """KPIs of a day, with a rollcage per order and an hour per order of which half is busy."""
+
+    return {'day': day, 'w2': w2, 'n_orders': n_orders, 'n_solved': n_solved, 'rc_orders': 10 * n_orders,
+            'rc_solved': 10 * n_solved, 'rc_on_time': 5 * n_solved, 'n_rides': n_solved, 'n_trucks': 2,
+            'n_trucks_used': 1, 'busy_hours': n_solved / 2, 'shift_hours': n_orders,
+            'max_replan_seconds': max_replan_seconds, 'runtime_seconds': 1}
+
+
+def test_aggregate_kpis(backtest):
+    """Test that the KPIs are summed over the days before the proportions are computed, and that the parameter sets
+    with the best proportion of rollcages solved are first.
+    """
+
+    df_days = backtest.add_kpi_ratios(pd.DataFrame([
+        make_kpis('2022-01-31', 0, 10, 2, 0.5), make_kpis('2022-02-01', 0, 30, 24, 0.2),
+        make_kpis('2022-01-31', 1, 10, 10, 0.1), make_kpis('2022-02-01', 1, 30, 15, 0.9)]))
+    df_summary = backtest.aggregate_kpis(df_days, ['w2'])
+    assert df_summary['w2'].tolist() == [0, 1]
+    assert df_summary['n_days'].tolist() == [2, 2]
+    assert df_summary['n_orders'].tolist() == [40, 40]
+    assert df_summary['n_solved'].tolist() == [26, 25]
+    assert df_summary['n_trucks'].tolist() == [4, 4]
+    assert df_summary['max_replan_seconds'].tolist() == [0.5, 0.9]
+    assert np.allclose(df_summary['prop_rc_solved'], [26 / 40, 25 / 40])
+    assert np.allclose(df_summary['prop_on_time'], [0.5, 0.5])
+    assert np.allclose(df_summary['utilisation'], [13 / 40, 12.5 / 40])
+    # The proportion of a parameter set is not the mean of the proportions of the days
+    assert not np.isclose(df_summary['prop_solved'].iloc[0], df_days.loc[df_days['w2'] == 0, 'prop_solved'].mean())
+
+    df_summary = backtest.aggregate_kpis(df_days[df_days['w2'] == 1], [])
+    assert len(df_summary) == 1
+    assert df_summary['n_solved'].tolist() == [25]
+    assert 'w2' not in df_summary.columns
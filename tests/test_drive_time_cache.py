@@ -0,0 +1,53 @@
+"""
+Testing the drive-time cache.
+"""
+
+import numpy as np
+import pandas as pd
+
+from flex_package.models.modelfunctions.drive_time_cache import DriveTimeCache
+
+
+addresses = pd.DataFrame({'Straat': ['Weg', 'Laan', 'Plein', 'Straat'], 'Huisnummer': [1, 2, 3, 4],
+                          'Postcode': ['1000AA', '2000BB', '3000CC', '4000DD'],
+                          'Plaats': ['Amsterdam', 'Utrecht', 'Tiel', 'Zwolle'], 'Land': ['NL'] * 4})
+
+
+def geocode(street, number, postcode, city, country):
+    return 52 + number / 10, 5 + number / 100
+
+
+def compute_matrix(df_points):
+    lat = df_points['lat'].to_numpy()
+    lon = df_points['lon'].to_numpy()
+    return pd.DataFrame(1000 * np.abs(lat[:, None] - lat[None, :]) + 100 * (lon[:, None] > lon[None, :]))
+
+
+def counting(func, calls):
+    def wrapper(*args):
+        calls.append(args)
+        return func(*args)
+    return wrapper
+
+
+def test_drive_time_cache(tmp_path):
+    """Test that adding an address only geocodes the new address and computes the drive times of its row and column.
+    """
+
+    geocode_calls, matrix_calls = [], []
+    cache = DriveTimeCache(str(tmp_path))
+    df_points = cache.get_coordinates(addresses.iloc[:3], counting(geocode, geocode_calls))
+    durations = cache.get_durations(df_points, counting(compute_matrix, matrix_calls))
+    cache.write()
+    assert len(geocode_calls) == 3 and len(matrix_calls) == 1
+    np.testing.assert_allclose(durations, compute_matrix(df_points))
+
+    geocode_calls, matrix_calls = [], []
+    cache = DriveTimeCache(str(tmp_path))
+    df_points = cache.get_coordinates(addresses, counting(geocode, geocode_calls))
+    durations = cache.get_durations(df_points, counting(compute_matrix, matrix_calls))
+    assert len(geocode_calls) == 1 and len(matrix_calls) == 3
+    np.testing.assert_allclose(durations, compute_matrix(df_points))
+
+    cache = DriveTimeCache(str(tmp_path), max_age=pd.Timedelta(0))
+    assert len(cache.df_geocodes) == 0 and len(cache.df_durations) == 0
@@ -0,0 +1,56 @@
+"""
+Testing the event queue of the flextoewijzer.
+"""
+
+import random
+
+import pytest
+
+from flex_package.models.modelfunctions.event_queue import EventQueue
+
+
+class Event:
+    def __init__(self, time, truck=None):
+        self.Time = time
+        self.Truck = truck
+
+
+class OtherEvent(Event):
+    pass
+
+
+def test_event_queue_order():
+    """Test that events are returned in the same order as a stable sort by time, also after removing events.
+    """
+
+    rng = random.Random(0)
+    events = [Event(rng.randint(0, 20)) for _ in range(200)]
+    queue = EventQueue(events)
+    removed = events[::7]
+    for event in removed:
+        queue.remove(event)
+    expected = sorted([event for event in events if event not in removed], key=lambda x: x.Time)
+
+    assert len(queue) == len(expected)
+    assert list(queue) == expected
+    assert queue[0] is expected[0]
+    assert [queue.pop(0) for _ in range(len(expected))] == expected
+    with pytest.raises(IndexError):
+        queue.pop(0)
+
+
+def test_cancel_triggers():
+    """Test that cancelling the triggers of a truck only removes the triggers of that truck and type.
+    """
+
+    truck_a, truck_b = object(), object()
+    events = [Event(1, truck_a), OtherEvent(2, truck_a), Event(3, truck_b), Event(4, truck_a), Event(5)]
+    queue = EventQueue(events)
+
+    assert queue.cancel_triggers(truck_a, Event) == 2
+    assert queue.cancel_triggers(truck_a, Event) == 0
+    assert list(queue) == [events[1], events[2], events[4]]
+    with pytest.raises(ValueError):
+        queue.remove(events[0])
+    queue.append(events[0])
+    assert queue.pop(0) is events[0]
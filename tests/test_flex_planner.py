@@ -0,0 +1,129 @@
+"""
+Testing the rolling-horizon flex planner.
+"""
+
+import datetime
+import logging
+import time as timer
+
+import pandas as pd
+import pytest
+
+
+day = datetime.datetime(2022, 1, 31)
+
+
+@pytest.fixture
+def fp(ff):
+    """The flex planner module, with the model parameters of the 'ff' fixture."""
+
+    import flex_package.models.flex_planner as fp
+    return fp
+
+
+def make_planner(ff, fp, **kwargs):
+    """Planner of two trucks and orders that are called in during the evening, some at the same time."""
+
+    trucks = [ff.Truck(name='T1', location='ALR', base='ALR', start=day.replace(hour=18), end=day.replace(hour=23),
+                       ext=False),
+              ff.Truck(name='T2', location='HT', base='HT', start=day.replace(hour=18, minute=30),
+                       end=day.replace(hour=22), ext=False)]
+    tekorten = pd.DataFrame({
+        'Tijd': [day.replace(hour=18), day.replace(hour=18), day.replace(hour=18, minute=15),
+                 day.replace(hour=19), day.replace(hour=19, minute=30), day.replace(hour=20)],
+        'A': [10, 20, 30, 15, 40, 5], 'B': [5, 0, 0, 10, 0, 5], 'C': 0, 'D': [0, 5, 0, 0, 0, 10], 'BE': 0,
+        'Van': ['ALR', 'HT', 'ALR', 'HT', 'ALR', 'HT'], 'Naar': ['XASD', 'TL', 'TL', 'XASD', 'XASD', 'TL'],
+        'Status': 'Open', 'Oplossing': None})
+    return fp.RollingHorizonPlanner(trucks, ff.generate_event_list(tekorten, trucks), **kwargs)
+
+
+def snapshot_rides(planner):
+    """Orders, truck, times and route of every dispatched ride."""
+
+    return [([id(order) for order in orders], truck.Name, dispatch_time, pickup_time, arrival_time,
+             [(order.Fulfilled, order.Solved) for order in orders])
+            for orders, truck, dispatch_time, pickup_time, arrival_time in planner.rides]
+
+
+def test_committed_rides(ff, fp):
+    """Test that rides that are dispatched are not changed by later replans, and that their orders are not assigned
+    again.
+    """
+
+    planner = make_planner(ff, fp, time_budget=10)
+    rides = []
+    routes = {truck.Name: [] for truck in planner.trucks}
+    while len(planner.event_list) > 0:
+        planner.process_event(planner.event_list.pop(0))
+        planner.replan(planner.time)   # An additional replan must not change the committed rides either
+        assert snapshot_rides(planner)[:len(rides)] == rides
+        for truck in planner.trucks:
+            assert truck.Location_list[:len(routes[truck.Name])] == routes[truck.Name]
+            routes[truck.Name] = list(truck.Location_list)
+        rides = snapshot_rides(planner)
+
+        committed = {id(order) for orders, *_ in planner.rides for order in orders}
+        assert not committed & {id(order) for orders in planner.unfulfilled_orders for order in orders}
+        assert not committed & {id(order) for truck in planner.trucks for orders in truck.Orderlist
+                                for order in orders}
+        for orders, truck, dispatch_time, pickup_time, arrival_time in planner.rides:
+            assert all(order.Fulfilled and order.Solved == truck.Name for order in orders)
+            assert any(completed is orders for completed in truck.CompletedOrders)
+            assert dispatch_time <= pickup_time <= arrival_time
+    assert len(planner.rides) >= 2
+    assert [orders for orders, *_ in planner.rides] == planner.fulfilled_orders
+
+
+def test_open_order_index(ff, fp):
+    """Test that the index of open orders holds exactly the orders in the event list and the combinations that are
+    not yet being fulfilled, while events are processed and added.
+    """
+
+    planner = make_planner(ff, fp, time_budget=10)
+
+    def check_index():
+        pending = [event for event in planner.event_list if isinstance(event, ff.Order)]
+        assert len(planner.open_orders) == len(pending) + len(planner.unfulfilled_orders)
+        assert all(order in planner.open_orders for order in pending)
+        assert all(orders in planner.open_orders for orders in planner.unfulfilled_orders)
+        assert not any(orders in planner.open_orders for orders in planner.fulfilled_orders)
+
+    check_index()
+    assert len(planner.open_orders) == 6
+    planner.add_event(ff.Order(time=day.replace(hour=19), a=20, b=0, c=0, d=0, origin='ALR', destination='TL'))
+    check_index()
+    while len(planner.event_list) > 0:
+        planner.process_event(planner.event_list.pop(0))
+        check_index()
+    assert len(planner.fulfilled_orders) > 0
+
+
+def test_replan_time_budget(ff, fp, monkeypatch, caplog):
+    """Test that a replan stops evaluating plans once the compute budget is spent, and that the overrun is logged.
+    """
+
+    plans = []
+
+    def slow(assign):
+        def slow_assign(trucks, orders, time, deadline=None):
+            plans.append(assign.__name__)
+            timer.sleep(0.02)
+            return assign(trucks, orders, time, deadline=deadline)
+        return slow_assign
+
+    monkeypatch.setattr(ff, 'match_orders', slow(ff.match_orders))
+    monkeypatch.setattr(ff, 'optimize_truck_assignment', slow(ff.optimize_truck_assignment))
+
+    planner = make_planner(ff, fp, time_budget=10, method='matching')
+    planner.process_until(day.replace(hour=18))
+    n_replans = len(planner.replan_durations)
+    assert n_replans > 0
+    assert plans == ['match_orders', 'optimize_truck_assignment', 'optimize_truck_assignment'] * n_replans
+
+    plans.clear()
+    planner = make_planner(ff, fp, time_budget=0.01, method='matching')
+    with caplog.at_level(logging.WARNING, logger=fp.__name__):
+        planner.process_until(day.replace(hour=18))
+    assert plans == ['match_orders'] * len(planner.replan_durations)
+    assert all(duration > planner.time_budget for duration in planner.replan_durations)
+    assert len([record for record in caplog.records if 'budget' in record.getMessage()]) == len(plans)
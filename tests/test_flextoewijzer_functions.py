@@ -0,0 +1,204 @@
+"""
+Testing the functions of the flextoewijzer.
+"""
+
+import datetime
+import itertools
+import random
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+
+time = datetime.datetime(2022, 1, 31, 18)
+
+
+def make_instance(ff, seed, n_trucks=3, n_orders=6):
+    """Trucks with random bases and shifts, and single orders with random sizes called in at the current time."""
+
+    rng = random.Random(seed)
+    trucks = []
+    for i in range(n_trucks):
+        base = rng.choice(['ALR', 'HT', 'XASD'])
+        start = time + datetime.timedelta(minutes=rng.choice([0, 30, 90]))
+        trucks.append(ff.Truck(name=f'T{i}', location=base, base=base, start=start,
+                               end=start + datetime.timedelta(hours=rng.choice([2, 4, 8])), ext=False))
+    orders = [[ff.Order(time=time, a=rng.randint(1, 20), b=rng.randint(0, 10), c=0, d=rng.randint(0, 10),
+                        origin=rng.choice(['ALR', 'HT']), destination=rng.choice(['XASD', 'TL']))]
+              for _ in range(n_orders)]
+    return trucks, orders
+
+
+def test_compute_efficiency_matrix(ff):
+    """Test that the criterion of every truck and order is the criterion of 'select_truck' for the truck alone.
+    """
+
+    for seed in range(5):
+        trucks, orders = make_instance(ff, seed)
+        efficiency, best_routes = ff.compute_efficiency_matrix(trucks, orders, time)
+        assert (efficiency > 0).any()
+        for t, truck in enumerate(trucks):
+            for o, order in enumerate(orders):
+                selected, criterion = ff.select_truck([truck], order, time)
+                assert np.isclose(efficiency[t, o], criterion)
+                assert ((t, o) in best_routes) == (selected is not None)
+                if selected is not None:
+                    assert best_routes[(t, o)] == ff.get_best_route(truck, order)[0]
+                ff.free_unfulfilled_orders([truck])
+
+
+def test_match_orders_round(ff):
+    """Test that a round of the assignment problem gives the best assignment of at most one order per truck.
+    """
+
+    for seed in range(5):
+        trucks, orders = make_instance(ff, seed)
+        efficiency, _ = ff.compute_efficiency_matrix(trucks, orders, time)
+        best_criterion = max(efficiency[range(len(trucks)), list(assigned_orders)].sum()
+                             for assigned_orders in itertools.permutations(range(len(orders)), len(trucks)))
+        # With a deadline in the past, only the first round is done
+        assert np.isclose(ff.match_orders(trucks, orders, time, deadline=perf_counter() - 1), best_criterion)
+
+
+def record_plans(ff, monkeypatch):
+    """Record the criterion and the assignment of every plan evaluated by 'assign_orders'."""
+
+    plans = []
+
+    def record(assign):
+        def recorded_assign(trucks, orders, time, deadline=None):
+            criterion = assign(trucks, orders, time, deadline=deadline)
+            plans.append((assign.__name__, criterion, ff.save_assignment(trucks)))
+            return criterion
+        return recorded_assign
+
+    monkeypatch.setattr(ff, 'match_orders', record(ff.match_orders))
+    monkeypatch.setattr(ff, 'optimize_truck_assignment', record(ff.optimize_truck_assignment))
+    return plans
+
+
+def test_assign_orders_matching(ff, monkeypatch):
+    """Test that the assignment with matching is never worse than the sequential assignment with 'select_truck', and
+    that the best plan is kept.
+    """
+
+    plans = record_plans(ff, monkeypatch)
+    for seed in range(10):
+        trucks, orders = make_instance(ff, seed)
+        plans.clear()
+        ff.assign_orders(trucks, orders, time, method='sequence')
+        assert [name for name, _, _ in plans] == ['optimize_truck_assignment'] * 2
+        sequence_criterion = max(criterion for _, criterion, _ in plans)
+
+        trucks, orders = make_instance(ff, seed)
+        plans.clear()
+        ff.assign_orders(trucks, orders, time, method='matching')
+        assert [name for name, _, _ in plans] == ['match_orders'] + ['optimize_truck_assignment'] * 2
+        _, best_criterion, best_assignment = max(plans, key=lambda plan: plan[1])
+        assert best_criterion >= sequence_criterion
+        assert np.isclose(max(criterion for _, criterion, _ in plans[1:]), sequence_criterion)
+        assert ff.save_assignment(trucks) == best_assignment
+
+
+def test_assign_orders_deadline(ff, monkeypatch):
+    """Test that no further rounds, orders or plans are evaluated after the deadline, except the first one.
+    """
+
+    plans = record_plans(ff, monkeypatch)
+    trucks, orders = make_instance(ff, 0, n_trucks=2, n_orders=8)
+    ff.assign_orders(trucks, orders, time, method='matching', deadline=perf_counter() - 1)
+    assert [name for name, _, _ in plans] == ['match_orders']
+    # A single round of the assignment problem, in which every truck gets at most one order
+    assert 0 < sum(len(truck.Orderlist) for truck in trucks) <= len(trucks)
+
+    trucks, orders = make_instance(ff, 0, n_trucks=2, n_orders=8)
+    assert ff.optimize_truck_assignment(trucks, orders, time, deadline=perf_counter() - 1) > 0
+    assert sum(len(truck.Orderlist) for truck in trucks) == 1
+
+    trucks, orders = make_instance(ff, 0, n_trucks=2, n_orders=8)
+    ff.match_orders(trucks, orders, time, deadline=perf_counter() + 60)
+    assert sum(len(truck.Orderlist) for truck in trucks) > len(trucks)
+
+
+def test_save_assignment(ff):
+    """Test that a saved assignment is restored after the orders are freed and assigned again.
+    """
+
+    trucks, orders = make_instance(ff, 3)
+    ff.assign_orders(trucks, orders, time, method='sequence')
+    assignment = ff.save_assignment(trucks)
+    pickup_locations = [order[0].PickupLoc for order in orders]
+    assert any(truck.Orderlist for truck in trucks)
+
+    ff.free_unfulfilled_orders(trucks)
+    assert not any(truck.Orderlist for truck in trucks)
+    ff.optimize_truck_assignment(trucks, list(reversed(orders)), time)
+    ff.restore_assignment(trucks, assignment)
+    assert ff.save_assignment(trucks) == assignment
+    assert [order[0].PickupLoc for order in orders] == pickup_locations
+
+
+def test_parse_times(ff):
+    """Test that the times of the registration are parsed in all formats, and that other values are NaT.
+    """
+
+    values = pd.Series(['8:30', '08:30', ' 08u30 ', '08U30', '08:30:00', '08:30:00.000', datetime.time(8, 30),
+                        datetime.datetime(2022, 1, 31, 8, 30), pd.Timestamp(2022, 1, 31, 8, 30),
+                        '23:59', '0:05', datetime.time(0, 5),
+                        '24:00', '25:10', '8.30', '830', 'geen', '', None, np.nan, 8.5, '8:3', '08:30:00:00'],
+                       dtype=object)
+    times = ff.parse_times(values)
+    expected = [pd.Timedelta(hours=8, minutes=30)] * 9 + [pd.Timedelta(hours=23, minutes=59),
+                                                          pd.Timedelta(minutes=5), pd.Timedelta(minutes=5)]
+    assert times.iloc[:12].tolist() == expected
+    assert times.iloc[12:].isna().all()
+    assert times.index.equals(values.index)
+
+
+def test_add_date(ff):
+    """Test that the orders from the first order before 4:00 on are on the next day.
+    """
+
+    tekorten = pd.DataFrame({'Tijd': pd.to_timedelta(['18:00:00', '23:30:00', '03:59:00', '05:00:00', '04:00:00',
+                                                      '00:10:00'])}, index=[3, 5, 6, 8, 9, 12])
+    tekorten = ff.add_date(tekorten, datetime.date(2022, 1, 31))
+    assert tekorten['Tijd'].tolist() == [pd.Timestamp(2022, 1, 31, 18), pd.Timestamp(2022, 1, 31, 23, 30),
+                                         pd.Timestamp(2022, 2, 1, 3, 59), pd.Timestamp(2022, 2, 1, 5),
+                                         pd.Timestamp(2022, 2, 1, 4), pd.Timestamp(2022, 2, 1, 0, 10)]
+
+
+def test_clean_orders(ff):
+    """Test that orders of which the time cannot be parsed are dropped.
+    """
+
+    tekorten = pd.DataFrame({'Tijd': ['18:00', '18u15', 'onbekend', datetime.time(19), '26:00'],
+                             'Totaal': [10, 20, 30, 40, 50],
+                             'Van': ['ALR', 'HT', 'ALR', 'HT', 'ALR'], 'Naar': ['XASD', 'TL', 'TL', 'XASD', 'TL']})
+    tekorten = ff.clean_orders(tekorten)
+    assert tekorten['Totaal'].tolist() == [10, 20, 40]
+    assert tekorten['Tijd'].tolist() == [pd.Timedelta(hours=18), pd.Timedelta(hours=18, minutes=15),
+                                         pd.Timedelta(hours=19)]
+
+
+def test_read_flex(ff, tmp_path):
+    """Test that the shifts of the registration are read with the dates of the process day, from the first shift that
+    starts before 6:00 on the next day, and that shifts without valid times are dropped.
+    """
+
+    path = tmp_path / 'registratie.xlsx'
+    df = pd.DataFrame({'Flex ': ['ALR 1', 'HT 1', 'XASD 1', 'TL 1', 'ALR 2', 'HT 2'],
+                       'Wagencode ': ['AB1', 'CD2', 'EXTERN', 'EF3', 'GH4', 'IJ5'],
+                       'Start': [datetime.time(18), '22:30', 'ziek', '5:00', datetime.time(7), '09u00'],
+                       'Eind': ['2:00', datetime.time(23, 30), '6:00', '13:00', '15:00', '17:00']})
+    df.to_excel(path, sheet_name='Flex', index=False)
+
+    trucks = ff.read_flex(str(path), datetime.date(2022, 1, 31))
+    assert [truck.Name for truck in trucks] == ['ALR1', 'HT1', 'TL1', 'ALR2', 'HT2']
+    assert [truck.Base for truck in trucks] == ['ALR', 'HT', 'TL', 'ALR', 'HT']
+    assert [(truck.Start, truck.End) for truck in trucks] == [
+        (pd.Timestamp(2022, 1, 31, 18), pd.Timestamp(2022, 2, 1, 2)),
+        (pd.Timestamp(2022, 1, 31, 22, 30), pd.Timestamp(2022, 1, 31, 23, 30)),
+        (pd.Timestamp(2022, 2, 1, 5), pd.Timestamp(2022, 2, 1, 13)),
+        (pd.Timestamp(2022, 2, 1, 7), pd.Timestamp(2022, 2, 1, 15)),
+        (pd.Timestamp(2022, 2, 1, 9), pd.Timestamp(2022, 2, 1, 17))]
@@ -0,0 +1,151 @@
+"""
+Testing the functions of the flexvoorspeller.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+
+
+start = datetime.datetime(2022, 1, 31, 16)
+rng = np.random.default_rng(0)
+afvoer_behoefte = pd.DataFrame(
+    [[start + datetime.timedelta(minutes=15 * i), origin, crossdock, rng.integers(0, 20)]
+     for origin in ['ALR', 'HT'] for crossdock in ['XASD', 'XWW', 'TL'] for i in range(40)],
+    columns=['date_time', 'origin', 'crossdock', 'rc_forecast'])
+inter_transports = pd.DataFrame(
+    [[start + datetime.timedelta(minutes=37 * i + 7), origin, crossdock, 48]
+     for origin in ['ALR', 'HT'] for crossdock in ['XASD', 'XWW'] for i in range(0, 16, 3)],
+    columns=['loading_time', 'Afk laadlocatie', 'Afk loslocatie', 'RC groot equivalent gepland'])
+pairs = [(origin, crossdock) for origin in ['ALR', 'HT'] for crossdock in ['XASD', 'XWW', 'TL']]
+
+
+def test_compute_clamped_stock():
+    """Test that the stock starts at the first change and never drops below zero afterwards.
+    """
+
+    stock = mf.compute_clamped_stock(np.array([[5, -10, 3, -1, -4, 6], [-2, 1, 1, -5, 2, 0]]))
+    np.testing.assert_array_equal(stock, [[5, 0, 3, 2, 0, 6], [-2, 0, 1, 0, 2, 2]])
+
+
+def test_generate_stock_predictions():
+    """Test that the vectorized stock prediction matches the reference implementation for every pair.
+    """
+
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    assert list(stock_dict.keys()) == pairs
+    for origin, destination in pairs:
+        df_afvoer = mf.generate_afvoer_df(origin, destination, afvoer_behoefte)
+        df_inter = mf.generate_inter_df(origin, destination, inter_transports)
+        expected = mf.generate_stock_prediction(df_afvoer, df_inter)
+        pd.testing.assert_frame_equal(stock_dict[(origin, destination)], expected, check_dtype=False)
+
+
+def test_generate_destination_dict():
+    """Test that the groupby based destinations and pair slices match filtering per pair.
+    """
+
+    destination_dict = mf.generate_destination_dict(afvoer_behoefte)
+    inter_index = mf.index_pairs(inter_transports, 'Afk laadlocatie', 'Afk loslocatie')
+    for origin in ['ALR', 'HT']:
+        assert destination_dict[origin] == mf.generate_destinations(origin, afvoer_behoefte)
+        for destination in destination_dict[origin]:
+            pd.testing.assert_frame_equal(mf.get_pair_df(inter_index, origin, destination, inter_transports),
+                                          mf.generate_inter_df(origin, destination, inter_transports))
+
+
+def test_update_afvoer_dict():
+    """Test that the batched stock update gives the same predictions as 'update_afvoer' for every pair.
+    """
+
+    time = start + datetime.timedelta(hours=3)
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    # A pair without predictions from the current time on keeps its stock
+    stock_dict[('HT', 'ZL')] = stock_dict[pairs[0]][stock_dict[pairs[0]]['date_time'] < time]
+    rc_floors = {pair: 20 * i for i, pair in enumerate(stock_dict.keys())}
+    updated_dict = mf.update_afvoer_dict({pair: afvoer.copy() for pair, afvoer in stock_dict.items()}, time, rc_floors)
+    assert list(updated_dict.keys()) == list(stock_dict.keys())
+    for pair, afvoer in stock_dict.items():
+        expected = mf.update_afvoer(afvoer.copy(), time, rc_floors[pair])
+        pd.testing.assert_frame_equal(updated_dict[pair], expected, check_dtype=False)
+    assert mf.update_afvoer_dict(dict(), time, dict()) == dict()
+
+
+def test_fingerprint_inter_pairs():
+    """Test that the batched fingerprints equal the fingerprints of the selected inter transports of each pair, also
+    when the same order number is used for several pairs.
+    """
+
+    time = start + datetime.timedelta(hours=3)
+    df_transport = inter_transports.assign(Status=['Planned', 'Delivered', 'Delivered', 'Cancelled'] * 6,
+                                           **{'Dagorder nummer': np.arange(len(inter_transports)) % 5})
+    inter_index = mf.index_pairs(df_transport, 'Afk laadlocatie', 'Afk loslocatie')
+    inter_hashes = mf.fingerprint_inter_pairs(df_transport, time, pairs)
+    assert list(inter_hashes.keys()) == pairs
+    for origin, destination in pairs:
+        df_inter = mf.get_pair_df(inter_index, origin, destination, df_transport)
+        assert inter_hashes[(origin, destination)] == mf.fingerprint_inter(mf.select_inter_transports(df_inter, time))
+    assert len(set(inter_hashes.values())) == 5   # The pairs without inter transports have the same fingerprint
+    assert mf.fingerprint_inter_pairs(df_transport, time + datetime.timedelta(hours=2), pairs) != inter_hashes
+
+
+def test_generate_flex_orders():
+    """Test that the batched order generator gives the same orders and corrected stock as 'add_flex_orders'.
+    """
+
+    time = start + datetime.timedelta(hours=3)
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    afvoer_dict = {pair: mf.update_afvoer(stock_dict[pair].copy(), time, 60) for pair in pairs}
+    afvoer_dict_new, orders = mf.generate_flex_orders({pair: afvoer_dict[pair].copy() for pair in pairs}, time)
+
+    expected_orders = []
+    for origin, destination in pairs:
+        expected, pair_orders = mf.add_flex_orders(afvoer_dict[(origin, destination)].copy(), time, origin, destination)
+        expected_orders.extend(pair_orders)
+        pd.testing.assert_frame_equal(afvoer_dict_new[(origin, destination)], expected.reset_index(drop=True),
+                                      check_dtype=False)
+    assert len(orders) > 0
+    assert [(order.Time, order.Size, order.Origin, order.Destination) for order in orders] == \
+        [(order.Time, order.Size, order.Origin, order.Destination) for order in expected_orders]
+
+
+def test_simulate_flex_order_scenarios():
+    """Test that scenarios without noise give the orders of 'generate_flex_orders', and that noise spreads the orders.
+    """
+
+    time = start + datetime.timedelta(hours=3)
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    afvoer_dict = {pair: mf.update_afvoer(stock_dict[pair].copy(), time, 60) for pair in pairs}
+    _, orders = mf.generate_flex_orders({pair: afvoer_dict[pair].copy() for pair in pairs}, time)
+    for origin, destination in pairs:
+        times, counts = mf.simulate_flex_order_scenarios(afvoer_dict[(origin, destination)], time, 3, 0, 0,
+                                                         np.random.default_rng(0))
+        expected = pd.Series([order.Time for order in orders
+                              if (order.Origin, order.Destination) == (origin, destination)], dtype=object)
+        expected = expected.value_counts().reindex(pd.to_datetime(times), fill_value=0).to_numpy()
+        np.testing.assert_array_equal(counts, np.tile(expected, (3, 1)))
+
+    times, counts = mf.simulate_flex_order_scenarios(afvoer_dict[pairs[0]], time, 1000, 10, 0.2,
+                                                     np.random.default_rng(0))
+    assert counts.shape == (1000, len(times)) and counts.sum(axis=1).std() > 0
+    df_summary = mf.summarize_order_scenarios(times, counts, 0.8)
+    assert (df_summary['recommended_orders'] >= 0).all()
+    assert df_summary['recommended_orders'].sum() == mf.scenario_quantile(counts.sum(axis=1), 0.8)
+
+
+def test_baseline_store(tmp_path):
+    """Test that the columnar baseline store returns the stored predictions, also when reading a subset of pairs.
+    """
+
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    df_summary = pd.DataFrame({'origin': [pair[0] for pair in pairs], 'destination': [pair[1] for pair in pairs]})
+    mf.write_baseline_store(stock_dict, df_summary, str(tmp_path))
+
+    stored_dict = mf.read_baseline_store(str(tmp_path))
+    assert list(stored_dict.keys()) == pairs
+    for pair in pairs:
+        pd.testing.assert_frame_equal(stored_dict[pair], stock_dict[pair])
+    assert list(mf.read_baseline_store(str(tmp_path), pairs[-2:]).keys()) == pairs[-2:]
@@ -0,0 +1,47 @@
+"""
+Testing the generation of flex orders.
+"""
+
+import datetime
+
+import pandas as pd
+
+import flex_package.models.generate_orders as go
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+from test_flexvoorspeller_functions import afvoer_behoefte, inter_transports, pairs, start
+
+
+time = start + datetime.timedelta(hours=3)
+later_time = time + datetime.timedelta(hours=2)
+# Half of the transports were already delivered, and a delivered transport from ALR to TL (not in the baseline) is
+# loaded between the two refresh times
+df_transport = pd.concat([
+    inter_transports.assign(Status=['Planned', 'Delivered'] * (len(inter_transports) // 2)),
+    pd.DataFrame([[time + datetime.timedelta(hours=1), 'ALR', 'TL', 48, 'Delivered']],
+                 columns=list(inter_transports.columns) + ['Status'])], ignore_index=True)
+df_transport['Dagorder nummer'] = range(len(df_transport))
+
+
+def test_incremental_refresh():
+    """Test that an incremental refresh at a later time gives the same predictions and orders as a full run, for the
+    combinations that changed as well as for the combinations that are taken from the previous run.
+    """
+
+    baseline_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    _, _, state = go.refresh_orders(df_transport, time, baseline_dict=baseline_dict)
+
+    inter_hashes = mf.fingerprint_inter_pairs(df_transport, later_time, pairs)
+    changed, unchanged = go.find_changed_pairs(state, inter_hashes, later_time)
+    # The combinations to TL have no inter transports in the baseline, only the delivered transport of ALR changes
+    assert unchanged == [('HT', 'TL')]
+    assert ('ALR', 'TL') in changed
+
+    afvoer_dict, orders, state = go.refresh_orders(df_transport, later_time, state, baseline_dict)
+    expected_dict, expected_orders, _ = go.refresh_orders(df_transport, later_time, baseline_dict=baseline_dict)
+    assert state['time'] == later_time
+    assert len(orders) > 0 and all(order.Time >= later_time for order in orders)
+    assert [(order.Time, order.Size, order.Origin, order.Destination) for order in orders] == \
+        [(order.Time, order.Size, order.Origin, order.Destination) for order in expected_orders]
+    assert list(afvoer_dict.keys()) == list(expected_dict.keys())
+    for pair, afvoer in afvoer_dict.items():
+        pd.testing.assert_frame_equal(afvoer, expected_dict[pair])
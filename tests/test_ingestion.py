@@ -0,0 +1,43 @@
+"""
+Testing the chunked ingestion of the input files.
+"""
+
+import datetime
+
+import pandas as pd
+
+from flex_package.data import ingestion
+from test_flexvoorspeller_functions import afvoer_behoefte, start
+
+
+def test_read_afvoer_csv(tmp_path):
+    """Test that a chunked read with a time window gives the rows within the window, with categorical locations.
+    """
+
+    afvoer_behoefte.assign(date_time=afvoer_behoefte['date_time'].dt.strftime(ingestion.AFVOER_TIME_FORMAT)).to_csv(
+        tmp_path / 'afvoer.csv', index=False)
+    window_start = start + datetime.timedelta(hours=2)
+    window_end = start + datetime.timedelta(hours=5)
+    df = ingestion.read_afvoer_csv(str(tmp_path / 'afvoer.csv'), window_start, window_end, chunksize=7)
+
+    expected = afvoer_behoefte[(afvoer_behoefte['date_time'] >= window_start) &
+                               (afvoer_behoefte['date_time'] < window_end)].reset_index(drop=True)
+    assert df['origin'].dtype == 'category' and df['crossdock'].dtype == 'category'
+    pd.testing.assert_frame_equal(df.astype({'origin': str, 'crossdock': str}), expected, check_dtype=False)
+    assert len(ingestion.read_afvoer_csv(str(tmp_path / 'afvoer.csv'), window_end, window_start)) == 0
+
+
+def test_read_time_range(tmp_path):
+    """Test that the first and last time of a file are read, and None for a file without rows.
+    """
+
+    afvoer_behoefte.sample(frac=1, random_state=0).assign(
+        date_time=lambda df: df['date_time'].dt.strftime(ingestion.AFVOER_TIME_FORMAT)).to_csv(
+        tmp_path / 'afvoer.csv', index=False)
+    first, last = ingestion.read_time_range(str(tmp_path / 'afvoer.csv'), 'date_time', ingestion.AFVOER_TIME_FORMAT,
+                                            chunksize=7)
+    assert (first, last) == (start, afvoer_behoefte['date_time'].max())
+
+    afvoer_behoefte.iloc[0:0].to_csv(tmp_path / 'empty.csv', index=False)
+    assert ingestion.read_time_range(str(tmp_path / 'empty.csv'), 'date_time', ingestion.AFVOER_TIME_FORMAT) == \
+        (None, None)
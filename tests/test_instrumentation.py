@@ -0,0 +1,51 @@
+"""
+Testing the instrumentation of the hot paths.
+"""
+
+import json
+import pstats
+
+from flex_package import config, instrumentation
+
+
+@instrumentation.instrument
+def allocate(n):
+    with instrumentation.timed('allocate.inner', label=f'size {n}'):
+        return len(bytearray(n))
+
+
+def test_instrument():
+    """Test that calls are only recorded when enabled, and that the peak memory of nested calls is recorded.
+    """
+
+    instrumentation.reset()
+    allocate(10)
+    assert instrumentation.get_summary()['functions'] == {}
+
+    instrumentation.enable(track_memory=True)
+    for n in [10 ** 6, 10 ** 3]:
+        allocate(n)
+    instrumentation.disable()
+    summary = instrumentation.get_summary()
+    assert summary['functions']['test_instrumentation.allocate']['calls'] == 2
+    assert summary['functions']['test_instrumentation.allocate']['peak_memory_bytes'] >= 10 ** 6
+    assert list(summary['labels']['allocate.inner']) == ['size 1000000', 'size 1000']
+
+
+def test_instrumented_run(tmp_path, monkeypatch):
+    """Test that an instrumented run writes a JSON summary and a cProfile dump.
+    """
+
+    monkeypatch.setattr(config, 'BOOL_INSTRUMENTATION', True)
+    monkeypatch.setattr(config, 'INSTRUMENTATION_PROFILER', 'cprofile')
+    monkeypatch.setattr(config, 'PATH_INSTRUMENTATION', str(tmp_path / 'instrumentation'))
+    with instrumentation.instrumented_run('test', budget=60):
+        allocate(100)
+    assert not instrumentation.is_enabled()
+
+    summary_file, = (tmp_path / 'instrumentation').glob('test_*.json')
+    summary = json.loads(summary_file.read_text())
+    assert summary['run'] == 'test' and summary['budget_seconds'] == 60
+    assert summary['functions']['test_instrumentation.allocate']['calls'] == 1
+    profile_file, = (tmp_path / 'instrumentation').glob('test_*.prof')
+    assert pstats.Stats(str(profile_file)).total_calls > 0
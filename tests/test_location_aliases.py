@@ -0,0 +1,38 @@
+"""
+Testing the location alias table.
+"""
+
+import pandas as pd
+
+from flex_package.data import location_aliases as la
+from flex_package.data.prepare_data import convert_locations, rename_locations
+
+
+def test_normalize_locations():
+    """Test that aliases are replaced per scope, so a name can be an alias in one scope and a location in another.
+    """
+
+    locations = pd.Series(['TIEL', 'TL', 'ALP', 'HT'])
+    assert list(la.normalize_locations(locations, 'registration')) == ['TL', 'TL', 'ALR', 'HT']
+    assert list(la.normalize_locations(locations, 'sim_code')) == ['TIEL', 'TIEL', 'ALP', 'HT']
+    assert list(la.normalize_locations(locations, 'registration', default=pd.Series(['-'] * 4))) == \
+        ['TL', '-', 'ALR', '-']
+
+
+def test_clean_locations():
+    """Test that the VAR and Simacan cleaners give the codes of the alias table and of the names.
+    """
+
+    data = pd.DataFrame({'Laadlocatie korte naam': ['EX-WW-KG', 'HT-A', 'TL-B'],
+                         'Loslocatie korte naam': ['ASD-CD', 'ALR', 'TL-B'],
+                         'Laadlocatie naam': ['', '', 'Crossdock Tiel'], 'Loslocatie naam': ['', '', '']})
+    data = rename_locations(data)
+    assert list(data['Afk laadlocatie']) == ['XWW', 'HT', 'TL']
+    assert list(data['Afk loslocatie']) == ['XASD', 'ALR', 'TL']
+
+    depot_data = pd.DataFrame({'SIM_NAME': ['DEPOT ALMERE'], 'Afk': ['ALR']})
+    data = pd.DataFrame({'Locatienaam': ['Crossdock Amsterdam', 'Depot Almere'],
+                         'destination': ['TL-1', 'crossdock waalwijk']})
+    data = convert_locations(data, depot_data)
+    assert list(data['Afk laadlocatie']) == ['XASD', 'ALR']
+    assert list(data['Afk loslocatie']) == ['TIEL', 'XWW']
@@ -0,0 +1,71 @@
+"""
+Testing the location registry and the drive-time matrix.
+"""
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flex_package.models.modelfunctions.location_registry import DriveTimeMatrix, FinalDepartureTable, LocationRegistry
+
+
+locations = ['ALR', 'HT', 'XASD']
+drive_times = pd.DataFrame([[dt.timedelta(0), dt.timedelta(minutes=30, seconds=20.4), dt.timedelta(hours=1)],
+                            [dt.timedelta(minutes=31), dt.timedelta(0), dt.timedelta(minutes=45.01)],
+                            [dt.timedelta(hours=1, minutes=2), dt.timedelta(minutes=44), dt.timedelta(0)]],
+                           index=locations, columns=locations)
+
+
+def test_location_registry():
+    """Test that location codes are mapped to their position, and unknown codes raise a KeyError.
+    """
+
+    registry = LocationRegistry(locations)
+    assert registry.get_id('HT') == 1
+    np.testing.assert_array_equal(registry.get_ids(['XASD', 'ALR']), [2, 0])
+    with pytest.raises(KeyError):
+        registry.get_id('TL')
+    with pytest.raises(ValueError):
+        LocationRegistry(['ALR', 'ALR'])
+
+
+def test_location_registry_types():
+    """Test that the type of each location is taken from the first row of the depot info.
+    """
+
+    depot_info = pd.DataFrame({'Name': ['ALR', 'XASD', 'ALR'], 'DepotType': ['DEPOT', 'CROSS', 'CROSS']})
+    registry = LocationRegistry.from_depot_info(depot_info)
+    assert registry.get_type('ALR') == 'DEPOT'
+    assert registry.get_type('XASD') == 'CROSS'
+    assert registry.get_type('TL') is None
+
+
+def test_drive_time_matrix():
+    """Test that scalar and batched lookups give the drive times of the DataFrame, rounded to whole seconds.
+    """
+
+    matrix = DriveTimeMatrix.from_frame(drive_times[['XASD', 'ALR', 'HT']])
+    assert matrix.seconds.dtype == np.int32
+    assert matrix.get_seconds('ALR', 'HT') == 1820
+    assert matrix.get_travel_time('HT', 'XASD') == dt.timedelta(minutes=45, seconds=1)
+    assert matrix.get_seconds('HT', 'HT') == 0
+    np.testing.assert_array_equal(matrix.get_seconds_many(['ALR', 'XASD', 'HT'], ['XASD', 'HT', 'ALR']),
+                                  [3600, 2640, 1860])
+
+
+def test_final_departure_table():
+    """Test that the proportion on time is computed for all arrival times at once, with unknown prios always on time.
+    """
+
+    start = dt.datetime(2022, 1, 31, 22)
+    table = FinalDepartureTable.from_dicts(
+        {('ALR', 'XASD', 'A'): start, ('ALR', 'XASD', 'B'): start + dt.timedelta(hours=1)},
+        {('XASD', 'HT', 'A'): start})
+    end_times = [start - dt.timedelta(minutes=1), start + dt.timedelta(minutes=30), start + dt.timedelta(hours=2)]
+
+    np.testing.assert_allclose(table.get_proportion_on_time('ALR', 'XASD', [1, 2, 3, 4], 0, end_times),
+                               [1, 0.9, 0.7])
+    np.testing.assert_allclose(table.get_proportion_on_time('ALR', 'XASD', [1, 2, 3, 4], 1, end_times), [1, 1, 1])
+    np.testing.assert_allclose(table.get_proportion_on_time('TL', 'XASD', [1, 2, 3, 4], 0, end_times), [1, 1, 1])
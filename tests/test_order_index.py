@@ -0,0 +1,57 @@
+"""
+Testing the index of open orders of the flextoewijzer.
+"""
+
+import pytest
+
+from flex_package.models.modelfunctions.order_index import OpenOrderIndex
+
+
+class Order:
+    def __init__(self, origin, destination, n_rc, time=0):
+        self.Origin = origin
+        self.Destination = destination
+        self.Ntot = n_rc
+        self.Time = time
+
+
+def test_find_open_orders():
+    """Test that the largest open order that fits and shares the origin or destination is found, the first one
+    added in case of a tie.
+    """
+
+    index = OpenOrderIndex(48)
+    open_orders = [[Order('ALR', 'XASD', 20)], [Order('ALR', 'TL', 30)], [Order('HT', 'XASD', 20)],
+                   [Order('HT', 'TL', 10)], [Order('ALR', 'XWW', 5), Order('HT', 'XWW', 5)]]
+    for orders in open_orders:
+        index.add(orders)
+    with pytest.raises(ValueError):
+        index.add(open_orders[0])
+
+    order = Order('ALR', 'XWW', 20)
+    assert index.find([order], 2) is open_orders[0]
+    assert index.find([Order('ALR', 'XWW', 38)], 2) is None
+    assert index.find([Order('ALR', 'XWW', 38)], 3) is open_orders[4]
+    assert index.find([Order('ZL', 'XASD', 28)], 2) is open_orders[0]
+    assert index.find([Order('ZL', 'XASD', 29)], 2) is None
+    assert index.find([Order('ZL', 'HT', 10)], 2) is None
+
+    index.discard(open_orders[0])
+    index.discard(open_orders[0])
+    assert open_orders[0] not in index and len(index) == 4
+    assert index.find([order], 2) is None
+    assert index.find([Order('ZL', 'XASD', 10)], 2) is open_orders[2]
+
+
+def test_find_pending_orders():
+    """Test that pending orders are only combined with orders called in at the same time.
+    """
+
+    open_orders = [[Order('ALR', 'XASD', 10)]]
+    event_list = [Order('ALR', 'TL', 10, time=1), Order('ALR', 'XWW', 10, time=2)]
+    index = OpenOrderIndex.from_events(48, event_list, open_orders, 1, Order)
+    assert len(index) == 2
+    order = Order('ALR', 'HT', 10, time=1)
+    assert index.find([order], 2, order.Time) is event_list[0]
+    assert index.find([order], 2) is open_orders[0]
+    assert index.find([order], 2, 2) is None
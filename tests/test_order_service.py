@@ -0,0 +1,57 @@
+"""
+Testing the order service.
+"""
+
+import datetime
+
+import pandas as pd
+
+import flex_package.models.generate_orders as go
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+from flex_package.models.order_service import OrderService
+from test_flexvoorspeller_functions import afvoer_behoefte, inter_transports, pairs, start
+
+
+def test_order_service(tmp_path, monkeypatch):
+    """Test that a dropped trigger file reloads the transport data and refreshes the orders, giving the same orders
+    as a full run. Only the combination of which a transport changed is updated with the inter transports again.
+    """
+
+    # The dummy floor stock deviates randomly from the prediction at every time, the predicted stock is used instead
+    monkeypatch.setattr(go, 'get_floor_stock',
+                        lambda origin, destination, time, afvoer: mf.get_predicted_stock(afvoer, time))
+    updated_pairs = []   # Combinations updated with the inter transports, in the order of the updates
+    update_pair_transports = go.update_pair_transports
+
+    def record_update(afvoer, df_inter, origin, destination, time):
+        updated_pairs.append((origin, destination))
+        return update_pair_transports(afvoer, df_inter, origin, destination, time)
+
+    monkeypatch.setattr(go, 'update_pair_transports', record_update)
+
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    df_summary = pd.DataFrame({'origin': [pair[0] for pair in pairs], 'destination': [pair[1] for pair in pairs]})
+    mf.write_baseline_store(stock_dict, df_summary, str(tmp_path / 'baseline'))
+    df_transport = inter_transports.assign(**{'Dagorder nummer': range(len(inter_transports)), 'Status': 'Planned'})
+    df_transport.to_csv(tmp_path / 'transport.csv', index=False)
+
+    time = start + datetime.timedelta(hours=3)
+    service = OrderService(str(tmp_path / 'baseline'), str(tmp_path / 'transport.csv'), str(tmp_path / 'orders.xlsx'),
+                           str(tmp_path / 'trigger'), interval=datetime.timedelta(hours=1), poll_seconds=0.01,
+                           start_time=time)
+    # The first transport of ALR to XASD is postponed until after the start of the service
+    df_previous = df_transport.copy()
+    df_transport.loc[0, 'loading_time'] = time + datetime.timedelta(hours=1)
+    df_transport.to_csv(tmp_path / 'transport.csv', index=False)
+    (tmp_path / 'trigger').touch()
+    service.run(max_refreshes=2)
+
+    assert not (tmp_path / 'trigger').exists()
+    assert (tmp_path / 'orders.xlsx').exists()
+    assert updated_pairs == pairs + [('ALR', 'XASD')]
+    _, expected_orders, _ = go.refresh_orders(df_transport, service.state['time'], baseline_dict=service.baseline_dict)
+    _, previous_orders, _ = go.refresh_orders(df_previous, service.state['time'], baseline_dict=service.baseline_dict)
+    orders = [(order.Time, order.Size, order.Origin, order.Destination) for order in service.afvoer_orders]
+    assert orders == [(order.Time, order.Size, order.Origin, order.Destination) for order in expected_orders]
+    # The postponed transport is taken into account
+    assert orders != [(order.Time, order.Size, order.Origin, order.Destination) for order in previous_orders]
@@ -0,0 +1,45 @@
+"""
+Testing the parallel execution of independent computations.
+"""
+
+import datetime
+
+import pandas as pd
+import pytest
+
+import flex_package.models.generate_orders as go
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+import flex_package.models.modelfunctions.parallel_functions as pf
+from test_flexvoorspeller_functions import afvoer_behoefte, inter_transports, pairs, start
+
+
+def get_update_args(time):
+    """Arguments of 'update_pair' for every pair, with a different floor stock for each pair."""
+
+    stock_dict = mf.generate_stock_predictions(afvoer_behoefte, inter_transports, pairs)
+    df_transport = inter_transports.assign(**{'Dagorder nummer': range(len(inter_transports)), 'Status': 'Planned'})
+    inter_index = mf.index_pairs(df_transport, 'Afk laadlocatie', 'Afk loslocatie')
+    return [(stock_dict[(origin, destination)], mf.get_pair_df(inter_index, origin, destination, df_transport).copy(),
+             origin, destination, time, 10 * i) for i, (origin, destination) in enumerate(pairs)]
+
+
+@pytest.mark.parametrize('pool_type', ['thread', 'process'])
+def test_map_ordered(pool_type):
+    """Test that updating the pairs with a pool of workers gives the same results, in the same order, as a sequential
+    run.
+    """
+
+    time = start + datetime.timedelta(hours=3)
+    expected = pf.map_ordered(go.update_pair, get_update_args(time))
+    results = pf.map_ordered(go.update_pair, get_update_args(time), n_workers=3, pool_type=pool_type)
+    assert len(results) == len(pairs)
+    for result, afvoer in zip(results, expected):
+        pd.testing.assert_frame_equal(result, afvoer)
+
+
+def test_map_ordered_pool_type():
+    """Test that an unknown pool type is rejected.
+    """
+
+    with pytest.raises(ValueError):
+        pf.map_ordered(max, [(1, 2), (3, 4)], n_workers=2, pool_type='cluster')
@@ -1,21 +1,53 @@
 """
-Example: Testing the data preparation functions.
+Testing the data preparation functions.
 """
 
+import datetime
+
 import pandas as pd
 
-from flex_package.data.prepare_data import set_datetime_columns
+import flex_package.config as config
+from flex_package.data.prepare_data import add_destination, filter_by_time, set_datetime_column
 
 
 data = pd.DataFrame(data={
-    'date': ['2021-12-01', '2021-12-02', '2021-12-03']
+    'Startdatum laden': ['31-01-2022', '31-01-2022', '01-02-2022'],
+    'Starttijd laden': ['16:00', '23:45', '02:30']
 })
 
 
-def test_set_datetime_columns():
-    """Example: Test function `test_set_datetime_columns()`. Test whether all datetime columns are set.
+def test_set_datetime_column():
+    """Test whether the loading time is set from the loading date and time.
+    """
+
+    df = set_datetime_column(data.copy())
+    assert list(df['loading_time']) == [datetime.datetime(2022, 1, 31, 16), datetime.datetime(2022, 1, 31, 23, 45),
+                                        datetime.datetime(2022, 2, 1, 2, 30)]
+
+
+def test_filter_by_time(monkeypatch):
+    """Test that the transports are filtered to the process window of the process day.
+    """
+
+    monkeypatch.setattr(config, 'process_day', datetime.date(2022, 1, 31))
+    df = set_datetime_column(pd.DataFrame(data={
+        'Startdatum laden': ['31-01-2022', '31-01-2022', '01-02-2022', '01-02-2022', '30-01-2022'],
+        'Starttijd laden': ['07:59', '08:00', '06:59', '07:00', '16:00']}))
+    assert list(filter_by_time(df)['loading_time']) == [datetime.datetime(2022, 1, 31, 8),
+                                                        datetime.datetime(2022, 2, 1, 6, 59)]
+
+
+def test_add_destination():
+    """Test that each stop gets the location of the next stop of the same ride, and that the last stop of every ride
+    is dropped.
     """
 
-    df = set_datetime_columns(data)
-    columns = ['date', 'year', 'weekday']
-    assert all(column in df.columns for column in columns)
+    stops = pd.DataFrame(data={
+        'Ritid': [2, 1, 3, 2, 1, 1, 2, 4],
+        'Stoplabel': [2, 3, 1, 1, 1, 2, 3, 1],
+        'Locatienaam': ['HT', 'TL', 'ALR', 'ALR', 'ALR', 'XASD', 'XWW', 'ZL']})
+    df = add_destination(stops)
+    assert list(df['Ritid']) == [1, 1, 2, 2]
+    assert list(df['Stoplabel']) == [1, 2, 1, 2]
+    assert list(df['Locatienaam']) == ['ALR', 'XASD', 'ALR', 'HT']
+    assert list(df['destination']) == ['XASD', 'TL', 'HT', 'XWW']
@@ -0,0 +1,100 @@
+"""
+Testing the route planner of combined orders.
+"""
+
+import datetime as dt
+import itertools
+
+import numpy as np
+
+from flex_package.models.modelfunctions.location_registry import DriveTimeMatrix, LocationRegistry
+from flex_package.models.modelfunctions.route_planner import RouteCache, RoutePlanner
+
+
+locations = ['ALR', 'HT', 'XASD', 'XWW', 'TL', 'ZL']
+seconds = np.random.default_rng(0).integers(600, 7200, (len(locations), len(locations)))
+drive_times = DriveTimeMatrix(LocationRegistry(locations), seconds)
+stop_seconds = 900
+
+
+def get_route_cost(route):
+    """Drive time of a route plus the handling time of every stop between the start and the base."""
+
+    return drive_times.get_seconds_many(route[:-1], route[1:]).sum() + stop_seconds * (len(route) - 2)
+
+
+def enumerate_routes(start, base, orders):
+    """All routes of a combination of orders, in which every order is picked up before it is dropped."""
+
+    stops = [(i, 'pickup') for i in range(len(orders))] + [(i, 'drop') for i in range(len(orders))]
+    for sequence in itertools.permutations(stops):
+        if all(sequence.index((i, 'pickup')) < sequence.index((i, 'drop')) for i in range(len(orders))):
+            route = [start]
+            for i, action in sequence:
+                location = orders[i][0] if action == 'pickup' else orders[i][1]
+                if location != route[-1] or len(route) == 1:
+                    route.append(location)
+            yield route + [base]
+
+
+def test_single_order():
+    """Test that a single order is picked up and dropped, also if the truck starts at the origin.
+    """
+
+    planner = RoutePlanner(drive_times, stop_seconds)
+    route, drive_seconds = planner.get_best_route('ALR', 'ALR', [('ALR', 'XASD')])
+    assert route == ['ALR', 'ALR', 'XASD', 'ALR']
+    assert drive_seconds == drive_times.get_seconds('ALR', 'XASD') + drive_times.get_seconds('XASD', 'ALR')
+
+
+def test_best_route():
+    """Test that the planner finds the cheapest route of all sequences of pickups and drops of 3 orders.
+    """
+
+    planner = RoutePlanner(drive_times, stop_seconds)
+    orders = [('ALR', 'XASD'), ('HT', 'XASD'), ('HT', 'TL')]
+    for start in locations:
+        route, drive_seconds = planner.get_best_route(start, 'ZL', orders)
+        assert get_route_cost(route) == min(get_route_cost(r) for r in enumerate_routes(start, 'ZL', orders))
+        assert drive_seconds == drive_times.get_seconds_many(route[:-1], route[1:]).sum()
+    # The partial trajectories are computed once for the combination of orders and base
+    assert len(planner) == 1
+
+
+def test_best_routes():
+    """Test that the routes of many trucks at once are the routes of each truck separately.
+    """
+
+    planner = RoutePlanner(drive_times, stop_seconds)
+    orders = [('XWW', 'ALR'), ('XWW', 'HT'), ('TL', 'HT'), ('ZL', 'ALR')]
+    starts = ['ALR', 'TL', 'XWW', 'HT']
+    bases = ['ALR', 'HT', 'ALR', 'ZL']
+    routes, drive_seconds, first_seconds = planner.get_best_routes(starts, bases, orders)
+    for start, base, route, seconds_route, seconds_first in zip(starts, bases, routes, drive_seconds, first_seconds):
+        assert (route, seconds_route) == planner.get_best_route(start, base, orders)
+        assert seconds_first == drive_times.get_seconds(start, route[1])
+    assert len(planner) == 3
+    planner.clear()
+    assert len(planner) == 0
+
+
+def test_route_cache():
+    """Test that cumulative drive times are cached, and the least recently used route is discarded when full.
+    """
+
+    cache = RouteCache(drive_times, maxsize=2)
+    routes = [['ALR', 'HT', 'XASD', 'ALR'], ['HT', 'TL', 'HT'], ['ZL', 'XWW', 'ALR']]
+    travel_times = cache.get_travel_times(routes[0])
+    assert travel_times[0] == dt.timedelta(0)
+    total_seconds = drive_times.get_seconds_many(routes[0][:-1], routes[0][1:]).sum()
+    assert travel_times[-1] == dt.timedelta(seconds=int(total_seconds))
+    assert cache.get_travel_times(tuple(routes[0])) == travel_times
+    cache.get_travel_times(routes[1])
+    cache.get_travel_times(routes[0])
+    cache.get_travel_times(routes[2])
+    # The second route was used least recently, so it was discarded
+    cache.get_travel_times(routes[0])
+    cache.get_travel_times(routes[1])
+    assert cache.info() == {'hits': 3, 'misses': 4, 'hit_rate': 3 / 7, 'size': 2, 'maxsize': 2}
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == cache.misses == 0
@@ -0,0 +1,28 @@
+"""
+Testing the synthetic data generators.
+"""
+
+import datetime
+
+import flex_package.data.synthetic_data as sd
+import flex_package.models.modelfunctions.flexvoorspeller_functions as mf
+
+
+def test_synthetic_network():
+    """Test that the synthetic predictions and transports cover every combination of depot and destination.
+    """
+
+    start = datetime.datetime(2022, 1, 31, 16)
+    depots = sd.get_depots(3)
+    crossdocks = sd.get_crossdocks(2)
+    df_afvoer = sd.generate_afvoer(depots, crossdocks, 10, start)
+    df_transport = sd.generate_inter_transports(depots, crossdocks, 10, start, transports_per_pair=2)
+    assert len(df_afvoer) == 3 * 2 * 10 and len(df_transport) == 3 * 2 * 2
+
+    pairs = [(depot, crossdock) for depot in depots for crossdock in crossdocks]
+    stock_dict = mf.generate_stock_predictions(df_afvoer, df_transport, pairs)
+    assert all(len(stock_dict[pair]) == 10 + 2 for pair in pairs)
+
+    end = start + datetime.timedelta(hours=8)
+    tekorten = sd.generate_registration_orders(depots, crossdocks + depots, 20, start, end)
+    assert (tekorten['Van'] != tekorten['Naar']).all() and tekorten['Tijd'].is_monotonic_increasing